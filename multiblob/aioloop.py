@@ -0,0 +1,164 @@
+"""An asyncio driven main loop for the client.
+
+The UDP input arrives through a datagram protocol, the rules run in a
+periodic task scheduled on absolute deadlines and the pyglet windows are
+pumped by another periodic task. Like the rest of the game this is Python 2
+code, so it runs on trollius, the Python 2 port of asyncio, which is installed
+with the `asyncio` extra.
+"""
+import logging
+import socket
+
+import pyglet
+
+from multiblob import input
+
+try:
+    import trollius as asyncio
+except ImportError:
+    asyncio = None
+
+class TrackerProtocol(object):
+    """A datagram protocol passing every datagram to a handler."""
+
+    def __init__(self, handler):
+        self.log = logging.getLogger("multiblob.network")
+        self.handler = handler
+        self.datagram_count = 0
+        self.invalid_count = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.datagram_count += 1
+        try:
+            self.handler(data)
+        except input.InvalidEventDataError, e:
+            self.invalid_count += 1
+            self.log.error(u"Dropped invalid datagram '%s': %s", data, e)
+
+    def error_received(self, exception):
+        self.log.error(u"UDP error: %s", exception)
+
+    def connection_lost(self, exception):
+        pass
+
+class PeriodicTask(object):
+    """Calls a function with the elapsed time at a fixed interval.
+
+    The calls are scheduled on absolute deadlines, so they do not drift. If a
+    call overruns, the missed deadlines are skipped.
+    """
+
+    def __init__(self, loop, interval, function):
+        self.loop = loop
+        self.interval = interval
+        self.function = function
+        self._handle = None
+
+    def start(self):
+        self._last_time = self._deadline = self.loop.time()
+        self._schedule()
+
+    def _schedule(self):
+        now = self.loop.time()
+        self._deadline += self.interval
+        if self._deadline < now:
+            self._deadline = now + self.interval
+        self._handle = self.loop.call_at(self._deadline, self._run)
+
+    def _run(self):
+        now = self.loop.time()
+        dt, self._last_time = now - self._last_time, now
+        try:
+            self.function(dt)
+        finally:
+            self._schedule()
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+class AsyncioLoop(object):
+    """Runs a MultiblobApplication on an asyncio event loop instead of
+    `pyglet.app.run`."""
+
+    frame_interval = 1.0 / 60.0
+
+    def __init__(self, application, loop=None, receive_buffer=None):
+        """Prepare the loop.
+
+        Parameters
+        ----------
+        application : MultiblobApplication
+            the set up application to run
+        loop : event loop (optional, defaults to a new one)
+            the event loop to run on
+        receive_buffer : int (optional, defaults to None)
+            the requested size of the kernel receive buffer (SO_RCVBUF) in
+            bytes, defaults to the system default
+        """
+        if asyncio is None:
+            raise RuntimeError("The asyncio loop needs trollius (pip install multiblob[asyncio]).")
+        self.log = logging.getLogger("multiblob.aioloop")
+        self.application = application
+        self.receive_buffer = receive_buffer
+        self.loop = loop or asyncio.new_event_loop()
+        self.transport = None
+        self.protocol = None
+        self.tasks = []
+
+    def _open_endpoint(self):
+        application = self.application
+        self.log.info(u"Listening on port '%d'...", application.udp_port)
+        self.transport, self.protocol = self.loop.run_until_complete(
+                self.loop.create_datagram_endpoint(
+                    lambda: TrackerProtocol(application._receive_udp),
+                    local_addr = (application.udp_address, application.udp_port),
+                    ))
+        if self.receive_buffer is not None:
+            udp_socket = self.transport.get_extra_info('socket')
+            udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+            self.log.info(u"Requested a receive buffer of %d bytes, got %d bytes.",
+                    self.receive_buffer,
+                    udp_socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+                    )
+
+    def _pump_windows(self, dt):
+        pyglet.clock.tick()
+        windows = list(pyglet.app.windows)
+        for window in windows:
+            window.switch_to()
+            window.dispatch_events()
+            window.dispatch_event('on_draw')
+            window.flip()
+        if not windows or any(window.has_exit for window in windows):
+            self.loop.stop()
+
+    def run(self):
+        """Run until the last window is closed."""
+        application = self.application
+        if application.replayer is None:
+            self._open_endpoint()
+        else:
+            self.tasks.append(PeriodicTask(self.loop, application.network_interval,
+                application._step_replay))
+        self.tasks.append(PeriodicTask(self.loop, application.rule_interval,
+            application.update_rules))
+        self.tasks.append(PeriodicTask(self.loop, self.frame_interval,
+            self._pump_windows))
+
+        for task in self.tasks:
+            task.start()
+        try:
+            self.loop.run_forever()
+        finally:
+            for task in self.tasks:
+                task.stop()
+            if self.transport is not None:
+                self.log.info(u"Closing UDP socket after %d datagrams, %d invalid...",
+                        self.protocol.datagram_count, self.protocol.invalid_count)
+                self.transport.close()
+            self.loop.close()
@@ -0,0 +1,4 @@
+"""Benchmarks for the performance critical parts of multiblob.
+
+Run a benchmark module directly, e.g. `python -m multiblob.benchmarks.combat`.
+"""
@@ -0,0 +1,64 @@
+"""Benchmark of the blob combat broad phase.
+
+Compares the old all-pairs collision search against the spatial hash used by
+`BlobCombat`.
+"""
+import itertools
+import random
+import timeit
+
+from multiblob import spatial, state
+
+BLOB_COUNTS = [100, 500, 2000]
+PLAYER_COUNT = 6
+REPETITIONS = 5
+
+def make_blobs(blob_count, width=1024, height=768, seed=0):
+    rng = random.Random(seed)
+    players = [ state.Player(colour, []) for colour in state.PLAYER_COLOURS[:PLAYER_COUNT] ]
+    return [
+            state.Blob(
+                players[index % len(players)],
+                rng.uniform(0, width),
+                rng.uniform(0, height),
+                rng.uniform(5.0, 40.0),
+                )
+            for index in range(blob_count) ]
+
+def _touching(blob, other_blob):
+    radii = blob.radius + other_blob.radius
+    dx = blob.pos_x - other_blob.pos_x
+    dy = blob.pos_y - other_blob.pos_y
+    return dx * dx + dy * dy <= radii * radii
+
+def all_pairs(blobs):
+    return [ pair for pair in itertools.combinations(blobs, 2) if _touching(*pair) ]
+
+def spatial_hash_pairs(blobs):
+    blob_hash = spatial.SpatialHash.from_blobs(blobs)
+    return [ pair for pair in blob_hash.pairs() if _touching(*pair) ]
+
+def run(blob_counts=BLOB_COUNTS, repetitions=REPETITIONS):
+    results = []
+    for blob_count in blob_counts:
+        blobs = make_blobs(blob_count)
+        assert len(all_pairs(blobs)) == len(spatial_hash_pairs(blobs))
+        all_pairs_time = min(timeit.repeat(
+            lambda: all_pairs(blobs), number=1, repeat=repetitions))
+        hash_time = min(timeit.repeat(
+            lambda: spatial_hash_pairs(blobs), number=1, repeat=repetitions))
+        results.append((blob_count, all_pairs_time, hash_time))
+    return results
+
+def main():
+    print "%8s %14s %14s %8s" % ("blobs", "all pairs [ms]", "spatial [ms]", "speedup")
+    for blob_count, all_pairs_time, hash_time in run():
+        print "%8d %14.2f %14.2f %7.1fx" % (
+                blob_count,
+                all_pairs_time * 1000.0,
+                hash_time * 1000.0,
+                all_pairs_time / hash_time,
+                )
+
+if __name__ == '__main__':
+    main()
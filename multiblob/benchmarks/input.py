@@ -0,0 +1,86 @@
+"""Benchmark of the tracker packet parser.
+
+Compares parsing chunks object by object with `MultitouchEvent.from_packet`,
+as `InputSystem.parse_packet` used to, against the single pass parser and
+the binary protocol.
+"""
+import random
+import timeit
+
+from multiblob import bridge, input, protocol
+
+OBJECT_COUNTS = [1, 10, 40]
+CHUNK_COUNT = 1000
+REPETITIONS = 5
+WIDTH, HEIGHT = 1024, 768
+
+def make_chunks(object_count, chunk_count=CHUNK_COUNT, seed=0):
+    rng = random.Random(seed)
+    chunks = []
+    for chunk_id in range(chunk_count):
+        objects = [ "chunkID:%d" % chunk_id ] + [
+                "ObjectType:1 ID:%d ObjectState:%d PosX:%f PosY:%f Area:%f Width:%f Height:%f Orientation:%f" % (
+                    object_id, rng.randint(0, 2), rng.random(), rng.random(),
+                    rng.uniform(1e-4, 1e-2), rng.uniform(1e-3, 1e-1), rng.uniform(1e-3, 1e-1),
+                    rng.uniform(0.0, 360.0))
+                for object_id in range(object_count) ]
+        chunks.append("//".join(objects) + "//")
+    return chunks
+
+def parse_legacy(chunks):
+    events = []
+    for data in chunks:
+        input_objects = [ x for x in data.split(r'//') if x ]
+        if len(input_objects) > 1:
+            chunk_id = int(input_objects[0][8:])
+            for input_object in input_objects[1:]:
+                event = input.MultitouchEvent.from_packet(input_object)
+                "Parsed event: %s" % str(event)
+                event.scale_to_dimensions(WIDTH, HEIGHT)
+                events.append(event)
+    return events
+
+def parse_single_pass(chunks):
+    events = []
+    for data in chunks:
+        header_end = data.find('//')
+        chunk_id = int(data[8:header_end])
+        events.extend(input.MultitouchEvent.from_chunk(data[header_end+2:], WIDTH, HEIGHT))
+    return events
+
+def parse_binary(chunks):
+    events = []
+    for data in chunks:
+        chunk_id, records = protocol.decode(data)
+        events.extend(input.MultitouchEvent.from_records(records, WIDTH, HEIGHT))
+    return events
+
+def run(object_counts=OBJECT_COUNTS, repetitions=REPETITIONS):
+    results = []
+    for object_count in object_counts:
+        chunks = make_chunks(object_count)
+        binary_chunks = [ bridge.text_to_binary(data) for data in chunks ]
+        event_count = len(parse_single_pass(chunks))
+        assert event_count == len(parse_legacy(chunks)) == len(parse_binary(binary_chunks))
+        legacy_time = min(timeit.repeat(
+            lambda: parse_legacy(chunks), number=1, repeat=repetitions))
+        single_pass_time = min(timeit.repeat(
+            lambda: parse_single_pass(chunks), number=1, repeat=repetitions))
+        binary_time = min(timeit.repeat(
+            lambda: parse_binary(binary_chunks), number=1, repeat=repetitions))
+        results.append((object_count, event_count / legacy_time,
+            event_count / single_pass_time, event_count / binary_time))
+    return results
+
+def main():
+    print "%8s %16s %16s %16s" % ("objects", "legacy [ev/s]", "single [ev/s]", "binary [ev/s]")
+    for object_count, legacy_rate, single_pass_rate, binary_rate in run():
+        print "%8d %16.0f %16.0f %16.0f" % (
+                object_count,
+                legacy_rate,
+                single_pass_rate,
+                binary_rate,
+                )
+
+if __name__ == '__main__':
+    main()
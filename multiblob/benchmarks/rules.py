@@ -0,0 +1,150 @@
+"""Synthetic load benchmark of the rule pipeline.
+
+Builds headless boards with a configurable number of players, blobs, facets
+and powerups, times every rule of the main mode and the whole tick, and
+reports mean, p95 and p99 as JSON, e.g.
+
+    python -m multiblob.benchmarks.rules --players 2,6 --blobs 10,100 -o out.json
+"""
+import itertools
+import json
+import optparse
+import sys
+
+from multiblob import euclid, profiling, simulation, state, timing
+
+class Scenario(object):
+    """A board configuration to benchmark."""
+
+    # fraction of the blobs that are moving towards a waypoint
+    MOVING_FRACTION = 0.5
+
+    def __init__(self, players, blobs_per_player, facet_count=(6, 4), powerups=2, seed=0):
+        self.players          = players
+        self.blobs_per_player = blobs_per_player
+        self.facet_count      = facet_count
+        self.powerups         = powerups
+        self.seed             = seed
+
+    def build(self):
+        """Return a new headless application with the scenario's board."""
+        application = simulation.HeadlessApplication(
+                player_count = self.players,
+                seed         = self.seed,
+                facet_count  = self.facet_count,
+                )
+        game_state = application.state
+        rng = application.rng
+        for player in game_state.players:
+            for index in range(self.blobs_per_player):
+                blob = state.Blob(
+                        player,
+                        rng.uniform(0, game_state.window_width),
+                        rng.uniform(0, game_state.window_height),
+                        rng.uniform(5.0, 40.0),
+                        )
+                if rng.random() < self.MOVING_FRACTION:
+                    blob.movement.append(euclid.Point2(
+                        rng.uniform(0, game_state.window_width),
+                        rng.uniform(0, game_state.window_height),
+                        ))
+        powerup_types = [ state.DoubleSizePowerup, state.IncreaseOccupationPowerup ]
+        for facet in rng.sample(game_state.facets, min(self.powerups, len(game_state.facets))):
+            game_state.powerups.append(rng.choice(powerup_types)(
+                euclid.Point2(facet.gen_x, facet.gen_y)))
+        return application
+
+    def as_dict(self):
+        return {
+                'players'          : self.players,
+                'blobs_per_player' : self.blobs_per_player,
+                'facets'           : self.facet_count[0] * self.facet_count[1],
+                'powerups'         : self.powerups,
+                }
+
+def run_scenario(scenario, iterations=200, reset_every=20):
+    """Time every rule and the whole tick of `scenario`.
+
+    The board is rebuilt every `reset_every` iterations, so that combat does
+    not thin out the blobs during the measurement. Returns a dict of
+    measurement name -> summary dict in seconds.
+    """
+    profiler = profiling.Profiler(window=iterations)
+    rule_count = len(scenario.build().rules.rules)
+
+    for rule_index in range(rule_count):
+        for iteration in range(iterations):
+            if iteration % reset_every == 0:
+                application = scenario.build()
+                rule = application.rules.rules[rule_index]
+            start_time = timing.clock()
+            rule.update(application.rules.tick, application.state)
+            profiler.record('rule.' + rule.__class__.__name__, timing.clock() - start_time)
+
+    for iteration in range(iterations):
+        if iteration % reset_every == 0:
+            application = scenario.build()
+        start_time = timing.clock()
+        application.step()
+        profiler.record('tick', timing.clock() - start_time)
+
+    return dict((name, dict((key, summary[key]) for key in ('count', 'mean', 'p95', 'p99')))
+            for name, summary in profiler.stats().iteritems())
+
+def run(scenarios, iterations=200, reset_every=20):
+    return {
+            'unit'      : 's',
+            'scenarios' : [ dict(scenario.as_dict(),
+                results = run_scenario(scenario, iterations, reset_every))
+                for scenario in scenarios ],
+            }
+
+def _int_list(value):
+    return [ int(v) for v in value.split(',') ]
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option("-p", "--players", default="2,6",
+            help="Comma separated player counts, defaults to 2,6."
+            )
+    parser.add_option("-b", "--blobs", default="10,50,200",
+            help="Comma separated blob counts per player, defaults to 10,50,200."
+            )
+    parser.add_option("-f", "--facets", default="6x4",
+            help="Comma separated facet grids, defaults to 6x4."
+            )
+    parser.add_option("--powerups", default="2",
+            help="Comma separated powerup counts, defaults to 2."
+            )
+    parser.add_option("-n", "--iterations", type="int", default=200,
+            help="Timed iterations per rule and scenario, defaults to 200."
+            )
+    parser.add_option("--seed", type="int", default=0,
+            help="Seed for the boards, defaults to 0."
+            )
+    parser.add_option("-o", "--output", default=None,
+            help="Write the JSON results to this file, defaults to stdout."
+            )
+    options, args = parser.parse_args(args)
+
+    facet_counts = [ tuple(int(n) for n in facets.split('x'))
+            for facets in options.facets.split(',') ]
+    scenarios = [ Scenario(players, blobs, facet_count, powerups, options.seed)
+            for players, blobs, facet_count, powerups in itertools.product(
+                _int_list(options.players),
+                _int_list(options.blobs),
+                facet_counts,
+                _int_list(options.powerups),
+                ) ]
+
+    results = run(scenarios, options.iterations)
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""Precomputed lookup structures for the game board go here."""
+
+import math
+
+import numpy
+
+class FacetLocator(object):
+    """Answers which facet contains a point using a raster lookup table.
+
+    The table stores the index of the containing facet for every cell of a
+    grid covering the board, so a lookup is a single array access.
+    """
+
+    EPSILON = 1e-6
+
+    def __init__(self, facets, width, height, cell_size=1.0, fallback=None):
+        """Rasterize the given facets.
+
+        Parameters
+        ----------
+        facets : list of Facet instances
+            the facets with convex polygon coordinates
+        width : int
+            the width of the board
+        height : int
+            the height of the board
+        cell_size : float (optional, defaults to 1.0)
+            the edge length of a raster cell, 1.0 is the window resolution
+        fallback : callable (optional, defaults to None)
+            called with (x, y) to locate cells not covered by any polygon,
+            defaults to the facet with the nearest center
+        """
+        self.facets    = facets
+        self.cell_size = float(cell_size)
+        self.columns   = max(int(math.ceil(width / self.cell_size)), 1)
+        self.rows      = max(int(math.ceil(height / self.cell_size)), 1)
+        self.grid      = numpy.empty((self.rows, self.columns), dtype=numpy.int16)
+        self.grid.fill(-1)
+
+        for index, facet in enumerate(facets):
+            self._rasterize(index, facet.coords)
+
+        self._fill_uncovered(fallback)
+        self._edges = self._edge_table(facets)
+
+    @staticmethod
+    def _edge_table(facets):
+        """Return an array of shape (facets, max edges, 4) holding the edges
+        (x0, y0, x1, y1) of every facet, padded by repeating the last edge."""
+        polygons = [ numpy.array(facet.coords, dtype=float).reshape(-1, 2) for facet in facets ]
+        max_edges = max([ len(polygon) for polygon in polygons ] or [1])
+        edges = numpy.zeros((len(facets), max(max_edges, 1), 4))
+        for index, polygon in enumerate(polygons):
+            if not len(polygon):
+                continue
+            count = len(polygon)
+            edges[index, :count, :2] = polygon
+            edges[index, :count, 2:] = numpy.roll(polygon, -1, axis=0)
+            edges[index, count:] = edges[index, count-1]
+        return edges
+
+    def _cell_centers(self, min_column, max_column, min_row, max_row):
+        xs = (numpy.arange(min_column, max_column) + 0.5) * self.cell_size
+        ys = (numpy.arange(min_row, max_row) + 0.5) * self.cell_size
+        return numpy.meshgrid(xs, ys)
+
+    def _rasterize(self, index, coords):
+        vertices = numpy.array(coords, dtype=float).reshape(-1, 2)
+        if len(vertices) < 3:
+            return
+        min_column, min_row = numpy.clip(
+                numpy.floor(vertices.min(axis=0) / self.cell_size).astype(int),
+                0, [self.columns, self.rows])
+        max_column, max_row = numpy.clip(
+                numpy.ceil(vertices.max(axis=0) / self.cell_size).astype(int) + 1,
+                0, [self.columns, self.rows])
+        xs, ys = self._cell_centers(min_column, max_column, min_row, max_row)
+
+        # a point is inside a convex polygon, if it lies on the same side of
+        # all edges, regardless of the polygon's orientation
+        all_left  = numpy.ones(xs.shape, dtype=bool)
+        all_right = numpy.ones(xs.shape, dtype=bool)
+        for (x0, y0), (x1, y1) in zip(vertices, numpy.roll(vertices, -1, axis=0)):
+            cross = (x1 - x0) * (ys - y0) - (y1 - y0) * (xs - x0)
+            tolerance = self.EPSILON * math.hypot(x1 - x0, y1 - y0)
+            all_left  &= cross >= -tolerance
+            all_right &= cross <= tolerance
+        inside = all_left | all_right
+
+        region = self.grid[min_row:max_row, min_column:max_column]
+        region[inside & (region < 0)] = index
+
+    def _fill_uncovered(self, fallback):
+        rows, columns = numpy.nonzero(self.grid < 0)
+        if not len(rows):
+            return
+        xs = (columns + 0.5) * self.cell_size
+        ys = (rows + 0.5) * self.cell_size
+        if fallback is None:
+            centers = numpy.array([ (f.pos_x, f.pos_y) for f in self.facets ], dtype=float)
+            distances = numpy.hypot(
+                    xs[:, numpy.newaxis] - centers[:, 0],
+                    ys[:, numpy.newaxis] - centers[:, 1],
+                    )
+            self.grid[rows, columns] = distances.argmin(axis=1)
+        else:
+            indices = dict((id(facet), index) for index, facet in enumerate(self.facets))
+            for row, column, x, y in zip(rows, columns, xs, ys):
+                self.grid[row, column] = indices[id(fallback(float(x), float(y)))]
+
+    def locate_indices(self, xs, ys):
+        """Return the indices of the facets containing the given points.
+
+        Parameters
+        ----------
+        xs : array-like of float
+            the x coordinates of the points
+        ys : array-like of float
+            the y coordinates of the points
+        """
+        columns = numpy.clip(
+                (numpy.asarray(xs, dtype=float) / self.cell_size).astype(int),
+                0, self.columns - 1)
+        rows = numpy.clip(
+                (numpy.asarray(ys, dtype=float) / self.cell_size).astype(int),
+                0, self.rows - 1)
+        return self.grid[rows, columns]
+
+    def safe_radii(self, indices, xs, ys):
+        """Return for each point the radius of a circle around it, within
+        which all points are located in the same facet.
+
+        Parameters
+        ----------
+        indices : array of int
+            the facet indices of the points as returned by `locate_indices`
+        xs : array of float
+            the x coordinates of the points
+        ys : array of float
+            the y coordinates of the points
+        """
+        edges = self._edges[indices]
+        xs = numpy.asarray(xs, dtype=float)[:, numpy.newaxis]
+        ys = numpy.asarray(ys, dtype=float)[:, numpy.newaxis]
+        x0, y0, x1, y1 = edges[..., 0], edges[..., 1], edges[..., 2], edges[..., 3]
+        edge_x = x1 - x0
+        edge_y = y1 - y0
+        length_2 = edge_x * edge_x + edge_y * edge_y
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            t = numpy.where(length_2 > 0.0,
+                    ((xs - x0) * edge_x + (ys - y0) * edge_y) / length_2, 0.0)
+        t = numpy.clip(t, 0.0, 1.0)
+        distances = numpy.hypot(x0 + t * edge_x - xs, y0 + t * edge_y - ys).min(axis=1)
+
+        # points outside of their facet's polygon (e.g. off the board) must be
+        # located again on every move
+        cross = edge_x * (ys - y0) - edge_y * (xs - x0)
+        inside = (cross >= 0.0).all(axis=1) | (cross <= 0.0).all(axis=1)
+
+        # account for the resolution of the raster
+        radii = distances - self.cell_size * math.sqrt(2.0)
+        return numpy.where(inside, numpy.maximum(radii, 0.0), 0.0)
+
+    def locate_index(self, x, y):
+        """Return the index of the facet containing the point (x, y)."""
+        column = min(max(int(x / self.cell_size), 0), self.columns - 1)
+        row = min(max(int(y / self.cell_size), 0), self.rows - 1)
+        return int(self.grid[row, column])
+
+    def locate(self, x, y):
+        """Return the facet containing the point (x, y)."""
+        return self.facets[self.locate_index(x, y)]
+
+class BoardGeometry(object):
+    """Geometric properties of the facets of a board, which never change
+    during a match. All arrays are indexed by `Facet.index`.
+
+    Attributes
+    ----------
+    distances : array of shape (facets, facets)
+        the distances between the facet positions
+    adjacency : list of sets of int
+        the indices of the facets sharing an edge with each facet
+    centroids : array of shape (facets, 2)
+        the centroids of the facet polygons
+    areas : array of shape (facets,)
+        the areas of the facet polygons
+    bounding_boxes : array of shape (facets, 4)
+        the axis parallel bounding boxes (min x, min y, max x, max y)
+    """
+
+    EPSILON = 1e-6
+
+    def __init__(self, facets):
+        """Compute the geometry of the given facets.
+
+        Parameters
+        ----------
+        facets : list of Facet instances
+            the facets with convex polygon coordinates, in the order of their
+            `Facet.index`
+        """
+        positions = numpy.array([ (f.pos_x, f.pos_y) for f in facets ], dtype=float).reshape(-1, 2)
+        self.distances = numpy.hypot(
+                positions[:, numpy.newaxis, 0] - positions[numpy.newaxis, :, 0],
+                positions[:, numpy.newaxis, 1] - positions[numpy.newaxis, :, 1],
+                )
+
+        polygons = [ numpy.array(f.coords, dtype=float).reshape(-1, 2) for f in facets ]
+        self.centroids      = numpy.zeros((len(facets), 2))
+        self.areas          = numpy.zeros(len(facets))
+        self.bounding_boxes = numpy.zeros((len(facets), 4))
+        for index, polygon in enumerate(polygons):
+            if len(polygon) >= 3:
+                self._measure(index, polygon)
+
+        edges = [ numpy.hstack([polygon, numpy.roll(polygon, -1, axis=0)]) for polygon in polygons ]
+        self.adjacency = [ set() for f in facets ]
+        for index in range(len(facets)):
+            for other_index in range(index + 1, len(facets)):
+                if self._share_edge(edges[index], edges[other_index]):
+                    self.adjacency[index].add(other_index)
+                    self.adjacency[other_index].add(index)
+
+        for facet in facets:
+            facet.geometry = self
+
+    def _measure(self, index, polygon):
+        xs, ys = polygon[:, 0], polygon[:, 1]
+        next_xs, next_ys = numpy.roll(xs, -1), numpy.roll(ys, -1)
+        cross = xs * next_ys - next_xs * ys
+        signed_area = cross.sum() / 2.0
+        self.areas[index] = abs(signed_area)
+        if signed_area:
+            self.centroids[index] = (
+                    ((xs + next_xs) * cross).sum() / (6.0 * signed_area),
+                    ((ys + next_ys) * cross).sum() / (6.0 * signed_area),
+                    )
+        else:
+            self.centroids[index] = polygon.mean(axis=0)
+        self.bounding_boxes[index] = numpy.hstack([polygon.min(axis=0), polygon.max(axis=0)])
+
+    def _share_edge(self, edges, other_edges):
+        """Return True, if any two edges are collinear and overlap."""
+        if not len(edges) or not len(other_edges):
+            return False
+        a = edges[:, numpy.newaxis, :2]
+        direction = edges[:, numpy.newaxis, 2:] - a
+        length = numpy.hypot(direction[..., 0], direction[..., 1])
+        tolerance = self.EPSILON * numpy.maximum(length, 1.0)
+        start = other_edges[numpy.newaxis, :, :2] - a
+        end = other_edges[numpy.newaxis, :, 2:] - a
+
+        def cross(v):
+            return direction[..., 0] * v[..., 1] - direction[..., 1] * v[..., 0]
+
+        collinear = (numpy.abs(cross(start)) <= tolerance * length) & \
+                (numpy.abs(cross(end)) <= tolerance * length)
+
+        # overlap of the projections onto the edge direction
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            t_start = (start * direction).sum(axis=-1) / (length * length)
+            t_end = (end * direction).sum(axis=-1) / (length * length)
+        overlap = numpy.minimum(numpy.maximum(t_start, t_end), 1.0) - \
+                numpy.maximum(numpy.minimum(t_start, t_end), 0.0)
+        return bool((collinear & (length > 0.0) & (overlap * length > tolerance)).any())
+
+class BoardMesh(object):
+    """Vertex data for drawing all facets of a board with a single fill and
+    a single outline vertex list.
+
+    Attributes
+    ----------
+    vertices : array of shape (vertices, 2)
+        the polygon vertices of all facets one after another
+    vertex_ranges : array of shape (facets, 2)
+        the first and one past the last vertex of each facet
+    fill_indices : array of int
+        the vertex indices of the triangles filling the facets, three per
+        triangle, as a fan around the first vertex of each convex polygon
+    outline_vertices : array of shape (outline vertices, 2)
+        the end points of the edges of all facets, two per edge
+    outline_ranges : array of shape (facets, 2)
+        the first and one past the last outline vertex of each facet
+    """
+
+    def __init__(self, facets):
+        """Build the mesh of the given facets.
+
+        Parameters
+        ----------
+        facets : list of Facet instances
+            the facets with convex polygon coordinates
+        """
+        polygons = [ numpy.array(f.coords, dtype=float).reshape(-1, 2) for f in facets ]
+        counts = numpy.array([ len(polygon) for polygon in polygons ], dtype=int)
+        ends = numpy.cumsum(counts)
+        self.vertex_ranges = numpy.column_stack([ends - counts, ends])
+        self.outline_ranges = 2 * self.vertex_ranges
+        self.vertices = numpy.vstack(polygons + [numpy.zeros((0, 2))])
+
+        fill_indices = []
+        outline_vertices = []
+        for polygon, (start, end) in zip(polygons, self.vertex_ranges):
+            if len(polygon) >= 3:
+                fan = numpy.arange(start + 1, end - 1)
+                fill_indices.append(numpy.column_stack([
+                    numpy.repeat(start, len(fan)), fan, fan + 1]).ravel())
+            outline_vertices.append(numpy.column_stack(
+                [polygon, numpy.roll(polygon, -1, axis=0)]).reshape(-1, 2))
+        self.fill_indices = numpy.concatenate(fill_indices + [numpy.zeros(0, dtype=int)])
+        self.outline_vertices = numpy.vstack(outline_vertices + [numpy.zeros((0, 2))])
+
+class FacetColourCache(object):
+    """The fill colours of all facets, recomputed only for facets whose
+    occupation changed.
+
+    The facets report their changes through `mark_changed`. The colours are
+    looked up in a table of player colour x quantized occupation. Consumers
+    remember the `version` they last saw and ask for the facets changed
+    since then.
+
+    Attributes
+    ----------
+    colours : array of shape (facets, 4)
+        the current colours, indexed by `Facet.index`
+    version : int
+        incremented whenever colours are recomputed
+    """
+
+    LEVELS = 64 # number of distinct occupation levels
+
+    def __init__(self, facets, base_colour, occupation_factor=1.0):
+        """Create the cache and attach it to the given facets.
+
+        Parameters
+        ----------
+        facets : list of Facet instances
+            the facets, with their `index` set
+        base_colour : tuple of 4 floats
+            the colour of facets without owner
+        occupation_factor : float (optional, defaults to 1.0)
+            the share of the owner colour at full occupation
+        """
+        self.facets = facets
+        self.base_colour = numpy.array(base_colour, dtype=float)
+        self.occupation_factor = occupation_factor
+        self.colours = numpy.tile(self.base_colour, (len(facets), 1))
+        self.versions = numpy.zeros(len(facets), dtype=int)
+        self.version = 0
+        self._table = numpy.zeros((0, self.LEVELS + 1, 4))
+        self._table_rows = {} # player colour -> row of the table
+        self._changed = set()
+        for facet in facets:
+            facet.colour_cache = self
+            self._changed.add(facet.index)
+        self.update()
+
+    def _table_row(self, colour):
+        row = self._table_rows.get(colour)
+        if row is None:
+            shares = numpy.linspace(0.0, self.occupation_factor, self.LEVELS + 1)[:, numpy.newaxis]
+            colours = self.base_colour * (1.0 - shares) + numpy.array(colour, dtype=float) * shares
+            row = self._table_rows[colour] = len(self._table)
+            self._table = numpy.concatenate([self._table, colours[numpy.newaxis]])
+        return row
+
+    def mark_changed(self, index):
+        """Note that the occupation of the facet at `index` changed."""
+        self._changed.add(index)
+
+    def update(self):
+        """Recompute the colours of the changed facets and return their
+        indices in ascending order."""
+        if not self._changed:
+            return numpy.zeros(0, dtype=int)
+        indices = numpy.array(sorted(self._changed), dtype=int)
+        self._changed.clear()
+        self.version += 1
+        for index in indices:
+            facet = self.facets[index]
+            owner = facet.owner
+            if owner is None:
+                self.colours[index] = self.base_colour
+            else:
+                level = int(round(facet.owner_occupation * self.LEVELS))
+                row = self._table_row(tuple(owner.colour))
+                self.colours[index] = self._table[row, level]
+        self.versions[indices] = self.version
+        return indices
+
+    def changed_since(self, version):
+        """Return the indices of the facets whose colour changed after
+        `version` in ascending order."""
+        self.update()
+        if version >= self.version:
+            return numpy.zeros(0, dtype=int)
+        return numpy.flatnonzero(self.versions > version)
@@ -0,0 +1,99 @@
+"""A local bridge translating the tracker's text protocol into the binary
+protocol of `multiblob.protocol`.
+
+Point the tracker at the bridge and the bridge at the game, e.g.
+`multiblob-bridge --listen-port 5565 --target 127.0.0.1:5566`.
+"""
+import logging
+import optparse
+import socket
+import struct
+import sys
+
+from multiblob import input, protocol
+
+def text_to_binary(data):
+    """Return the binary datagram for a text datagram, or None if it is not
+    a valid chunk."""
+    header_end = data.find('//')
+    header = data if header_end < 0 else data[:header_end]
+    body = '' if header_end < 0 else data[header_end+2:]
+    if header[:8].lower() != "chunkid:":
+        return None
+    try:
+        chunk_id = int(header[8:])
+        matches = input.MultitouchEvent.match_chunk(body)
+        if matches is None:
+            return None
+        return protocol.encode(chunk_id, [ (
+                    int(object_type),
+                    int(object_id),
+                    int(object_state),
+                    float(pos_x),
+                    float(pos_y),
+                    float(area),
+                    float(object_width),
+                    float(object_height),
+                    float(orientation),
+                    )
+                for object_type, object_id, object_state, pos_x, pos_y, area,
+                    object_width, object_height, orientation in matches ])
+    except (ValueError, OverflowError, struct.error, protocol.InvalidFrameError):
+        return None
+
+class Bridge(object):
+    def __init__(self, listen_address, target_address):
+        self.log = logging.getLogger("multiblob.bridge")
+        self.target_address = target_address
+        self.in_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.in_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.in_socket.bind(listen_address)
+        self.out_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def forward(self, data):
+        """Translate and forward one datagram. Returns False, if it had to be
+        dropped."""
+        binary = text_to_binary(data)
+        if binary is None:
+            self.log.warning(u"Dropped invalid datagram: '%s'.", data)
+            return False
+        self.out_socket.sendto(binary, self.target_address)
+        return True
+
+    def run(self):
+        while True:
+            self.forward(self.in_socket.recv(protocol.HEADER.size + 65535))
+
+    def close(self):
+        self.in_socket.close()
+        self.out_socket.close()
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option("--listen-address", default='0.0.0.0',
+            help="Address to receive the text protocol on, defaults to 0.0.0.0."
+            )
+    parser.add_option("--listen-port", type="int", default=5565,
+            help="Port to receive the text protocol on, defaults to 5565."
+            )
+    parser.add_option("--target", default='127.0.0.1:5566',
+            help="HOST:PORT of the game, defaults to 127.0.0.1:5566."
+            )
+    parser.add_option("-d", "--debug", action="store_true", default=False,
+            help="Turn on debug logging, defaults to false."
+            )
+    options, args = parser.parse_args(args)
+    logging.basicConfig(level = logging.DEBUG if options.debug else logging.WARNING)
+
+    host, port = options.target.rsplit(':', 1)
+    bridge = Bridge((options.listen_address, options.listen_port), (host, int(port)))
+    try:
+        bridge.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bridge.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
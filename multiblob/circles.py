@@ -0,0 +1,31 @@
+"""Circle geometry shared by the renderers."""
+import numpy
+
+SEGMENTS = 36
+
+# the unit circle, starting at the top and going clockwise
+UNIT_CIRCLE = numpy.array([
+        (numpy.sin(angle), numpy.cos(angle))
+        for angle in numpy.radians(numpy.arange(0, 360, 360 / SEGMENTS))
+        ])
+
+# the segments of the unit circle as pairs of line end points
+UNIT_CIRCLE_LINES = UNIT_CIRCLE[
+        numpy.column_stack((numpy.arange(SEGMENTS),
+            (numpy.arange(SEGMENTS) + 1) % SEGMENTS)).ravel()]
+
+LINE_VERTEX_COUNT = len(UNIT_CIRCLE_LINES)
+
+def circle(center, radius):
+    """Return the flat coordinate list of a circle polygon, as used for
+    `v2f` vertex lists."""
+    return (UNIT_CIRCLE * radius + (center[0], center[1])).ravel().tolist()
+
+def circle_outlines(xs, ys, radii):
+    """Return the outlines of the circles at (xs[i], ys[i]) with radius
+    radii[i] as an array of shape (n, LINE_VERTEX_COUNT, 2) of `GL_LINES`
+    vertices."""
+    centers = numpy.column_stack((xs, ys))
+    radii = numpy.asarray(radii, dtype=float)
+    return UNIT_CIRCLE_LINES[numpy.newaxis] * radii[:, numpy.newaxis, numpy.newaxis] + \
+            centers[:, numpy.newaxis, :]
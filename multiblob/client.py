@@ -1,12 +1,11 @@
 import logging
 import optparse
-import socket
+import random
 import sys
 
-from cogen.core import schedulers, sockets, coroutines
 import pyglet
 
-from multiblob import input, modes, state, window
+from multiblob import aioloop, input, modes, network, profiling, recording, state, timing, window
 
 class MultiblobApplication(object):
     udp_address = '0.0.0.0'
@@ -16,7 +15,11 @@ class MultiblobApplication(object):
     rule_interval = 0.05
 
     def __init__(self):
-        pass
+        self.profiler = None
+        self.recorder = None
+        self.replayer = None
+        self.receiver_thread = None
+        self.udp_receiver = None
 
     def _setup_config(self, args):
         parser = optparse.OptionParser()
@@ -29,13 +32,52 @@ class MultiblobApplication(object):
         parser.add_option("-s", "--screen", type="int", default=0,
                 help="Put the window on the given screen, defaults to 0, which is the first screen."
                 )
+        parser.add_option("--profile-stats", action="store_true", default=False,
+                help="Record the timings of rules and renderers and print percentiles on exit, defaults to false."
+                )
+        parser.add_option("--tick-budget", type="float", default=None,
+                help="Defer rules that would start after this many milliseconds of a simulation tick, defaults to no budget."
+                )
+        parser.add_option("--seed", type="int", default=None,
+                help="Seed for the board and the rules, defaults to a random seed."
+                )
+        parser.add_option("--record", metavar="FILE", default=None,
+                help="Record the received UDP input to FILE."
+                )
+        parser.add_option("--replay", metavar="FILE", default=None,
+                help="Replay the UDP input recorded in FILE instead of listening on the network."
+                )
+        parser.add_option("--receive-buffer", type="int", default=None,
+                help="Size of the UDP receive buffer in bytes, defaults to the system default."
+                )
+        parser.add_option("--receiver-thread", action="store_true", default=False,
+                help="Receive and parse the UDP input on a separate thread, defaults to false."
+                )
+        parser.add_option("--coalesce-moved", action="store_true", default=False,
+                help="Dispatch only the latest MOVED event of every touch per network step, defaults to false."
+                )
+        parser.add_option("--asyncio", action="store_true", default=False,
+                help="Run the game on an asyncio event loop (needs trollius), defaults to false."
+                )
 
         options, args = parser.parse_args(args)
+        if options.asyncio and options.receiver_thread:
+            parser.error("--receiver-thread cannot be combined with --asyncio, "
+                    "the asyncio loop receives on its own.")
 
         self.configuration = {
                 'debug'      : options.debug,
                 'fullscreen' : options.fullscreen,
                 'screen'     : options.screen,
+                'tick_budget': options.tick_budget,
+                'profile_stats': options.profile_stats,
+                'seed'       : options.seed,
+                'record'     : options.record,
+                'replay'     : options.replay,
+                'receive_buffer': options.receive_buffer,
+                'receiver_thread': options.receiver_thread,
+                'asyncio'    : options.asyncio,
+                'coalesce_moved': options.coalesce_moved,
                 }
 
     def _setup_logging(self):
@@ -52,12 +94,21 @@ class MultiblobApplication(object):
 
     def _setup_state(self):
         self.log.info(u"Setting up game state...")
-        self.state = state.GameState()
+        seed = self.configuration.get('seed')
+        if self.configuration.get('replay'):
+            self.replay_recording = recording.InputRecording(self.configuration['replay'])
+            if seed is None:
+                seed = self.replay_recording.seed
+        elif self.configuration.get('record') and seed is None:
+            # a recording is only reproducible with a known seed
+            seed = random.randint(0, 2**31 - 1)
+        self.state = state.GameState(seed=seed)
         #self.state.reset_simple()
 
     def _setup_input(self):
         self.log.info(u"Setting up input system...")
-        self.input_system = input.InputSystem(self)
+        self.input_system = input.InputSystem(self,
+                coalesce_moved = self.configuration.get('coalesce_moved', False))
 
     def _setup_modes(self):
         self.log.info(u"Setting up game modes...")
@@ -67,6 +118,17 @@ class MultiblobApplication(object):
                 'outro' : modes.OutroMode(self),
                 }
 
+        if self.configuration.get('profile_stats', False):
+            self.profiler = profiling.Profiler()
+
+        tick_budget = self.configuration.get('tick_budget')
+        self.input_system.profiler = self.profiler
+        for mode in self.modes.itervalues():
+            mode.set_profiler(self.profiler)
+            mode.rules.tick = self.rule_interval
+            if tick_budget is not None:
+                mode.rules.tick_budget = tick_budget / 1000.0
+
         self.set_mode('intro')
 
     def _setup_window(self):
@@ -84,8 +146,6 @@ class MultiblobApplication(object):
         self.mouse_simulator = input.MouseMultitouchSimulator(self.input_system)
         self.window.push_handlers(self.mouse_simulator)
 
-        pyglet.clock.schedule_interval(self.update_rules, self.rule_interval)
-
         self.state.reset_simple()
 
     def _setup_resources(self):
@@ -94,37 +154,92 @@ class MultiblobApplication(object):
         pyglet.resource.reindex()
 
     def _setup_network(self):
-        self.log.info(u"Setting up networking...")
-        self.runner = schedulers.Scheduler()
-        self._runner_iter = self.runner.iter_run()
-        pyglet.clock.schedule_interval(self._step_network, self.network_interval)
+        if self.configuration.get('replay'):
+            self.log.info(u"Replaying input from '%s'...", self.configuration['replay'])
+            self.replayer = recording.InputReplayer(self.replay_recording, self.input_system)
+            self._replay_start_time = timing.clock()
+            if not self.configuration.get('asyncio', False):
+                pyglet.clock.schedule_interval(self._step_replay, self.network_interval)
+            return
+
+        if self.configuration.get('record'):
+            self.log.info(u"Recording input to '%s'...", self.configuration['record'])
+            self.recorder = recording.InputRecorder(self.configuration['record'], self.state.seed)
+
+        if self.configuration.get('asyncio', False):
+            # the asyncio loop opens its own endpoint
+            return
 
+        self.log.info(u"Setting up networking...")
         self.log.info(u"Listening on port '%d'...", self.udp_port)
-        self.udp_socket = sockets.Socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.udp_socket.bind((self.udp_address, self.udp_port))
+        self.udp_receiver = network.UdpReceiver(
+                self.udp_address,
+                self.udp_port,
+                receive_buffer = self.configuration.get('receive_buffer'),
+                )
+        if self.configuration.get('receiver_thread', False):
+            self.receiver_thread = network.ReceiverThread(self.udp_receiver, self._parse_udp)
+            self.receiver_thread.start()
+        else:
+            pyglet.clock.schedule_interval(self._step_network, self.network_interval)
 
     def update_rules(self, dt):
+        if self.receiver_thread is not None:
+            for chunk_id, events in self.receiver_thread.take():
+                self.input_system.queue_chunk(chunk_id, events)
+        self.input_system.flush()
         if self.mode:
             self.mode.update_rules(dt)
 
     def _cleanup_network(self):
-        self.log.info(u"Closing UDP socket...")
-        self.udp_socket.close()
+        if self.replayer is not None:
+            return
+        if self.receiver_thread is not None:
+            self.log.info(u"Stopping receiver thread, %d chunks dropped...",
+                    self.receiver_thread.dropped_count)
+            self.receiver_thread.stop()
+        if self.udp_receiver is not None:
+            self.log.info(u"Closing UDP socket...")
+            self.udp_receiver.close()
+            self.log.info(u"Received %d datagrams, %d invalid, backlog in %d steps.",
+                    self.udp_receiver.datagram_count,
+                    self.udp_receiver.invalid_count,
+                    self.udp_receiver.backlog_count,
+                    )
+        self.log.info(u"%d chunks dropped, %d chunks late.",
+                self.input_system.dropped_chunk_count,
+                self.input_system.late_chunk_count,
+                )
+        if self.recorder is not None:
+            self.recorder.close()
 
     def _step_network(self, dt):
-        try:
-            self._runner_iter.next()
-        except StopIteration:
-            self.runner.add(self._receive_udp)
-            self._runner_iter = self.runner.iter_run()
-
-    @coroutines.coro
-    def _receive_udp(self):
-        while True:
-            data = yield self.udp_socket.recv(1024)
-            self.log.debug(u"Received UDP data: '%s'.", data)
-            self.input_system.parse_packet(data)
+        self.udp_receiver.drain(self._receive_udp)
+        self.input_system.flush()
+
+    def _receive_udp(self, data):
+        received_time = timing.clock()
+        self.log.debug(u"Received UDP data: '%s'.", data)
+        if self.recorder is not None:
+            self.recorder.write(data, received_time)
+        self.input_system.parse_packet(data, received_time)
+
+    def _parse_udp(self, data):
+        # runs on the receiver thread, the chunk id is counted on the main
+        # thread in update_rules
+        received_time = timing.clock()
+        if self.recorder is not None:
+            self.recorder.write(data, received_time)
+        return [ self.input_system.parse_chunk(data, received_time) ]
+
+    def _step_replay(self, dt):
+        if self.replayer.finished:
+            return
+        self.replayer.feed_until(timing.clock() - self._replay_start_time)
+        self.input_system.flush()
+        if self.replayer.finished:
+            self.log.info(u"Replay finished after %d datagrams.", self.replayer.count)
+            pyglet.clock.unschedule(self._step_replay)
 
     def set_mode(self, mode_name):
         if mode_name in self.modes:
@@ -132,6 +247,8 @@ class MultiblobApplication(object):
                 self.mode.deactivate()
             self.mode = self.modes[mode_name]
             self.mode.activate()
+            if mode_name == 'main' and self.recorder is not None:
+                self.recorder.write_setup(self.state)
         else:
             self.log.error(u"Failed to switch to mode '%s': No such mode known.", mode_name)
 
@@ -149,11 +266,20 @@ class MultiblobApplication(object):
         self._setup_network()
 
         self.log.info(u"Starting mainloop...")
-        pyglet.app.run()
+        if self.configuration.get('asyncio', False):
+            aioloop.AsyncioLoop(self,
+                    receive_buffer = self.configuration.get('receive_buffer'),
+                    ).run()
+        else:
+            pyglet.clock.schedule_interval(self.update_rules, self.rule_interval)
+            pyglet.app.run()
         self.log.info(u"Mainloop done, exiting...")
 
         self._cleanup_network()
 
+        if self.profiler is not None:
+            self.profiler.dump(sys.stdout)
+
         return 0
 
 def main():
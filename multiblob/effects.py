@@ -0,0 +1,51 @@
+"""Audiovisual side effects of the game rules go here.
+
+Rules trigger sounds and advance particles only through these sinks, so they
+can run headless with the null implementations.
+"""
+
+class SoundEffect(object):
+    """A sound resource played through pyglet."""
+
+    def __init__(self, name, loop=False):
+        """Load a sound effect.
+
+        Parameters
+        ----------
+        name : str
+            the name of the sound resource
+        loop : bool (optional, defaults to False)
+            if True the sound loops until paused, otherwise every `play`
+            plays it once
+        """
+        import pyglet
+
+        self.loop = loop
+        self._source = pyglet.resource.media(name, streaming=False)
+        self._player = pyglet.media.Player()
+        if self.loop:
+            self._player.queue(self._source)
+            self._player.eos_action = pyglet.media.Player.EOS_LOOP
+
+    def play(self):
+        if not self.loop:
+            self._player.queue(self._source)
+        self._player.play()
+
+    def pause(self):
+        self._player.pause()
+
+class NullSoundEffect(object):
+    """A sound effect that stays silent."""
+
+    def play(self):
+        pass
+
+    def pause(self):
+        pass
+
+class NullParticleSystem(object):
+    """A particle system without particles."""
+
+    def update(self, dt):
+        pass
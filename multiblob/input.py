@@ -3,7 +3,7 @@ import re
 
 import pyglet
 
-from multiblob import euclid
+from multiblob import euclid, protocol, timing
 
 class InvalidEventDataError(Exception):
     pass
@@ -27,6 +27,20 @@ class MultitouchEvent(object):
             3 : "NO_TYPE",
             }
 
+    # the tables above keyed by the digits as they appear in a packet
+    _object_type_names = dict((str(k), v) for k, v in object_types.iteritems())
+    _object_state_names = dict((str(k), v) for k, v in object_states.iteritems())
+
+    # True once the event was dispatched as part of an on_multitouch_frame
+    in_frame = False
+
+    # timing.clock() timestamps of the way from the network to the screen
+    received_time = None
+    parsed_time = None
+    dispatched_time = None
+    applied_time = None
+    rendered_time = None
+
     def __init__(self, object_type, object_id, object_state, pos_x, pos_y, area,
             height, width, orientation):
         self.object_type  = object_type
@@ -59,6 +73,92 @@ class MultitouchEvent(object):
                 pass
         raise InvalidEventDataError("Could not parse data: '%s'" % packet_data)
     
+    @classmethod
+    def match_chunk(cls, data):
+        """Return the groups of `packet_re` for every input object of a chunk
+        without its header, or None if the chunk holds anything else than
+        complete input objects separated by '//'."""
+        matches = []
+        position = 0
+        end = len(data)
+        while data.startswith('//', position):
+            position += 2
+        for match in cls.packet_re.finditer(data):
+            if match.start() != position:
+                return None
+            position = match.end()
+            if position != end and not data.startswith('//', position):
+                return None
+            while data.startswith('//', position):
+                position += 2
+            matches.append(match.groups())
+        if position != end:
+            return None
+        return matches
+
+    @classmethod
+    def from_chunk(cls, data, width=1.0, height=1.0):
+        """Parse all input objects of a chunk without its header in one pass
+        and return the events scaled to the given dimensions."""
+        matches = cls.match_chunk(data)
+        if matches is None:
+            # let the object parser decide on the objects one by one
+            objects = data.split('//')
+            events = [ cls.from_packet(x) for x in objects if x ]
+            for event in events:
+                event.scale_to_dimensions(width, height)
+            return events
+
+        width = float(width)
+        height = float(height)
+        area_factor = width * height
+        object_types = cls._object_type_names
+        object_states = cls._object_state_names
+        # width and height are swapped in the same way as in from_packet
+        try:
+            return [ cls(
+                        object_types[object_type],
+                        int(object_id),
+                        object_states[object_state],
+                        float(pos_x) * width,
+                        (1.0 - float(pos_y)) * height,
+                        float(area) * area_factor,
+                        float(object_width) * height,
+                        float(object_height) * width,
+                        float(orientation),
+                        )
+                    for object_type, object_id, object_state, pos_x, pos_y, area,
+                        object_width, object_height, orientation in matches ]
+        except ValueError, e:
+            raise InvalidEventDataError("Could not parse data: '%s' (%s)" % (data, e))
+
+    @classmethod
+    def from_records(cls, records, width=1.0, height=1.0):
+        """Return the events of a record array of the binary protocol scaled
+        to the given dimensions."""
+        width = float(width)
+        height = float(height)
+        area_factor = width * height
+        object_types = cls.object_types
+        object_states = cls.object_states
+        try:
+            # width and height are swapped in the same way as in from_packet
+            return [ cls(
+                        object_types[object_type],
+                        object_id,
+                        object_states[object_state],
+                        pos_x * width,
+                        (1.0 - pos_y) * height,
+                        area * area_factor,
+                        object_width * height,
+                        object_height * width,
+                        orientation,
+                        )
+                    for object_type, object_id, object_state, pos_x, pos_y, area,
+                        object_width, object_height, orientation in records.tolist() ]
+        except KeyError, e:
+            raise InvalidEventDataError("Unknown object type or state: %s" % e)
+
     def scale_to_dimensions(self, width, height):
         """Multiply all spacial parameters with the width and height factors."""
         self.pos_x *= float(width)
@@ -89,41 +189,197 @@ class MultitouchEvent(object):
         return euclid.Point2(self.pos_x, self.pos_y)
 
 class InputSystem(pyglet.event.EventDispatcher):
-    def __init__(self, application):
+    # chunk ids further behind than this mean the tracker was restarted
+    CHUNK_RESTART_WINDOW = 1000
+
+    def __init__(self, application, coalesce_moved=False):
+        """Create a new input system.
+
+        Parameters
+        ----------
+        application : MultiblobApplication
+            the application providing the window dimensions
+        coalesce_moved : bool (optional, defaults to False)
+            if True, parsed events are queued until `flush` and only the
+            latest MOVED event of each object is dispatched
+        """
         pyglet.event.EventDispatcher.__init__(self)
         self.log = logging.getLogger("multiblob.input")
 
         self.application = application
+        self.coalesce_moved = coalesce_moved
+        self.profiler = None # a profiling.Profiler, if latencies are recorded
+        self._pending_events = []
+        self._pending_moved = {} # object id -> index in _pending_events
+        self.coalesced_event_count = 0
 
-    def parse_packet(self, data):
-        input_objects = [ x for x in data.split(r'//') if x ]
-        if len(input_objects) > 1:
-            chunk_id = int(input_objects[0][8:])
-            #self.log.debug(u"Received chunk %d with %d input objects.", 
-            #        chunk_id, 
-            #        len(input_objects) - 1
-            #        )
-            for input_object in input_objects[1:]:
-                event = MultitouchEvent.from_packet(input_object)
-                self.log.debug(u"Parsed event: %s" % str(event))
-                event.scale_to_dimensions(
-                        self.application.state.window_width, 
-                        self.application.state.window_height
-                        )
-                if event.object_state == "DOWN":
-                    self.dispatch_event('on_multitouch_down', event)
-                elif event.object_state == "UP":
-                    self.dispatch_event('on_multitouch_up', event)
-                elif event.object_state == "MOVED":
-                    self.dispatch_event('on_multitouch_moved', event)
+        self.last_chunk_id = None
+        self.dropped_chunk_count = 0
+        self.late_chunk_count = 0
+
+    def check_chunk_id(self, chunk_id):
+        """Count the chunks missing before or arriving after `chunk_id`."""
+        if self.last_chunk_id is not None:
+            if chunk_id > self.last_chunk_id + 1:
+                self.dropped_chunk_count += chunk_id - self.last_chunk_id - 1
+                self.log.warning(u"Dropped %d chunks before chunk %d.",
+                        chunk_id - self.last_chunk_id - 1, chunk_id)
+            elif chunk_id < self.last_chunk_id - self.CHUNK_RESTART_WINDOW:
+                self.log.info(u"Chunk ids restarted at %d.", chunk_id)
+            elif chunk_id <= self.last_chunk_id:
+                self.late_chunk_count += 1
+                self.log.warning(u"Chunk %d arrived after chunk %d.",
+                        chunk_id, self.last_chunk_id)
+                return
+        self.last_chunk_id = chunk_id
+
+    state_event_types = {
+            "DOWN"  : 'on_multitouch_down',
+            "UP"    : 'on_multitouch_up',
+            "MOVED" : 'on_multitouch_moved',
+            }
+
+    def parse_events(self, data, received_time=None):
+        """Return the MultitouchEvents of a packet scaled to the window
+        dimensions without dispatching them, and count its chunk id.
+
+        Parameters
+        ----------
+        data : str
+            the datagram
+        received_time : float (optional, defaults to None)
+            the `timing.clock` time the datagram was received, defaults to
+            now
+        """
+        chunk_id, events = self.parse_chunk(data, received_time)
+        if chunk_id is not None:
+            self.check_chunk_id(chunk_id)
+        return events
+
+    def parse_chunk(self, data, received_time=None):
+        """Return the chunk id (None for an empty datagram) and the
+        MultitouchEvents of a packet like `parse_events`, but leave the chunk
+        id bookkeeping to the caller. Only reads the input system, so it may
+        run on another thread than the one queueing the events."""
+        if received_time is None:
+            received_time = timing.clock()
+        chunk_id, events = self._parse(data)
+        parsed_time = timing.clock()
+        for event in events:
+            event.received_time = received_time
+            event.parsed_time = parsed_time
+        if self.log.isEnabledFor(logging.DEBUG):
+            for event in events:
+                self.log.debug(u"Parsed event: %s", event)
+        return chunk_id, events
+
+    def _parse(self, data):
+        if protocol.is_binary(data):
+            return self._parse_binary(data)
+
+        if not data:
+            return None, []
+        header_end = data.find('//')
+        if header_end < 0:
+            # only a header
+            header, body = data, ''
         else:
+            header, body = data[:header_end], data[header_end+2:]
+        if header[:8].lower() != "chunkid:":
+            raise InvalidEventDataError("Missing chunk header: '%s'" % data)
+        try:
+            chunk_id = int(header[8:])
+        except ValueError:
+            raise InvalidEventDataError("Invalid chunk header: '%s'" % header)
+        if not body:
             # we get many empty chunks when all touches stay on their positions
-            pass
-#            raise InvalidEventDataError("No input objects found in: '%s'" % data)
+            return chunk_id, []
+
+        return chunk_id, MultitouchEvent.from_chunk(
+                body,
+                self.application.state.window_width,
+                self.application.state.window_height,
+                )
+
+    def _parse_binary(self, data):
+        try:
+            chunk_id, records = protocol.decode(data)
+        except protocol.InvalidFrameError, e:
+            raise InvalidEventDataError("Could not parse binary data: %s" % e)
+        return chunk_id, MultitouchEvent.from_records(
+                records,
+                self.application.state.window_width,
+                self.application.state.window_height,
+                )
+
+    def dispatch_events(self, events):
+        """Dispatch parsed MultitouchEvents in order.
+
+        Before the single events, all events are dispatched at once as
+        `on_multitouch_frame`. Handlers of the frame can ignore the single
+        events that are part of a frame by checking their `in_frame`
+        attribute.
+        """
+        if not events:
+            return
+        dispatched_time = timing.clock()
+        for event in events:
+            event.in_frame = True
+            event.dispatched_time = dispatched_time
+        if self.profiler is not None:
+            self.profiler.latency.dispatched(events)
+        self.dispatch_event('on_multitouch_frame', events)
+        for event in events:
+            event_type = self.state_event_types.get(event.object_state)
+            if event_type is not None:
+                self.dispatch_event(event_type, event)
+
+    def queue_events(self, events):
+        """Dispatch parsed events, or queue them until `flush` when
+        coalescing MOVED events."""
+        if not self.coalesce_moved:
+            self.dispatch_events(events)
+            return
+
+        pending_events = self._pending_events
+        pending_moved = self._pending_moved
+        for event in events:
+            if event.object_state == "MOVED":
+                index = pending_moved.get(event.object_id)
+                if index is None:
+                    pending_moved[event.object_id] = len(pending_events)
+                    pending_events.append(event)
+                else:
+                    # no DOWN or UP of this object since, so the newer
+                    # position can take the place of the older one
+                    pending_events[index] = event
+                    self.coalesced_event_count += 1
+            else:
+                pending_moved.pop(event.object_id, None)
+                pending_events.append(event)
+
+    def flush(self):
+        """Dispatch all queued events."""
+        if self._pending_events:
+            events = self._pending_events
+            self._pending_events = []
+            self._pending_moved.clear()
+            self.dispatch_events(events)
+
+    def queue_chunk(self, chunk_id, events):
+        """Count the chunk id and queue the events of a chunk parsed with
+        `parse_chunk`."""
+        if chunk_id is not None:
+            self.check_chunk_id(chunk_id)
+        self.queue_events(events)
+
+    def parse_packet(self, data, received_time=None):
+        self.queue_events(self.parse_events(data, received_time))
 
 InputSystem.register_event_type('on_multitouch_down')
 InputSystem.register_event_type('on_multitouch_up')
 InputSystem.register_event_type('on_multitouch_moved')
+InputSystem.register_event_type('on_multitouch_frame')
 
 class MouseMultitouchSimulator(object):
     def __init__(self, input_system):
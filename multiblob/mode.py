@@ -1,6 +1,6 @@
 import logging
 
-from multiblob import rule
+from multiblob import rule, timing
 
 class Mode(object):
     def __init__(self, state, renderers=[], rules=[]):
@@ -10,6 +10,7 @@ class Mode(object):
                 rules = rules,
                 )
         self.renderers = renderers
+        self.profiler = None # a profiling.Profiler, if timings are recorded
 
         self.log = logging.getLogger(self.__class__.__name__)
 
@@ -18,8 +19,21 @@ class Mode(object):
             self.rules.update(dt)
 
     def render(self):
-        for renderer in self.renderers:
-            renderer.render(self.state)
+        if self.profiler is None:
+            for renderer in self.renderers:
+                renderer.render(self.state)
+        else:
+            for renderer in self.renderers:
+                start_time = timing.clock()
+                renderer.render(self.state)
+                self.profiler.record('render.' + renderer.__class__.__name__,
+                        timing.clock() - start_time)
+
+    def set_profiler(self, profiler):
+        """Record the timings of rules and renderers with `profiler`, None to
+        stop recording."""
+        self.profiler = profiler
+        self.rules.set_profiler(profiler)
 
     def activate(self):
         self.log.info(u"Activating mode '%s'...", self.__class__.__name__)
@@ -1,4 +1,4 @@
-from multiblob import mode, renderers, rules
+from multiblob import effects, mode, renderers, rules
 
 class MainMode(mode.Mode):
     def __init__(self, application):
@@ -10,17 +10,36 @@ class MainMode(mode.Mode):
                     renderers.DebugRenderer(),
                     renderers.PowerupRenderer(),
                     ],
-                rules = [
-                    rules.InputInterpreterRule(application.input_system),
-                    rules.BlobMovementRule(),
-                    rules.BlobGenerationRule(),
-                    rules.BlobCombat(),
-                    rules.FacetOwnershipRule(),
-                    rules.LastBlobStandingVictoyRule(application),
-                    rules.PowerupCollectionRule(),
-                    rules.PowerupGenerationRule(),
-                    ]
+                rules = self.create_rules(application),
                 )
 
         self.application = application
 
+    @staticmethod
+    def create_rules(application, headless=False):
+        """Return the rules of the main mode.
+
+        Parameters
+        ----------
+        application : MultiblobApplication or simulation.HeadlessApplication
+            the application providing the input system and mode switching
+        headless : bool (optional, defaults to False)
+            if True the rules play no sounds, update no particles and draw no
+            debug objects
+        """
+        if headless:
+            sound = effects.NullSoundEffect()
+            particle_system = effects.NullParticleSystem()
+        else:
+            sound = particle_system = None
+        return [
+                rules.InputInterpreterRule(application.input_system, debug=not headless),
+                rules.BlobMovementRule(particle_system),
+                rules.BlobGenerationRule(),
+                rules.BlobCombat(sound),
+                rules.FacetOwnershipRule(),
+                rules.LastBlobStandingVictoyRule(application),
+                rules.PowerupCollectionRule(sound),
+                rules.PowerupGenerationRule(sound),
+                ]
+
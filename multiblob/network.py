@@ -0,0 +1,166 @@
+"""Network input of the tracker goes here."""
+
+import collections
+import errno
+import logging
+import socket
+import threading
+
+from multiblob import input
+
+class UdpReceiver(object):
+    """A non-blocking UDP socket, which is drained once per network step.
+
+    Reading everything that arrived since the last step keeps the input
+    latency independent of the tracker's send rate, while the batch size
+    bounds the time a single step may take.
+    """
+
+    MAX_DATAGRAM_SIZE = 65535
+
+    def __init__(self, address, port, batch_size=256, receive_buffer=None):
+        """Bind a new UDP socket.
+
+        Parameters
+        ----------
+        address : str
+            the address to listen on
+        port : int
+            the port to listen on
+        batch_size : int (optional, defaults to 256)
+            the maximum number of datagrams read per `drain`
+        receive_buffer : int (optional, defaults to None)
+            the requested size of the kernel receive buffer (SO_RCVBUF) in
+            bytes, defaults to the system default
+        """
+        self.log = logging.getLogger("multiblob.network")
+        self.batch_size = batch_size
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if receive_buffer is not None:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+            self.log.info(u"Requested a receive buffer of %d bytes, got %d bytes.",
+                    receive_buffer,
+                    self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+                    )
+        self.socket.bind((address, port))
+        self.socket.setblocking(False)
+
+        self.datagram_count = 0
+        self.backlog_count = 0 # number of drains that left datagrams pending
+        self.invalid_count = 0 # number of datagrams the handler rejected
+
+    def drain(self, handler):
+        """Call `handler` with every pending datagram, up to the batch size.
+        Datagrams the handler rejects as invalid are logged, counted and
+        skipped. Returns the number of datagrams read."""
+        count = 0
+        while count < self.batch_size:
+            data = self._receive_nowait()
+            if data is None:
+                break
+            count += 1
+            try:
+                handler(data)
+            except input.InvalidEventDataError, e:
+                self.invalid_count += 1
+                self.log.error(u"Dropped invalid datagram '%s': %s", data, e)
+        else:
+            if self._receive_nowait(socket.MSG_PEEK) is not None:
+                self.backlog_count += 1
+                self.log.warning(u"Input backlog: more than %d datagrams pending.",
+                        self.batch_size)
+        self.datagram_count += count
+        return count
+
+    def _receive_nowait(self, flags=0):
+        """Return the next pending datagram, or None if there is none."""
+        try:
+            return self.socket.recv(self.MAX_DATAGRAM_SIZE, flags)
+        except socket.error, e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return None
+            raise
+
+    def receive(self, timeout):
+        """Wait up to `timeout` seconds for a datagram and return it, or None
+        if nothing arrived. Only for use by a single receiving thread."""
+        self.socket.settimeout(timeout)
+        try:
+            data = self.socket.recv(self.MAX_DATAGRAM_SIZE)
+        except socket.timeout:
+            return None
+        self.datagram_count += 1
+        return data
+
+    def close(self):
+        self.socket.close()
+
+class ReceiverThread(threading.Thread):
+    """Receives and parses datagrams off the main thread.
+
+    The parsed items are handed to the main thread through a bounded deque,
+    whose appends and pops are atomic, so neither side ever waits for the
+    other. When the main thread falls behind, the oldest items are dropped.
+    `parse` must not change state shared with the main thread; bookkeeping
+    is left to the main thread when it takes the items.
+    """
+
+    POLL_TIMEOUT = 0.1 # seconds between checks for `stop`
+
+    def __init__(self, receiver, parse, queue_size=4096):
+        """Create a new, not yet started receiver thread.
+
+        Parameters
+        ----------
+        receiver : UdpReceiver
+            the socket to receive from, owned by the thread from now on
+        parse : callable
+            called with each datagram on the receiver thread, returns a list
+            of items
+        queue_size : int (optional, defaults to 4096)
+            the maximum number of items waiting for the main thread
+        """
+        threading.Thread.__init__(self, name="multiblob-receiver")
+        self.daemon = True
+        self.log = logging.getLogger("multiblob.network")
+
+        self.receiver = receiver
+        self.parse = parse
+        self.items = collections.deque(maxlen=queue_size)
+        self.dropped_count = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            data = self.receiver.receive(self.POLL_TIMEOUT)
+            if data is None:
+                continue
+            try:
+                items = self.parse(data)
+            except Exception:
+                self.log.exception(u"Failed to parse UDP data: '%s'.", data)
+                continue
+            overflow = len(self.items) + len(items) - self.items.maxlen
+            if overflow > 0:
+                self.dropped_count += overflow
+                self.log.warning(u"Input queue full, dropped %d items.", overflow)
+            self.items.extend(items)
+
+    def take(self):
+        """Return all items queued so far, for use by the main thread."""
+        items = []
+        pop = self.items.popleft
+        try:
+            while True:
+                items.append(pop())
+        except IndexError:
+            pass
+        return items
+
+    def stop(self):
+        """Stop receiving and wait for the thread to finish."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
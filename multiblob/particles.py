@@ -0,0 +1,157 @@
+"""The particles drawn for the blobs.
+
+All particles live in contiguous NumPy arrays (one row per particle), every
+particle is owned by one blob and is attracted by it.
+"""
+import numpy
+
+class ParticleSystem(object):
+    """Keeps and advances the particles of many blobs.
+
+    The renderer tells the system which blobs are alive with `set_blobs`, the
+    rules advance it with `update`.
+    """
+
+    PARTICLE_RATIO = 1.0/10.0 # particles per unit of blob radius
+    PARTICLE_SIZE_FACTOR = 4.5/3.0 # particle size per unit of blob radius
+    JITTER_FACTOR = 2.0 # target deviation per unit of blob radius
+    ATTRACTION = 0.1 # share of the distance to the target added to the velocity
+    DAMPING = 0.9 # share of the velocity kept per update
+
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, capacity=INITIAL_CAPACITY, seed=None):
+        """Create a new, empty particle system.
+
+        Parameters
+        ----------
+        capacity : int (optional, defaults to INITIAL_CAPACITY)
+            the number of particles to allocate initially
+        seed : int (optional)
+            the seed of the jitter, random if not given
+        """
+        self.capacity = max(int(capacity), 1)
+        self.count = 0
+        self.position = numpy.zeros((self.capacity, 2))
+        self.velocity = numpy.zeros((self.capacity, 2))
+        self.size = numpy.zeros(self.capacity)
+        self.colour = numpy.zeros((self.capacity, 4))
+        self.owner = numpy.zeros(self.capacity, dtype=numpy.int32)
+        self.blobs = [] # mapping of owner index -> Blob
+        self.random = numpy.random.RandomState(seed)
+
+    def set_blobs(self, blobs):
+        """Set the blobs, that own particles. The particles of blobs, that are
+        not in `blobs` anymore, are removed; new blobs get their particles
+        with the next `update`."""
+        if len(blobs) == len(self.blobs) and \
+                all(blob is known_blob for blob, known_blob in zip(blobs, self.blobs)):
+            return
+        indices = dict((id(blob), index) for index, blob in enumerate(blobs))
+        remap = numpy.array([ indices.get(id(blob), -1) for blob in self.blobs ],
+                dtype=numpy.int32)
+        owner = remap[self.owner[:self.count]]
+        self.blobs = list(blobs)
+        self.owner[:self.count] = owner
+        self._keep(numpy.flatnonzero(owner >= 0))
+
+    def _keep(self, rows):
+        """Keep only the particles in `rows`, in that order."""
+        count = len(rows)
+        if count == self.count:
+            return
+        for column in (self.position, self.velocity, self.size, self.colour, self.owner):
+            column[:count] = column[rows]
+        self.count = count
+
+    def _blob_columns(self):
+        """Return the positions and radii of the blobs."""
+        blobs = self.blobs
+        positions = numpy.array([ (blob.pos_x, blob.pos_y) for blob in blobs ],
+                dtype=float).reshape(-1, 2)
+        radii = numpy.array([ blob.radius for blob in blobs ], dtype=float)
+        return positions, radii
+
+    def _adjust_counts(self, positions, radii):
+        """Add or remove particles until every blob owns its share."""
+        wanted = (radii * self.PARTICLE_RATIO).astype(int)
+        owner = self.owner[:self.count]
+        present = numpy.bincount(owner, minlength=len(self.blobs))
+
+        surplus = present > wanted
+        if surplus.any():
+            order = numpy.argsort(owner, kind='mergesort')
+            starts = numpy.concatenate(([0], numpy.cumsum(present)[:-1]))
+            ranks = numpy.empty(self.count, dtype=int)
+            ranks[order] = numpy.arange(self.count) - starts[owner[order]]
+            self._keep(numpy.flatnonzero(ranks < wanted[owner]))
+
+        missing = numpy.maximum(wanted - present, 0)
+        added = int(missing.sum())
+        if added:
+            owners = numpy.repeat(numpy.arange(len(self.blobs)), missing)
+            self._reserve(self.count + added)
+            new = slice(self.count, self.count + added)
+            self.position[new] = positions[owners]
+            self.velocity[new] = 0.0
+            self.size[new] = radii[owners] * self.PARTICLE_SIZE_FACTOR
+            self.colour[new] = [ self.blobs[index].player.colour for index in owners ]
+            self.owner[new] = owners
+            self.count += added
+
+    def _reserve(self, count):
+        if count <= self.capacity:
+            return
+        capacity = max(count, 2 * self.capacity)
+        for name in ('position', 'velocity', 'size', 'colour', 'owner'):
+            column = getattr(self, name)
+            grown = numpy.zeros((capacity, ) + column.shape[1:], dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def update(self, dt):
+        """Advance all particles by `dt` seconds: every particle is attracted
+        by a random point around its blob, damped and moved."""
+        if not self.blobs:
+            self.count = 0
+            return
+        positions, radii = self._blob_columns()
+        self._adjust_counts(positions, radii)
+        count = self.count
+        if not count:
+            return
+        owner = self.owner[:count]
+        position = self.position[:count]
+        velocity = self.velocity[:count]
+
+        deviation = (radii * self.JITTER_FACTOR)[owner, numpy.newaxis]
+        targets = positions[owner] + \
+                self.random.uniform(-1.0, 1.0, (count, 2)) * deviation
+        velocity *= self.DAMPING
+        velocity += (targets - position) * self.ATTRACTION
+        position += velocity * dt
+        self.size[:count] = radii[owner] * self.PARTICLE_SIZE_FACTOR
+
+    def quads(self):
+        """Return the corners of the particle quads as an array of shape
+        (count, 4, 2), counter-clockwise starting at the lower left."""
+        half = self.size[:self.count, numpy.newaxis] / 2.0
+        lower_left = self.position[:self.count] - half
+        upper_right = self.position[:self.count] + half
+        return numpy.stack((
+                lower_left,
+                numpy.column_stack((upper_right[:, 0], lower_left[:, 1])),
+                upper_right,
+                numpy.column_stack((lower_left[:, 0], upper_right[:, 1])),
+                ), axis=1)
+
+    def clear(self):
+        """Remove all particles and blobs."""
+        self.blobs = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+default_system = ParticleSystem()
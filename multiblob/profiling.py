@@ -0,0 +1,145 @@
+"""Timing instrumentation for rules and renderers."""
+
+import collections
+import contextlib
+
+from multiblob import timing
+
+class Histogram(object):
+    """A rolling window of the most recent samples of a measurement."""
+
+    PERCENTILES = [50, 95, 99]
+
+    def __init__(self, size=1024):
+        """Create a new, empty histogram.
+
+        Parameters
+        ----------
+        size : int (optional, defaults to 1024)
+            the number of recent samples to keep
+        """
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0 # number of samples ever added
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+
+    @staticmethod
+    def _nearest_rank(samples, percent):
+        if not samples:
+            return 0.0
+        return samples[int(round(percent / 100.0 * (len(samples) - 1)))]
+
+    def percentile(self, percent):
+        """Return the given percentile of the samples in the window using the
+        nearest rank method."""
+        return self._nearest_rank(sorted(self.samples), percent)
+
+    def summary(self):
+        """Return a dict with count, mean, min, max and percentiles of the
+        samples in the window."""
+        samples = sorted(self.samples)
+        result = {
+                'count' : self.count,
+                'mean'  : sum(samples) / len(samples) if samples else 0.0,
+                'min'   : samples[0] if samples else 0.0,
+                'max'   : samples[-1] if samples else 0.0,
+                }
+        for percent in self.PERCENTILES:
+            result['p%d' % percent] = self._nearest_rank(samples, percent)
+        return result
+
+class LatencyTracker(object):
+    """Follows touch events from their receipt to the rendered effect.
+
+    All latencies are measured from the receipt of the datagram and recorded
+    by the profiler as `latency.parse`, `latency.dispatch`, `latency.apply`
+    (the first simulation tick acting on the touch) and `latency.render`
+    (the first frame drawn after that).
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._touched = collections.deque(maxlen=profiler.window)
+        self._applied = collections.deque(maxlen=profiler.window)
+
+    def dispatched(self, events):
+        """Record the parse and dispatch latencies of `events`."""
+        record = self.profiler.record
+        for event in events:
+            if event.received_time is not None:
+                record('latency.parse', event.parsed_time - event.received_time)
+                record('latency.dispatch', event.dispatched_time - event.received_time)
+
+    def touched(self, event):
+        """Note that a rule acted on `event`, e.g. by moving a blob."""
+        if event.received_time is not None:
+            self._touched.append(event)
+
+    def applied(self):
+        """Note that the simulation applied all touches so far."""
+        now = timing.clock()
+        while self._touched:
+            event = self._touched.popleft()
+            event.applied_time = now
+            self.profiler.record('latency.apply', now - event.received_time)
+            self._applied.append(event)
+
+    def rendered(self):
+        """Note that a frame showing all applied touches was drawn."""
+        now = timing.clock()
+        while self._applied:
+            event = self._applied.popleft()
+            event.rendered_time = now
+            self.profiler.record('latency.render', now - event.received_time)
+
+class Profiler(object):
+    """Collects wall time measurements into named histograms.
+
+    Components that support profiling have a `profiler` attribute, which is
+    None while profiling is disabled.
+    """
+
+    def __init__(self, window=1024):
+        """Create a new profiler.
+
+        Parameters
+        ----------
+        window : int (optional, defaults to 1024)
+            the number of recent samples to keep per measurement
+        """
+        self.window = window
+        self.histograms = {}
+        self.latency = LatencyTracker(self)
+
+    def record(self, name, seconds):
+        """Add a measurement of `seconds` to the histogram `name`."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.window)
+        histogram.add(seconds)
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        """Measure the wall time of the with block."""
+        start_time = timing.clock()
+        try:
+            yield
+        finally:
+            self.record(name, timing.clock() - start_time)
+
+    def stats(self):
+        """Return a dict of measurement name -> summary dict, with times in
+        seconds."""
+        return dict((name, histogram.summary())
+                for name, histogram in self.histograms.iteritems())
+
+    def dump(self, stream):
+        """Write a table of the measurements in milliseconds to `stream`."""
+        columns = ['mean'] + [ 'p%d' % p for p in Histogram.PERCENTILES ] + ['max']
+        stream.write("%-40s %8s" % ("measurement", "count") +
+                "".join([ " %8s" % c for c in columns ]) + "\n")
+        for name, summary in sorted(self.stats().iteritems()):
+            stream.write("%-40s %8d" % (name, summary['count']) +
+                    "".join([ " %8.3f" % (summary[c] * 1000.0) for c in columns ]) + "\n")
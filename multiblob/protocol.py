@@ -0,0 +1,59 @@
+"""The binary input protocol.
+
+A datagram holds a header (magic, chunk id, record count) followed by one
+fixed size record per input object, all little-endian. The record fields
+carry the same values as the fields of the tracker's text protocol.
+"""
+import struct
+
+import numpy
+
+MAGIC = 'MBT1'
+HEADER = struct.Struct('<4sIH') # magic, chunk id, record count
+
+RECORD_DTYPE = numpy.dtype([
+    ('object_type',  '<u1'),
+    ('object_id',    '<u4'),
+    ('object_state', '<u1'),
+    ('pos_x',        '<f4'),
+    ('pos_y',        '<f4'),
+    ('area',         '<f4'),
+    ('width',        '<f4'),
+    ('height',       '<f4'),
+    ('orientation',  '<f4'),
+    ])
+
+MAX_RECORDS = 0xffff
+
+class InvalidFrameError(Exception):
+    pass
+
+def is_binary(data):
+    """Return True, if the datagram uses the binary protocol."""
+    return data[:len(MAGIC)] == MAGIC
+
+def encode(chunk_id, records):
+    """Return a datagram for the given chunk.
+
+    Parameters
+    ----------
+    chunk_id : int
+        the id of the chunk
+    records : list of tuples
+        the fields of every input object in the order of RECORD_DTYPE
+    """
+    if len(records) > MAX_RECORDS:
+        raise InvalidFrameError("Too many records: %d" % len(records))
+    return HEADER.pack(MAGIC, chunk_id, len(records)) + \
+            numpy.array(records, dtype=RECORD_DTYPE).tostring()
+
+def decode(data):
+    """Return the chunk id and a record array of a datagram."""
+    if len(data) < HEADER.size:
+        raise InvalidFrameError("Truncated header.")
+    magic, chunk_id, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise InvalidFrameError("Unknown magic: %r" % magic)
+    if len(data) != HEADER.size + count * RECORD_DTYPE.itemsize:
+        raise InvalidFrameError("Expected %d records in %d bytes." % (count, len(data)))
+    return chunk_id, numpy.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
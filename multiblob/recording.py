@@ -0,0 +1,230 @@
+"""Recording and replay of the tracker's UDP datagrams.
+
+A recording is an append-only file starting with a header holding the seed of
+the recorded game, followed by records of the arrival time in seconds since
+the start of the recording, the record kind, the data length and the data.
+Most records hold a received datagram. Whenever a game starts, a setup record
+holds the board size and the home facets and colours of the players as JSON,
+so that a replay can rebuild what was set up in the intro.
+
+Run this module to replay the games of a recording headless and print the
+tick timings, e.g. `python -m multiblob.recording session.mbrec --fast`.
+"""
+import json
+import optparse
+import struct
+import sys
+import threading
+import time
+
+from multiblob import profiling, timing
+
+MAGIC = 'MBREC2'
+HEADER = struct.Struct('<6sq') # magic, seed (-1 if unknown)
+RECORD = struct.Struct('<dBH') # arrival time, kind, data length
+
+DATAGRAM = 0
+SETUP = 1
+
+class InvalidRecordingError(Exception):
+    pass
+
+class InputRecorder(object):
+    """Writes received datagrams to a recording file.
+
+    The recorder may be written to from the receiver thread and the main
+    thread at the same time, every record is written as a whole under a lock.
+    """
+
+    def __init__(self, path, seed=None):
+        """Start a new recording.
+
+        Parameters
+        ----------
+        path : str
+            the file to write, an existing file is replaced
+        seed : int (optional, defaults to None)
+            the seed of the recorded game
+        """
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, -1 if seed is None else seed))
+        self._start_time = timing.clock()
+        self._lock = threading.Lock()
+
+    def write(self, data, arrival_time=None, kind=DATAGRAM):
+        """Append a datagram received at `arrival_time` (defaults to now, as
+        measured by `timing.clock`)."""
+        with self._lock:
+            if arrival_time is None:
+                arrival_time = timing.clock()
+            self._file.write(RECORD.pack(arrival_time - self._start_time, kind,
+                len(data)) + data)
+
+    def write_setup(self, game_state):
+        """Append the setup of the game starting now in `game_state`."""
+        home_facets = dict((id(facet.home_facet_of), facet.index)
+                for facet in game_state.facets if facet.home_facet_of)
+        self.write(json.dumps({
+                'window_width'  : game_state.window_width,
+                'window_height' : game_state.window_height,
+                'facet_count'   : list(game_state.facet_count),
+                'players'       : [ (home_facets[id(player)], list(player.colour))
+                    for player in game_state.players ],
+                }), kind=SETUP)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class InputRecording(object):
+    """Reads a recording file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as recording:
+            header = recording.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise InvalidRecordingError("Recording '%s' is too short." % path)
+        magic, seed = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise InvalidRecordingError("'%s' is not a recording." % path)
+        self.seed = None if seed < 0 else seed
+
+    def __iter__(self):
+        """Yield (arrival time, data) for every recorded datagram."""
+        for arrival_time, kind, data in self.records():
+            if kind == DATAGRAM:
+                yield arrival_time, data
+
+    def records(self):
+        """Yield (arrival time, kind, data) for every record, with the data
+        of setup records decoded."""
+        with open(self.path, 'rb') as recording:
+            recording.seek(HEADER.size)
+            while True:
+                record = recording.read(RECORD.size)
+                if len(record) < RECORD.size:
+                    break
+                arrival_time, kind, length = RECORD.unpack(record)
+                data = recording.read(length)
+                if len(data) < length:
+                    break
+                if kind == SETUP:
+                    data = json.loads(data)
+                yield arrival_time, kind, data
+
+class InputReplayer(object):
+    """Feeds a recording into an InputSystem while advancing a simulation by
+    the recorded time between the datagrams."""
+
+    def __init__(self, recording, input_system, advance=None, setup=None):
+        """Prepare a replay.
+
+        Parameters
+        ----------
+        recording : InputRecording
+            the recording to replay
+        input_system : input.InputSystem
+            the input system to feed the datagrams to
+        advance : callable (optional, defaults to None)
+            called with the recorded time that passed before each datagram,
+            e.g. `GameRuleSystem.update`
+        setup : callable (optional, defaults to None)
+            called with the decoded data of every setup record to rebuild the
+            game; if given, the datagrams before the first setup record are
+            skipped, as they belong to the intro
+        """
+        self.recording = recording
+        self.input_system = input_system
+        self.advance = advance
+        self.setup = setup
+        self.count = 0
+        self._set_up = setup is None
+        self._records = iter(recording.records())
+        self._next_record = next(self._records, None)
+        self._last_arrival_time = 0.0
+
+    @property
+    def finished(self):
+        return self._next_record is None
+
+    def feed_until(self, offset):
+        """Feed all datagrams that arrived up to `offset` seconds after the
+        start of the recording. Returns the number of datagrams fed."""
+        count = 0
+        while self._next_record is not None and self._next_record[0] <= offset:
+            arrival_time, kind, data = self._next_record
+            self._next_record = next(self._records, None)
+            if kind == SETUP:
+                if self.setup is not None:
+                    self.input_system.flush()
+                    self.setup(data)
+                    self._set_up = True
+                    self._last_arrival_time = arrival_time
+                continue
+            if not self._set_up:
+                continue
+            if self.advance is not None:
+                # the events so far must reach the rules before they run
+                self.input_system.flush()
+                self.advance(arrival_time - self._last_arrival_time)
+            self._last_arrival_time = arrival_time
+            self.input_system.parse_packet(data)
+            count += 1
+        self.input_system.flush()
+        self.count += count
+        return count
+
+    def run(self, realtime=True):
+        """Replay the rest of the recording, at the recorded speed or as fast
+        as possible. Returns the number of datagrams replayed."""
+        count = 0
+        start_time = timing.clock() - self._last_arrival_time
+        while not self.finished:
+            if not self._set_up:
+                # the skipped intro takes no time
+                start_time = timing.clock() - self._next_record[0]
+            elif realtime:
+                delay = self._next_record[0] - (timing.clock() - start_time)
+                if delay > 0.0:
+                    time.sleep(delay)
+            count += self.feed_until(self._next_record[0])
+        return count
+
+def main(args=None):
+    parser = optparse.OptionParser(usage="%prog [options] RECORDING")
+    parser.add_option("--fast", action="store_true", default=False,
+            help="Replay as fast as possible instead of at the recorded speed."
+            )
+    parser.add_option("--coalesce-moved", action="store_true", default=False,
+            help="Dispatch only the latest MOVED event of every touch per tick."
+            )
+    options, args = parser.parse_args(args)
+    if len(args) != 1:
+        parser.error("Expected exactly one recording.")
+
+    from multiblob import simulation
+
+    recording = InputRecording(args[0])
+    application = simulation.HeadlessApplication(0, recording.seed)
+    application.input_system.coalesce_moved = options.coalesce_moved
+    profiler = profiling.Profiler(window=100000)
+    application.rules.set_profiler(profiler)
+    application.input_system.profiler = profiler
+
+    start_time = timing.clock()
+    count = InputReplayer(
+            recording,
+            application.input_system,
+            application.rules.update,
+            application.start_game,
+            ).run(realtime=not options.fast)
+    duration = timing.clock() - start_time
+
+    print "Replayed %d datagrams, %d ticks in %.2f s." % (
+            count, application.rules.tick_count, duration)
+    profiler.dump(sys.stdout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,6 @@ import weakref
 
 import pyglet
 
-from multiblob import datastructures
 
 class Renderer(object):
     """A component, that can renders aspects of the game state."""
@@ -14,13 +13,21 @@ class Renderer(object):
         pass
 
 class ManagedBatch(pyglet.graphics.Batch):
+    """A batch, that tracks its vertex lists by arbitrary keys.
+
+    Keys are tracked by identity. Keys, that support weak references, are
+    not kept alive by the batch; their vertex lists are deleted when they
+    die.
+    """
+
     class DefaultKey(object):
         pass
 
     def __init__(self, *args, **kwargs):
         pyglet.graphics.Batch.__init__(self, *args, **kwargs)
 
-        self._vertex_lists = datastructures.MultiDict()
+        self._entries = {} # id(key) -> (key ref, list of vertex lists)
+        self._list_keys = {} # id(vertex list) -> id(key)
         self._default_key = self.DefaultKey
 
     def set_default_key(self, key):
@@ -35,8 +42,8 @@ class ManagedBatch(pyglet.graphics.Batch):
         yield
         self._default_key = old_key
 
-    def _clean_vertex_list(self, list_key_ref):
-        self.remove_key_ref(list_key_ref)
+    def _clean_vertex_list(self, key_id):
+        self.remove_key_ref(key_id)
 
     def _wrap_vertex_list(self, vertex_list):
         d = vertex_list.delete
@@ -50,38 +57,34 @@ class ManagedBatch(pyglet.graphics.Batch):
                 self.remove_vertex_list(vertex_list)
         vertex_list.delete = delete_wrapper
         return vertex_list
-    
+
+    def _track(self, list_key, vertex_list):
+        key_id = id(list_key)
+        entry = self._entries.get(key_id)
+        if entry is None:
+            entry = self._entries[key_id] = (self.get_key_ref(list_key), [])
+        entry[1].append(vertex_list)
+        self._list_keys[id(vertex_list)] = key_id
+        return vertex_list
+
     def get(self, list_key):
         """Returns the vertex lists tracked using the given `list_key`."""
-        return self._vertex_lists.getlist(self.get_key_ref(list_key))
+        entry = self._entries.get(id(list_key))
+        if entry is None:
+            return []
+        return entry[1]
 
     def set(self, list_key, *args, **kwargs):
         """Add a vertex list as with Batch.add and track it using the given
         `list_key`."""
-        vertex_list = self._wrap_vertex_list(pyglet.graphics.Batch.add(
-                self, 
-                *args, 
-                **kwargs
-                ))
-        self._vertex_lists.setlistdefault(
-                self.get_key_ref(list_key),
-                []
-                ).append(vertex_list)
-        return vertex_list
+        return self._track(list_key, self._wrap_vertex_list(
+            pyglet.graphics.Batch.add(self, *args, **kwargs)))
 
     def set_indexed(self, list_key, *args, **kwargs):
         """Add an indexed vertex list as with Batch.add_indexed and track it
         using the given `list_key`."""
-        vertex_list = self._wrap_vertex_list(pyglet.graphics.Batch.add_indexed(
-                self, 
-                *args, 
-                **kwargs
-                ))
-        self._vertex_lists.setlistdefault(
-                self.get_key_ref(list_key),
-                []
-                ).append(vertex_list)
-        return vertex_list
+        return self._track(list_key, self._wrap_vertex_list(
+            pyglet.graphics.Batch.add_indexed(self, *args, **kwargs)))
 
     def add(self, *args, **kwargs):
         return self.set(self._default_key, *args, **kwargs)
@@ -92,44 +95,86 @@ class ManagedBatch(pyglet.graphics.Batch):
     def remove(self, list_key):
         """Remove a vertex list with the given `list_key`. Also calls
         `VertexList.delete`."""
-        self.remove_key_ref(self.get_key_ref(list_key))
+        self.remove_key_ref(id(list_key))
 
     def get_key_ref(self, key):
+        """Return a reference to `key`, that does not keep it alive if
+        possible."""
+        key_id = id(key)
+        entry = self._entries.get(key_id)
+        if entry is not None:
+            return entry[0]
         try:
-            return weakref.ref(key, self._clean_vertex_list)
+            return weakref.ref(key, lambda ref: self._clean_vertex_list(key_id))
         except TypeError:
             return key
 
-    def remove_key_ref(self, list_key_ref):
-        for vertex_list in self._vertex_lists.getlist(list_key_ref):
+    def remove_key_ref(self, key_id):
+        """Delete the vertex lists of the key with the id `key_id`."""
+        entry = self._entries.pop(key_id, None)
+        if entry is None:
+            return
+        for vertex_list in entry[1]:
+            self._list_keys.pop(id(vertex_list), None)
             try:
                 vertex_list.delete(notify=False)
             except UnboundLocalError:
                 pass
-        del self._vertex_lists[list_key_ref]
+
+    def _untrack(self, vertex_list):
+        key_id = self._list_keys.pop(id(vertex_list), None)
+        if key_id is not None:
+            vertex_lists = self._entries[key_id][1]
+            vertex_lists.remove(vertex_list)
+            if not vertex_lists:
+                del self._entries[key_id]
 
     def remove_vertex_list(self, vertex_list):
-        for list_key_ref, vertex_lists in self._vertex_lists.lists():
-            if vertex_lists in vertex_lists:
-                self._vertex_lists.setlistdefault(list_key_ref).remove(vertex_list)
+        self._untrack(vertex_list)
+
+    def keys(self):
+        """Return the tracked keys."""
+        keys = []
+        for key_ref, vertex_lists in self._entries.itervalues():
+            if isinstance(key_ref, weakref.ref):
+                key_ref = key_ref()
+            keys.append(key_ref)
+        return keys
 
     def clear(self, keep_keys=[]):
         """Delete all vertex lists except the ones in `keep_keys`. Returns a
         list of keys whose vertex lists have been deleted."""
+        keep_ids = set([ id(key) for key in keep_keys ])
         removed = []
-        for list_key_ref in self._vertex_lists.keys():
-            list_key = list_key_ref()
-            if list_key is None or list_key not in keep_keys:
-                self.remove(list_key)
-                removed.append(list_key)
+        for key_id, (key_ref, vertex_lists) in self._entries.items():
+            if key_id not in keep_ids:
+                if isinstance(key_ref, weakref.ref):
+                    key_ref = key_ref()
+                self.remove_key_ref(key_id)
+                removed.append(key_ref)
         return removed
 
+    def sync(self, keys, factory):
+        """Make the tracked keys match `keys`: delete the vertex lists of keys
+        not in `keys` and call `factory` with every key in `keys`, that is not
+        tracked yet, to add its vertex lists. Returns the lists of added and
+        removed keys."""
+        removed = self.clear(keep_keys=keys)
+        added = []
+        entries = self._entries
+        for key in keys:
+            if id(key) not in entries:
+                factory(key)
+                added.append(key)
+        return added, removed
+
     def migrate(self, vertex_list, mode, group, batch):
         pyglet.graphics.Batch.migrate(self, vertex_list, mode, group, batch)
         if not batch is self:
-            for list_key_ref, other_vertex_lists in self._vertex_lists.lists():
-                if vertex_list in other_vertex_lists:
-                    self._vertex_lists.setlistdefault(list_key_ref).remove(vertex_list)
+            self._untrack(vertex_list)
 
     def __contains__(self, list_key):
-        return self.get_key_ref(list_key) in self._vertex_lists
+        return id(list_key) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,5 +1,5 @@
 from .blobs import BlobsRenderer
-from .debug import DebugRenderer
+from .debug import DebugRenderer, LatencyOverlay
 from .facets import FacetRenderer, IntroFacetRenderer, OutroFacetRenderer
 from .hotspot import HotspotRenderer
 from .powerup import PowerupRenderer
@@ -1,137 +1,148 @@
-import math
-import random
-import weakref
-
-import lepton
-import lepton.controller
-import lepton.domain
-import lepton.emitter
-import lepton.renderer
-import lepton.texturizer
-import lepton.particle_struct
+import numpy
 import pyglet
 from pyglet import gl
 
-from multiblob import renderer
-
-class BlobMagnetDomain(lepton.domain.Point):
-    def __init__(self, blob):
-        self.blob = blob
-
-    @property
-    def point(self):
-        return lepton.particle_struct.Vec3(self.blob.pos_x, self.blob.pos_y, 0.0)
-
-class BlobTrackerController(object):
-    def __init__(self, blob):
-        self.blob = blob
-
-    def __call__(self, dt, group):
-        # set velocity
-        dev = self.blob.radius*2
-        for particle in group:
-            diff = lepton.particle_struct.Vec3(self.blob.pos_x + random.uniform(-dev, dev), self.blob.pos_y + random.uniform(-dev, dev), 0.0) - particle.position
-            particle.velocity = lepton.particle_struct.Vec3(*particle.velocity) * 0.9 + diff * 0.1 #.normalize() * 20
-            particle.size = (
-                    self.blob.radius * BlobsRenderer.PARTICLE_SIZE_FACTOR, 
-                    self.blob.radius * BlobsRenderer.PARTICLE_SIZE_FACTOR, 
-                    0
-                    )
-
-        # set particle number
-        BlobsRenderer._adjust_particle_count(self.blob, group)
+from multiblob import circles, particles, renderer
+
+class CircleOutlineBuffer(object):
+    """One `GL_LINES` vertex list holding the outlines of many circles.
+
+    The capacity grows and shrinks in chunks of `CHUNK_SIZE` circles, unused
+    slots are made invisible with a zero alpha.
+    """
+
+    CHUNK_SIZE = 32
+
+    def __init__(self, batch, group=None):
+        self._batch = batch
+        self._group = group
+        self._vertex_list = None
+        self._capacity = 0
+        self._colours = None
+        self.count = 0
+
+    def _reserve(self, count):
+        capacity = max(1, -(-count // self.CHUNK_SIZE)) * self.CHUNK_SIZE
+        if capacity == self._capacity:
+            return
+        vertex_count = capacity * circles.LINE_VERTEX_COUNT
+        if self._vertex_list is None:
+            self._vertex_list = self._batch.add(vertex_count, gl.GL_LINES,
+                    self._group, 'v2f/stream', 'c4B/stream')
+        else:
+            self._vertex_list.resize(vertex_count)
+        self._capacity = capacity
+        self._colours = None
+
+    def update(self, xs, ys, radii, colours):
+        """Write the outlines of the circles at (xs[i], ys[i]) with radius
+        radii[i] and the (r, g, b, a) byte colour colours[i]."""
+        count = len(xs)
+        self._reserve(count)
+        used = count * circles.LINE_VERTEX_COUNT
+        vertices = numpy.ctypeslib.as_array(self._vertex_list.vertices)
+        vertices[:used*2] = circles.circle_outlines(xs, ys, radii).ravel()
+        vertices[used*2:] = 0.0
+
+        colours = numpy.asarray(colours, dtype=numpy.uint8).reshape(-1, 4)
+        if self._colours is None or count != self.count or \
+                (self._colours != colours).any():
+            vertex_colours = numpy.ctypeslib.as_array(self._vertex_list.colors)
+            vertex_colours[:used*4] = numpy.repeat(colours,
+                    circles.LINE_VERTEX_COUNT, axis=0).ravel()
+            vertex_colours[used*4:] = 0
+            self._colours = colours
+        self.count = count
+
+    def delete(self):
+        if self._vertex_list is not None:
+            self._vertex_list.delete()
+            self._vertex_list = None
+        self._capacity = self.count = 0
+
+class ParticleQuadBuffer(object):
+    """One textured `GL_QUADS` vertex list holding the particles of a
+    `particles.ParticleSystem`.
+
+    The capacity grows and shrinks in chunks of `CHUNK_SIZE` particles,
+    unused slots are collapsed and made invisible with a zero alpha.
+    """
+
+    CHUNK_SIZE = 256
+
+    def __init__(self, batch, texture, group=None):
+        self._batch = batch
+        self._group = pyglet.graphics.TextureGroup(texture, parent=group)
+        self._tex_coords = [ texture.tex_coords[index] for index in (0, 1, 3, 4, 6, 7, 9, 10) ]
+        self._vertex_list = None
+        self._capacity = 0
+        self.count = 0
+
+    def _reserve(self, count):
+        capacity = max(1, -(-count // self.CHUNK_SIZE)) * self.CHUNK_SIZE
+        if capacity == self._capacity:
+            return
+        if self._vertex_list is None:
+            self._vertex_list = self._batch.add(capacity * 4, gl.GL_QUADS,
+                    self._group, 'v2f/stream', 'c4f/stream', 't2f/static')
+        else:
+            self._vertex_list.resize(capacity * 4)
+        self._vertex_list.tex_coords[:] = self._tex_coords * capacity
+        self._capacity = capacity
+
+    def update(self, particle_system):
+        """Write the quads and colours of all particles of
+        `particle_system`."""
+        count = len(particle_system)
+        self._reserve(count)
+        vertices = numpy.ctypeslib.as_array(self._vertex_list.vertices)
+        vertices[:count*8] = particle_system.quads().ravel()
+        vertices[count*8:] = 0.0
+        colours = numpy.ctypeslib.as_array(self._vertex_list.colors)
+        colours[:count*16] = numpy.repeat(particle_system.colour[:count], 4, axis=0).ravel()
+        colours[count*16:] = 0.0
+        self.count = count
+
+    def delete(self):
+        if self._vertex_list is not None:
+            self._vertex_list.delete()
+            self._vertex_list = None
+        self._capacity = self.count = 0
 
 class BlobsRenderer(renderer.Renderer):
-    """Renders blobs."""
+    """Renders blobs.
+
+    The particles of all blobs come from `particles.default_system` and are
+    drawn from one `ParticleQuadBuffer`, the outlines of all blobs from one
+    `CircleOutlineBuffer`. Both are rebuilt every frame.
+    """
 
-    UNIT_CIRCLE = [(math.sin(math.radians(a)), math.cos(math.radians(a))) 
-            for a in range(0, 360, 10)]
-    PARTICLE_RATIO = 1.0/10.0
-    PARTICLE_SIZE_FACTOR = 4.5/3.0
+    OUTLINE_COLOUR = (255, 255, 255, 255)
 
-    def __init__(self):
+    def __init__(self, particle_system=None):
         renderer.Renderer.__init__(self)
-        self._blob_batch = renderer.ManagedBatch()
-        self._blob_groups = {}
-        self._blob_texture = pyglet.resource.texture('blob_1.png')
-
-    @staticmethod
-    def _random_velocity_controller(dt, group):
-        for particle in group:
-            particle.velocity.x += random.uniform(-50, 50)
-            particle.velocity.y += random.uniform(-50, 50)
-
-    @classmethod
-    def _circle(cls, center, radius):
-        result = []
-        for x, y in cls.UNIT_CIRCLE:
-            result.append(center[0] + x*radius)
-            result.append(center[1] + y*radius)
-        return result
-
-    @classmethod
-    def _adjust_particle_count(cls, blob, group):
-        size_difference = int(blob.radius * cls.PARTICLE_RATIO) - len(group)
-        if size_difference > 0:
-            emitter = lepton.emitter.StaticEmitter(
-                    template = lepton.Particle(
-                        position = (
-                            blob.pos_x,
-                            blob.pos_y,
-                            0,
-                            ),
-                        size = (blob.size, blob.size, 0),
-                        color = blob.player.colour
-                        ),
-                    #deviation = lepton.Particle(
-                        #position = (blob.size/5, blob.size/5, 0),
-                        #size = (32, 32, 0),
-                        #),
-                    )
-            emitter.emit(size_difference, group)
-        elif size_difference < 0:
-            for particle in list(group)[-size_difference:]:
-                group.kill(particle)
+        if particle_system is None:
+            particle_system = particles.default_system
+        self.particle_system = particle_system
+        self._batch = pyglet.graphics.Batch()
+        self._particles = ParticleQuadBuffer(self._batch,
+                pyglet.resource.texture('blob_1.png'),
+                pyglet.graphics.OrderedGroup(0))
+        self._outlines = CircleOutlineBuffer(self._batch,
+                pyglet.graphics.OrderedGroup(1))
+
+    def outline_colour(self, blob):
+        return self.OUTLINE_COLOUR
 
     def render(self, game_state):
         blobs = [ blob for player in game_state.players for blob in player.blobs ]
-        deleted_blobs = self._blob_batch.clear(keep_keys=blobs)
-        for blob in deleted_blobs:
-            lepton.default_system.remove_group(self._blob_groups[blob])
-            del self._blob_groups[blob]
-
-        for blob in blobs:
-            if blob in self._blob_batch:
-                group = self._blob_groups[blob]
-                vertex_list = self._blob_batch.get(blob)
-            else:
-                group = self._blob_groups[blob] = lepton.ParticleGroup(
-                        controllers = [
-                            #lepton.controller.Magnet(BlobMagnetDomain(blob), 30, 1, 1),
-                            BlobTrackerController(blob),
-                            #self._random_velocity_controller,
-                            lepton.controller.Movement(),
-                            ],
-                        renderer = lepton.renderer.BillboardRenderer(
-                            lepton.texturizer.SpriteTexturizer(
-                                self._blob_texture.id
-                                #lepton.texturizer.create_point_texture(64, 0.2)
-                                )
-                            ),
-                        )
-
-                self._adjust_particle_count(blob, group)
-                
-                vertex_list = self._blob_batch.set(
-                        blob,
-                        36,
-                        gl.GL_LINE_LOOP,
-                        pyglet.graphics.Group(),
-                        ('v2f', (0.0, )*72)
-                        )
-
-                #vertex_list.vertices = self._circle((blob.pos_x, blob.pos_y), blob.radius)
-                
-        lepton.default_system.draw()
-        self._blob_batch.draw()
-
+        self.particle_system.set_blobs(blobs)
+
+        self._particles.update(self.particle_system)
+        self._outlines.update(
+                [ blob.pos_x for blob in blobs ],
+                [ blob.pos_y for blob in blobs ],
+                [ blob.radius for blob in blobs ],
+                [ self.outline_colour(blob) for blob in blobs ],
+                )
+        self._batch.draw()
@@ -1,4 +1,4 @@
-from multiblob import renderer
+from multiblob import renderer, timing
 import pyglet
 
 class DebugRenderer(renderer.Renderer):
@@ -11,3 +11,35 @@ class DebugRenderer(renderer.Renderer):
         pyglet.gl.glPointSize(3)
         for debug_object in game_state.debug_objects.itervalues():
             debug_object.draw()
+
+class LatencyOverlay(object):
+    """Shows the input latency percentiles of a profiler in a corner of the
+    window."""
+
+    UPDATE_INTERVAL = 0.5 # seconds between updates of the text
+    MEASUREMENTS = ['dispatch', 'apply', 'render']
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.label = pyglet.text.Label('', font_size=10, x=10, y=10,
+                color=(255, 255, 255, 192))
+        self._last_update = None
+
+    def update_text(self):
+        lines = []
+        for name in self.MEASUREMENTS:
+            histogram = self.profiler.histograms.get('latency.' + name)
+            if histogram is not None:
+                lines.append("%s p50 %.1f ms p95 %.1f ms" % (
+                    name,
+                    histogram.percentile(50) * 1000.0,
+                    histogram.percentile(95) * 1000.0,
+                    ))
+        self.label.text = " | ".join(lines) or "no touches measured"
+
+    def draw(self):
+        now = timing.clock()
+        if self._last_update is None or now - self._last_update >= self.UPDATE_INTERVAL:
+            self._last_update = now
+            self.update_text()
+        self.label.draw()
@@ -1,74 +1,19 @@
+import numpy
 import pyglet.graphics
-from multiblob import renderer
+from multiblob import board, renderer
 import pyglet.gl as gl
 
 #
 # Groups
 #
 
-class FacetFillGroup(pyglet.graphics.Group):
-    def __init__(self, facet):
-        pyglet.graphics.Group.__init__(self)
-        self.facet = facet
-
-    def set_state(self):
-        gl.glPushAttrib(gl.GL_CURRENT_BIT)
-        gl.glColor4f(*self.facet.colour)
-
-    def unset_state(self):
-        gl.glPopAttrib()
-
-class FacetOutlineGroup(pyglet.graphics.Group):
-    def __init__(self, facet):
-        pyglet.graphics.Group.__init__(self)
-        self.facet = facet
-
-    def set_state(self):
-        gl.glPushAttrib(gl.GL_LINE_BIT | gl.GL_CURRENT_BIT)
-        gl.glLineWidth(2)
-        gl.glColor3f(1,1,1)
-
-    def unset_state(self):
-        gl.glPopAttrib()
-
-class IntroFacetFillGroup(pyglet.graphics.Group):
-    BORDER_FACET_COLOUR = (.3, .3, .3, 1.0)
-    INNER_FACET_COLOUR = (.0, .0, .0, 1.0)
-
-    def __init__(self, facet):
-        pyglet.graphics.Group.__init__(self)
-        self.facet = facet
-
-    def set_state(self):
-        gl.glPushAttrib(gl.GL_CURRENT_BIT)
-        if self.facet.home_facet_of:
-            colour = self.facet.colour
-        else:
-            if self.facet.is_border_facet:
-                colour = self.BORDER_FACET_COLOUR
-            else:
-                colour = self.INNER_FACET_COLOUR
-        gl.glColor4f(*colour)
-
-    def unset_state(self):
-        gl.glPopAttrib()
-
-class IntroFacetOutlineGroup(pyglet.graphics.Group):
-    BORDER_FACET_COLOUR = (1.0, 1.0, 1.0, 1.0)
-    INNER_FACET_COLOUR  = (0.0, 0.0, 0.0, 0.0)
-
-    def __init__(self, facet):
-        pyglet.graphics.Group.__init__(self)
-        self.facet = facet
+class FacetOutlineGroup(pyglet.graphics.OrderedGroup):
+    def __init__(self):
+        pyglet.graphics.OrderedGroup.__init__(self, 1)
 
     def set_state(self):
-        gl.glPushAttrib(gl.GL_LINE_BIT | gl.GL_CURRENT_BIT)
+        gl.glPushAttrib(gl.GL_LINE_BIT)
         gl.glLineWidth(2)
-        if self.facet.is_border_facet:
-            colour = self.BORDER_FACET_COLOUR
-        else:
-            colour = self.INNER_FACET_COLOUR
-        gl.glColor4f(*colour)
 
     def unset_state(self):
         gl.glPopAttrib()
@@ -78,42 +23,116 @@ class IntroFacetOutlineGroup(pyglet.graphics.Group):
 #
 
 class FacetRenderer(renderer.Renderer):
-    """Renders facets."""
+    """Renders facets.
 
-    FILL_GROUP = FacetFillGroup
-    OUTLINE_GROUP = FacetOutlineGroup
+    All facets are drawn with one indexed triangle list for the fills and one
+    line list for the outlines, both with per-vertex colours. The fill
+    colours come from the board's `FacetColourCache`, and only the range of
+    facets that changed since the last frame is rewritten.
+    """
+
+    DRAW_FILL = True
+    DRAW_OUTLINE = True
+    OUTLINE_COLOUR = (1.0, 1.0, 1.0, 1.0)
 
     def __init__(self):
         renderer.Renderer.__init__(self)
-        self._facet_fill_batch = renderer.ManagedBatch()
-        self._facet_outline_batch = renderer.ManagedBatch()
+        self._batch = pyglet.graphics.Batch()
+        self._fill_group = pyglet.graphics.OrderedGroup(0)
+        self._outline_group = FacetOutlineGroup()
+        self._facets = None
+        self._mesh = None
+        self._fill_list = None
+        self._outline_list = None
+        self._colour_version = None
+
+    def fill_colours(self, facets, indices, colours):
+        """Return the fill colours of the facets at `indices` as an array of
+        shape (len(indices), 4), given their colours from the cache."""
+        return colours
+
+    def outline_colour(self, facet):
+        return self.OUTLINE_COLOUR
+
+    @staticmethod
+    def _vertex_colours(colours, ranges):
+        """Repeat the colour of every facet for each of its vertices."""
+        return numpy.repeat(numpy.array(colours, dtype=float).reshape(-1, 4),
+                ranges[:, 1] - ranges[:, 0], axis=0).ravel().tolist()
+
+    def _build(self, facets, facet_colours):
+        for vertex_list in (self._fill_list, self._outline_list):
+            if vertex_list is not None:
+                vertex_list.delete()
+        self._fill_list = self._outline_list = None
+
+        self._facets = facets
+        self._mesh = mesh = board.BoardMesh(facets)
+        facet_colours.update()
+        self._colour_version = facet_colours.version
+        if self.DRAW_FILL and len(mesh.fill_indices):
+            self._fill_list = self._batch.add_indexed(
+                    len(mesh.vertices), gl.GL_TRIANGLES, self._fill_group,
+                    mesh.fill_indices.tolist(),
+                    ('v2f/static', mesh.vertices.ravel().tolist()),
+                    ('c4f/stream', self._vertex_colours(
+                        self.fill_colours(facets, numpy.arange(len(facets)), facet_colours.colours),
+                        mesh.vertex_ranges)),
+                    )
+        if self.DRAW_OUTLINE and len(mesh.outline_vertices):
+            self._outline_list = self._batch.add(
+                    len(mesh.outline_vertices), gl.GL_LINES, self._outline_group,
+                    ('v2f/static', mesh.outline_vertices.ravel().tolist()),
+                    ('c4f/static', self._vertex_colours(
+                        [ self.outline_colour(facet) for facet in facets ],
+                        mesh.outline_ranges)),
+                    )
+
+    def _update_colours(self, facets, facet_colours):
+        changed = facet_colours.changed_since(self._colour_version)
+        self._colour_version = facet_colours.version
+        if not len(changed) or self._fill_list is None:
+            return
+        first, last = int(changed[0]), int(changed[-1]) + 1
+        ranges = self._mesh.vertex_ranges[first:last]
+        colours = self.fill_colours(facets, numpy.arange(first, last),
+                facet_colours.colours[first:last])
+        self._fill_list.colors[int(ranges[0, 0])*4:int(ranges[-1, 1])*4] = \
+                self._vertex_colours(colours, ranges)
 
     def render(self, game_state):
-        self._facet_outline_batch.clear(keep_keys=game_state.facets)
-        self._facet_fill_batch.clear(keep_keys=game_state.facets)
-        for facet in game_state.facets:
-            num_vertices = len(facet.coords) / 2
-            if self.FILL_GROUP and not facet in self._facet_fill_batch:
-                self._facet_fill_batch.set(
-                    facet, num_vertices, gl.GL_POLYGON, self.FILL_GROUP(facet),
-                    ('v2f', facet.coords))
-            if self.OUTLINE_GROUP and not facet in self._facet_outline_batch:
-                self._facet_outline_batch.set(
-                    facet, num_vertices, gl.GL_LINE_LOOP, self.OUTLINE_GROUP(facet),
-                    ('v2f', facet.coords))
-        self._facet_fill_batch.draw()
-        self._facet_outline_batch.draw()
+        if game_state.facets is not self._facets:
+            self._build(game_state.facets, game_state.facet_colours)
+        else:
+            self._update_colours(game_state.facets, game_state.facet_colours)
+        self._batch.draw()
 
 class IntroFacetRenderer(FacetRenderer):
     """Renders facets during intro."""
 
-    FILL_GROUP = IntroFacetFillGroup
-    OUTLINE_GROUP = IntroFacetOutlineGroup
+    BORDER_FACET_COLOUR = (.3, .3, .3, 1.0)
+    INNER_FACET_COLOUR = (.0, .0, .0, 1.0)
+    BORDER_OUTLINE_COLOUR = (1.0, 1.0, 1.0, 1.0)
+    INNER_OUTLINE_COLOUR = (0.0, 0.0, 0.0, 0.0)
+
+    def fill_colours(self, facets, indices, colours):
+        colours = colours.copy()
+        for row, index in enumerate(indices):
+            facet = facets[index]
+            if not facet.home_facet_of:
+                if facet.is_border_facet:
+                    colours[row] = self.BORDER_FACET_COLOUR
+                else:
+                    colours[row] = self.INNER_FACET_COLOUR
+        return colours
+
+    def outline_colour(self, facet):
+        if facet.is_border_facet:
+            return self.BORDER_OUTLINE_COLOUR
+        else:
+            return self.INNER_OUTLINE_COLOUR
 
 class OutroFacetRenderer(FacetRenderer):
-    """Renders facets during intro."""
-
-    FILL_GROUP = FacetFillGroup
-    OUTLINE_GROUP = None
-
+    """Renders facets during outro."""
 
+    DRAW_OUTLINE = False
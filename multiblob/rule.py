@@ -1,16 +1,43 @@
 import logging
 
+from multiblob import timing
+
 class GameRuleSystem(object):
-    """A class to encapsulate the game rules."""
+    """A class to encapsulate the game rules.
+
+    The rules are run in fixed simulation ticks of `tick` seconds. Time that
+    passes between two calls of `update` is accumulated and the due ticks are
+    run to catch up, but at most `max_catch_up_ticks` per call. If a
+    `tick_budget` is given, rules that would start after the budget of a tick
+    is used up are deferred to the next tick.
+    """
+
+    TICK = 0.05
+    MAX_CATCH_UP_TICKS = 4
 
-    def __init__(self, rules=[], state=None):
+    # tolerance for rounding errors when accumulating time
+    EPSILON = 1e-9
+
+    def __init__(self, rules=[], state=None, tick=TICK,
+            max_catch_up_ticks=MAX_CATCH_UP_TICKS, tick_budget=None):
         self.rules = rules
         self.state = state
+        self.tick = tick
+        self.max_catch_up_ticks = max_catch_up_ticks
+        self.tick_budget = tick_budget
+
+        self.profiler = None # a profiling.Profiler, if timings are recorded
+
+        self.tick_count    = 0
+        self.ticks_dropped = 0 # ticks skipped because catching up took too long
+        self.rules_deferred = 0 # rule runs deferred because of the tick budget
+        self._time_behind = 0.0
+        self._deferred = []
 
         self.log = logging.getLogger(self.__class__.__name__)
 
     def update(self, dt):
-        """Update the game state.
+        """Advance the simulation by the due number of ticks.
 
         Parameters
         ----------
@@ -18,9 +45,55 @@ class GameRuleSystem(object):
             the time that has passed since the last update
         """
         if self.state:
-            for rule in self.rules:
-                if rule.should_update(dt, self.state):
-                    rule.update(dt, self.state)
+            self._time_behind += dt
+            ticks = int(self._time_behind / self.tick + self.EPSILON)
+            if ticks > self.max_catch_up_ticks:
+                self.log.info(u"Simulation is %d ticks behind, dropping %d.",
+                        ticks, ticks - self.max_catch_up_ticks)
+                self.ticks_dropped += ticks - self.max_catch_up_ticks
+                self._time_behind -= (ticks - self.max_catch_up_ticks) * self.tick
+                ticks = self.max_catch_up_ticks
+            for tick in range(ticks):
+                self._time_behind -= self.tick
+                self.step()
+
+    def step(self):
+        """Run one simulation tick."""
+        start_time = timing.clock()
+        self.tick_count += 1
+        due_rules = self._deferred + [ rule for rule in self.rules
+                if rule not in self._deferred and
+                rule.should_update(self.tick_count, self.tick) ]
+        self._deferred = []
+
+        for index, rule in enumerate(due_rules):
+            if index > 0 and self.tick_budget is not None and \
+                    timing.clock() - start_time > self.tick_budget:
+                self._deferred = due_rules[index:]
+                self.rules_deferred += len(self._deferred)
+                break
+            self.run_rule(rule)
+
+        if self.profiler is not None:
+            self.profiler.record('tick', timing.clock() - start_time)
+
+    def run_rule(self, rule):
+        """Run a single rule for the current tick."""
+        rule.mark_updated(self.tick_count)
+        if self.profiler is None:
+            rule.update(self.tick, self.state)
+        else:
+            start_time = timing.clock()
+            rule.update(self.tick, self.state)
+            self.profiler.record('rule.' + rule.__class__.__name__,
+                    timing.clock() - start_time)
+
+    def set_profiler(self, profiler):
+        """Record the timings of ticks and rules with `profiler`, None to stop
+        recording."""
+        self.profiler = profiler
+        for rule in self.rules:
+            rule.profiler = profiler
 
     def activate(self):
         """Activate the rules."""
@@ -36,19 +109,24 @@ class Rule(object):
     """A class representing a game rule."""
     MIN_INTERVAL = 0.0
 
+    profiler = None # set by GameRuleSystem.set_profiler
+
     def __init__(self):
         self.log = logging.getLogger(self.__class__.__name__)
-        self._time_since = 0.0
-
-    def should_update(self, dt, state):
-        """Return True, if the rule's update method should be run given dt and
-        state."""
-        self._time_since += dt
-        if self._time_since >= self.MIN_INTERVAL:
-            self._time_since = 0.0
-            return True
-        else:
-            return False
+        self._last_tick = 0
+
+    def ticks_per_update(self, tick):
+        """Return the number of ticks of length `tick` between two updates."""
+        return max(int(round(self.MIN_INTERVAL / tick)), 1)
+
+    def should_update(self, tick_count, tick):
+        """Return True, if the rule's update method should be run in the tick
+        `tick_count`."""
+        return tick_count - self._last_tick >= self.ticks_per_update(tick)
+
+    def mark_updated(self, tick_count):
+        """Remember that the rule has been run in the tick `tick_count`."""
+        self._last_tick = tick_count
 
     def update(self, dt, state):
         """Update the global state to conform to the rule. Override this in
@@ -57,7 +135,7 @@ class Rule(object):
         Parameters
         ----------
         dt : float
-            the time that has passed since the last update
+            the length of a simulation tick
         state : GameState
             the global state
         """
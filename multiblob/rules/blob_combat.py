@@ -1,7 +1,5 @@
 """Blob combat go here."""
-import pyglet
-
-from multiblob import rule
+from multiblob import effects, rule, spatial
  
 class BlobCombat(rule.Rule):
     """Performs the blob combat."""  
@@ -10,64 +8,92 @@ class BlobCombat(rule.Rule):
     REDUCE_FACTOR = 0.4
     KILL_THRESHOLD = 5.0
 
-    def __init__(self):
+    # how often two touching enemy blobs clash per update
+    CLASHES_PER_UPDATE = 2
+
+    def __init__(self, combat_sound=None):
+        """Create the rule.
+
+        Parameters
+        ----------
+        combat_sound : sound effect (optional, defaults to the combat sound)
+            the looped sound to play while blobs are fighting
+        """
         rule.Rule.__init__(self)
-        self._combat_source = pyglet.resource.media('blub3.wav', streaming=False)
-        self._combat_player = pyglet.media.Player()
-        self._combat_player.queue(self._combat_source)
-        self._combat_player.eos_action = pyglet.media.Player.EOS_LOOP
+        if combat_sound is None:
+            combat_sound = effects.SoundEffect('blub3.wav', loop=True)
+        self._combat_sound = combat_sound
    
     def update(self, dt, state):
         is_combat = False
 
-        for player in state.players:
-            for other_player  in state.players:
-                for blob in player.blobs:
-                    for other_blob in other_player.blobs:
-                        if blob != other_blob and blob.size > 0 and other_blob.size > 0:
-                            distance_between_blobs = blob.position.distance(other_blob.position)
-                            if player != other_player:
-                                # combat
-                                #########################################
-                                #check the collision and reduce the size#
-                                #########################################
-                                
-                                if blob.size > 0 and other_blob.size > 0:
-                                    # difference between blobs
-                                    dif_size = abs(blob.size - other_blob.size)
-                                    if distance_between_blobs <= blob.radius + other_blob.radius:
-                                        
-                                        # reduce the size of blobs which crash others
-                                        blob.size = blob.size - self.REDUCE_FACTOR * (2 + self.REDUCE_FACTOR * dif_size/blob.size)
-                                        other_blob.size = other_blob.size - self.REDUCE_FACTOR * (2 + self.REDUCE_FACTOR * dif_size/other_blob.size)
-                                        is_combat = True;
-                     
-                            else:
-                                # merging
-                                if (blob.just_splitted_from != other_blob and
-                                        other_blob.just_splitted_from != blob and
-                                        distance_between_blobs <= blob.radius + other_blob.radius):
-                                    if blob.size >= other_blob.size:
-                                        blob.size += other_blob.size
-                                        other_blob.size = 0
-                                    else:
-                                        other_blob.size += blob.size
-                                        blob.size = 0
+        blobs = [ blob for player in state.players for blob in player.blobs ]
+        blob_hash = spatial.SpatialHash.from_blobs(blobs)
+
+        for blob, other_blob in blob_hash.pairs():
+            is_combat = self._encounter(blob, other_blob) or is_combat
+
+        # the hash is sized for the radii before this update, blobs that
+        # merged beyond that may touch blobs outside of their neighbourhood
+        max_radius = blob_hash.cell_size / 2.0
+        grown = [ blob for blob in blobs if blob.size > 0 and blob.radius > max_radius ]
+        for index, blob in enumerate(grown):
+            neighbours = set([ id(other_blob)
+                for other_blob in blob_hash.query(blob.pos_x, blob.pos_y) ])
+            neighbours.update([ id(other_blob) for other_blob in grown[:index] ])
+            for other_blob in blobs:
+                if id(other_blob) not in neighbours:
+                    is_combat = self._encounter(blob, other_blob) or is_combat
 
-                        if blob.size < self.KILL_THRESHOLD:
-                            blob.size = 0
-                            try:
-                                blob.player.blobs.remove(blob)
-                            except ValueError:
-                                pass
-                        if other_blob.size < self.KILL_THRESHOLD:
-                            other_blob.size = 0
-                            try:
-                                other_blob.player.blobs.remove(other_blob)
-                            except ValueError:
-                                pass
+        for blob in blobs:
+            self._kill_if_too_small(blob)
         
         if is_combat:
-            self._combat_player.play()
+            self._combat_sound.play()
         else:
-            self._combat_player.pause()
+            self._combat_sound.pause()
+
+    def _encounter(self, blob, other_blob):
+        """Let two blobs fight or merge, if they touch. Returns True, if they
+        fought."""
+        is_combat = False
+        if blob.player is not other_blob.player:
+            # combat
+            for clash in range(self.CLASHES_PER_UPDATE):
+                if blob.size > 0 and other_blob.size > 0 and \
+                        self._touching(blob, other_blob):
+                    self._clash(blob, other_blob)
+                    is_combat = True
+                    self._kill_if_too_small(blob)
+                    self._kill_if_too_small(other_blob)
+        elif blob.size > 0 and other_blob.size > 0:
+            # merging
+            if (blob.just_splitted_from is not other_blob and
+                    other_blob.just_splitted_from is not blob and
+                    self._touching(blob, other_blob)):
+                if blob.size >= other_blob.size:
+                    blob.size += other_blob.size
+                    other_blob.size = 0
+                else:
+                    other_blob.size += blob.size
+                    blob.size = 0
+                self._kill_if_too_small(blob)
+                self._kill_if_too_small(other_blob)
+        return is_combat
+
+    @staticmethod
+    def _touching(blob, other_blob):
+        radii = blob.radius + other_blob.radius
+        dx = blob.pos_x - other_blob.pos_x
+        dy = blob.pos_y - other_blob.pos_y
+        return dx * dx + dy * dy <= radii * radii
+
+    def _clash(self, blob, other_blob):
+        """Reduce the size of two colliding blobs."""
+        dif_size = abs(blob.size - other_blob.size)
+        blob.size = blob.size - self.REDUCE_FACTOR * (2 + self.REDUCE_FACTOR * dif_size/blob.size)
+        other_blob.size = other_blob.size - self.REDUCE_FACTOR * (2 + self.REDUCE_FACTOR * dif_size/other_blob.size)
+
+    def _kill_if_too_small(self, blob):
+        if blob.alive and blob.size < self.KILL_THRESHOLD:
+            blob.kill()
@@ -1,42 +1,98 @@
 """Blob rules go here."""
 
-import lepton
-from multiblob import rule, state as game_state
+import numpy
+from multiblob import particles, rule, state as game_state
 
 class BlobMovementRule(rule.Rule):
     """Performs the blob movement."""
 
     MERGE_IMMUNITY_TIME = 100
+
+    def __init__(self, particle_system=None):
+        """Create the rule.
+
+        Parameters
+        ----------
+        particle_system : ParticleSystem (optional, defaults to particles.default_system)
+            the particle system to advance on every update
+        """
+        rule.Rule.__init__(self)
+        if particle_system is None:
+            particle_system = particles.default_system
+        self.particle_system = particle_system
     
     def update(self, dt, state):
+        moving = {}   # mapping of store id -> (store, blobs)
+        splitted = {} # mapping of store id -> (store, blobs)
         for player in state.players:
             for blob in player.blobs:
                 if blob.movement:
-                    current_movement = blob.movement[0]
-                    diff = (current_movement - blob.position)
-                    movement_step = diff.normalized() * blob.speed
-                    
-                    # remove movement if complete with this step
-                    if abs(movement_step) >= abs(diff):
-                        blob.movement.pop(0)
-                    
-                    blob.position += movement_step
-                    if blob.movement_flag == 0:                       
+                    moving.setdefault(id(blob.store), (blob.store, []))[1].append(blob)
+                    if blob.movement_flag == 0:
                         blob.movement_flag = 1
                 else:
                     blob.movement_flag = 0
-                    
+
                 if blob.just_splitted_from:
-                    # when the blob gets once out of the blob it came from
-                    # it will be mergable with it again
-                    dist = blob.position.distance(blob.just_splitted_from.position)
                     blob.just_splitted_time += 1
-                    if dist > blob.radius + blob.just_splitted_from.radius or\
-                            blob.just_splitted_time > self.MERGE_IMMUNITY_TIME:
+                    if blob.just_splitted_time > self.MERGE_IMMUNITY_TIME or \
+                            not blob.just_splitted_from.alive or \
+                            blob.just_splitted_from.store is not blob.store:
                         blob.just_splitted_from = None
                         blob.just_splitted_time = 0
+                    else:
+                        splitted.setdefault(id(blob.store), (blob.store, []))[1].append(blob)
+
+        for store, blobs in moving.itervalues():
+            rows = numpy.array([ blob._row for blob in blobs ])
+            targets = numpy.array([ tuple(blob.movement[0]) for blob in blobs ], dtype=float)
+            finished = self._advance(store, rows, targets[:, 0], targets[:, 1])
+            for index in numpy.flatnonzero(finished):
+                blobs[index].movement.pop(0)
+
+        for store, blobs in splitted.itervalues():
+            # when the blob gets once out of the blob it came from
+            # it will be mergable with it again
+            rows = numpy.array([ blob._row for blob in blobs ])
+            other_rows = numpy.array([ blob.just_splitted_from._row for blob in blobs ])
+            for index in numpy.flatnonzero(self._separated(store, rows, other_rows)):
+                blobs[index].just_splitted_from = None
+                blobs[index].just_splitted_time = 0
         
-        lepton.default_system.update(dt)
+        if self.profiler is None:
+            self.particle_system.update(dt)
+        else:
+            with self.profiler.measure('rule.BlobMovementRule.particles'):
+                self.particle_system.update(dt)
+            # the blobs have moved towards all touches so far
+            self.profiler.latency.applied()
+
+    @staticmethod
+    def _advance(store, rows, target_x, target_y):
+        """Move the blobs in `rows` by their speed towards the given targets.
+        Returns a mask of the blobs that reached their target with this
+        step."""
+        diff_x = target_x - store.pos_x[rows]
+        diff_y = target_y - store.pos_y[rows]
+        distance = numpy.hypot(diff_x, diff_y)
+        speed = store.speed[rows]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            factor = numpy.where(distance > 0.0, speed / distance, 0.0)
+        store.pos_x[rows] += diff_x * factor
+        store.pos_y[rows] += diff_y * factor
+        return numpy.abs(speed) * (distance > 0.0) >= distance
+
+    @staticmethod
+    def _separated(store, rows, other_rows):
+        """Return a mask of the blobs in `rows` that do not overlap the blobs
+        in `other_rows`."""
+        distance = numpy.hypot(
+                store.pos_x[rows] - store.pos_x[other_rows],
+                store.pos_y[rows] - store.pos_y[other_rows],
+                )
+        radii = numpy.sqrt(store.size[rows]) * game_state.Blob.RADIUS_FACTOR + \
+                numpy.sqrt(store.size[other_rows]) * game_state.Blob.RADIUS_FACTOR
+        return distance > radii
 
 class BlobGenerationRule(rule.Rule):
     """Generates new blobs on certain facets."""
@@ -45,17 +101,22 @@ class BlobGenerationRule(rule.Rule):
     MAX_BLOB_SIZE = 200.0
 
     def update(self, dt, state):
+        state.locate_blobs()
+        owned_occupations = None
         for facet in state.facets:
             if facet.blob_generation != 0.0:
                 if facet.owner:
                     present_blob_sizes = [
                             blob.size
                             for blob in facet.owner.blobs
-                            if state.facet_tree.get_nearest(blob.pos_x, blob.pos_y) is facet
+                            if blob.facet_index == facet.index
                             ]
 
+                    if owned_occupations is None:
+                        owned_occupations = self._owned_occupations(state)
                     blob_gen_size =  facet.blob_generation +\
-                            self._blob_gen_bonus_by_owned_facets(state, facet)
+                            self._blob_gen_bonus_by_owned_facets(state, facet,
+                                    owned_occupations[facet.owner])
 
                     if not present_blob_sizes or sum(present_blob_sizes) < self.MAX_BLOB_SIZE:
                         if hasattr(facet, 'gen_x') and hasattr(facet, 'gen_y'):
@@ -73,10 +134,19 @@ class BlobGenerationRule(rule.Rule):
                                     blob_gen_size,
                                     )
 
-    def _blob_gen_bonus_by_owned_facets(self, state, home_facet):
-        bonus_size = 0.0
+    @staticmethod
+    def _owned_occupations(state):
+        """Return a mapping of player -> array of the player's occupation of
+        every facet the player owns, 0 for the other facets."""
+        occupations = {}
         for facet in state.facets:
-            if facet.owner is home_facet.owner and not facet is home_facet:
-                distance = facet.position.distance(home_facet.position)
-                bonus_size += 0.005 * distance * facet.occupation[facet.owner]
-        return bonus_size
+            if facet.owner:
+                if facet.owner not in occupations:
+                    occupations[facet.owner] = numpy.zeros(len(state.facets))
+                occupations[facet.owner][facet.index] = facet.owner_occupation
+        return occupations
+
+    def _blob_gen_bonus_by_owned_facets(self, state, home_facet, owned_occupation):
+        distances = state.board_geometry.distances[home_facet.index]
+        # the home facet itself is at distance 0 and adds nothing
+        return 0.005 * distances.dot(owned_occupation)
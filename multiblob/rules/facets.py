@@ -22,9 +22,10 @@ class FacetOwnershipRule(rule.Rule):
     def update(self, dt, state):
         self.facet_map.clear()
 
+        state.locate_blobs()
         for player in state.players:
             for blob in player.blobs:
-                facet = state.facet_tree.get_nearest(blob.pos_x, blob.pos_y)
+                facet = state.facets[blob.facet_index]
                 self.facet_map.setdefault(facet, []).append(blob)
 
         for facet, blob_list in self.facet_map.iteritems():
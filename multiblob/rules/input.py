@@ -1,6 +1,7 @@
 """Input rules go here."""
 import math
 
+import numpy
 import pyglet
 import pyglet.gl as gl
 
@@ -90,11 +91,23 @@ class InputInterpreterRule(rule.Rule):
     
     MIN_INTERVAL = 1.0
 
-    def __init__(self, input_system):
+    def __init__(self, input_system, debug=True):
+        """Create the rule.
+
+        Parameters
+        ----------
+        input_system : InputSystem
+            the source of multitouch events
+        debug : bool (optional, defaults to True)
+            if True the touches are drawn as debug objects
+        """
         rule.Rule.__init__(self)
         self.state = None
         self.touch_objects = {}
-        self.debug_batch = renderer.ManagedBatch()
+        if debug:
+            self.debug_batch = renderer.ManagedBatch()
+        else:
+            self.debug_batch = None
         self.input_system = input_system
 
     def activate(self):
@@ -103,39 +116,83 @@ class InputInterpreterRule(rule.Rule):
     def deactivate(self):
         self.input_system.remove_handlers(self)
 
+    def on_multitouch_frame(self, events):
+        # the events are handled in their order, only the hit tests of the
+        # DOWN events are done at once until a split changes the blobs
+        touched_blobs = None
+        for index, event in enumerate(events):
+            if event.object_state == "DOWN":
+                if touched_blobs is None:
+                    touched_blobs = self._hit_test_downs(events[index:])
+                self._touch_down(event, touched_blobs[id(event)])
+            elif event.object_state == "UP":
+                self._touch_up(event)
+            elif event.object_state == "MOVED":
+                if self._touch_moved(event):
+                    touched_blobs = None
+
+    def _hit_test_downs(self, events):
+        """Return a mapping of id(event) -> touched blob for the DOWN events
+        in `events`."""
+        down_events = [ event for event in events if event.object_state == "DOWN" ]
+        return dict(zip(
+                [ id(event) for event in down_events ],
+                self.get_touched_blobs(
+                    [ event.pos_x for event in down_events ],
+                    [ event.pos_y for event in down_events ],
+                    )))
+
     def on_multitouch_down(self, event):
+        # events of a frame are handled by on_multitouch_frame
+        if not event.in_frame:
+            self._touch_down(event, self.get_touched_blob(event.pos_x, event.pos_y))
+
+    def on_multitouch_up(self, event):
+        if not event.in_frame:
+            self._touch_up(event)
+
+    def on_multitouch_moved(self, event):
+        if not event.in_frame:
+            self._touch_moved(event)
+
+    def _touch_down(self, event, blob):
         self.log.debug("Multitouch down")
-        blob = self.get_touched_blob(event.pos_x, event.pos_y)
         ti = self.touch_objects[event.object_id] = TouchInteraction(
                 blob,
                 event
                 )
-        self.debug_batch.set(
-                ti,
-                1,
-                pyglet.gl.GL_POINTS,
-                InputEventDebugGroup(event),
-                ('v2f', (event.pos_x, event.pos_y)),
-                )
+        if self.debug_batch is not None:
+            self.debug_batch.set(
+                    ti,
+                    1,
+                    pyglet.gl.GL_POINTS,
+                    InputEventDebugGroup(event),
+                    ('v2f', (event.pos_x, event.pos_y)),
+                    )
         if ti.blob:
             ti.blob.movement = []
+            if self.profiler is not None:
+                self.profiler.latency.touched(event)
         self.log.debug(u"Touched blob %s.", str(ti.blob))
 
-    def on_multitouch_up(self, event):
+    def _touch_up(self, event):
         self.log.debug("Multitouch up")
         try:
-            self.debug_batch.remove(self.touch_objects[event.object_id])
+            if self.debug_batch is not None:
+                self.debug_batch.remove(self.touch_objects[event.object_id])
             del self.touch_objects[event.object_id]
         except KeyError:
             self.log.error(u"Multitouch 'UP' without prior 'DOWN': %s" % event)
 
-    def on_multitouch_moved(self, event):
+    def _touch_moved(self, event):
+        """Handle a MOVED event. Returns True if it split a blob."""
         #self.log.debug("Multitouch moved")
         try:
             touch_object = self.touch_objects[event.object_id]
             touch_object.reset_ttl()
             if touch_object.is_past_threshold(event):
-                self.debug_batch.get(touch_object)[0].vertices = (event.pos_x, event.pos_y)
+                if self.debug_batch is not None:
+                    self.debug_batch.get(touch_object)[0].vertices = (event.pos_x, event.pos_y)
                 touch_object.append(event)
                 if not touch_object.blob is None:
                     fraction = touch_object.get_blob_fraction()
@@ -145,9 +202,14 @@ class InputInterpreterRule(rule.Rule):
                             angle = touch_object.get_leaving_angle()
                             touch_object.split_blob()
                             self.log.debug(u"Just left blob %s at angle %f.", touch_object.blob, angle)
+                            if self.profiler is not None:
+                                self.profiler.latency.touched(event)
+                            return True
                     else:
                         # move blob
                         touch_object.blob.movement.append(touch_object[-1].position)
+                        if self.profiler is not None:
+                            self.profiler.latency.touched(event)
                 else:
                     blob = self.get_touched_blob(event.pos_x, event.pos_y)
                     if blob:
@@ -156,17 +218,19 @@ class InputInterpreterRule(rule.Rule):
 
         except KeyError:
             self.log.error(u"Multitouch 'MOVED' without prior 'DOWN': %s" % event)
+        return False
 
     def update(self, dt, state):
         self.state = state
-        if not state.debug_objects.has_key("input_interpreter"):
+        if self.debug_batch is not None and \
+                not state.debug_objects.has_key("input_interpreter"):
             state.debug_objects['input_interpreter'] = self.debug_batch
 
         for touch_object in self.touch_objects.values():
             touch_object.decrease_ttl(self.MIN_INTERVAL + dt)
             if touch_object.should_die():
                 self.log.debug(u"Removing %s due to timeout...", str(touch_object))
-                self.on_multitouch_up(touch_object[-1])
+                self._touch_up(touch_object[-1])
 
     def get_touched_blob(self, x, y):
         """Return the blob at position (x, y), if the touch is unambiguous,
@@ -182,6 +246,24 @@ class InputInterpreterRule(rule.Rule):
                 return blobs[0]
         return None
 
+    def get_touched_blobs(self, xs, ys):
+        """Return for each of the points (xs[i], ys[i]) the blob at that
+        position, if the touch is unambiguous, None otherwise."""
+        result = [None] * len(xs)
+        if not self.state or not len(xs):
+            return result
+        blobs = [ blob for player in self.state.players for blob in player.blobs ]
+        if not blobs:
+            return result
+        dx = numpy.asarray(xs, dtype=float)[:, numpy.newaxis] - [ blob.pos_x for blob in blobs ]
+        dy = numpy.asarray(ys, dtype=float)[:, numpy.newaxis] - [ blob.pos_y for blob in blobs ]
+        distances_2 = dx * dx + dy * dy
+        radii = numpy.array([ blob.radius for blob in blobs ])
+        hits = (distances_2 < radii * radii) | (distances_2 == 0.0)
+        for index in numpy.flatnonzero(hits.sum(axis=1) == 1):
+            result[index] = blobs[hits[index].argmax()]
+        return result
+
 class IntroInputInterpreterRule(rule.Rule):
     def __init__(self, input_system, hotspots):
         rule.Rule.__init__(self)
@@ -202,7 +284,7 @@ class IntroInputInterpreterRule(rule.Rule):
                 if callable(hotspot.callback):
                     hotspot.callback(event)
             else:
-                facet = self.state.facet_tree.get_nearest(event.pos_x, event.pos_y)
+                facet = self.state.facet_locator.locate(event.pos_x, event.pos_y)
 
                 if facet.is_border_facet:
                     if facet.home_facet_of:
@@ -1,9 +1,7 @@
 """Blob rules go here."""
-import pyglet
-
 import random
 
-from multiblob import euclid, rule, state as game_state
+from multiblob import effects, euclid, rule, state as game_state
 
 def clamp(value, min_value, max_value):
     return min(max(value, min_value), max_value)
@@ -20,13 +18,18 @@ class PowerupGenerationRule(rule.Rule):
             game_state.IncreaseOccupationPowerup,
             ]
 
-    def __init__(self):
+    def __init__(self, generation_sound=None):
+        """Create the rule.
+
+        Parameters
+        ----------
+        generation_sound : sound effect (optional, defaults to a kick)
+            the sound to play when a powerup is placed
+        """
         rule.Rule.__init__(self)
-        self._powerup_gen_source = pyglet.resource.media("772__vitriolix__kick_wump.wav",
-                streaming = False)
-        self._powerup_gen_player = pyglet.media.Player()
-#        self._powerup_gen_player.queue(self._powerup_gen_source)
-#        self._powerup_gen_player.eos_action = pyglet.media.Player.EOS_PAUSE
+        if generation_sound is None:
+            generation_sound = effects.SoundEffect("772__vitriolix__kick_wump.wav")
+        self._generation_sound = generation_sound
 
     def update(self, dt, state):
         if random.random() > 0.5:
@@ -40,8 +43,7 @@ class PowerupGenerationRule(rule.Rule):
 
                     self.log.debug(u"Placing powerup %s...", powerup)
                     state.powerups.append(powerup)
-                    self._powerup_gen_player.queue(self._powerup_gen_source)
-                    self._powerup_gen_player.play()
+                    self._generation_sound.play()
 
 class PowerupCollectionRule(rule.Rule):
     """Checks for blob-powerup interaction"""
@@ -53,13 +55,18 @@ class PowerupCollectionRule(rule.Rule):
     MAX_OCCUPATION = 1.0
     DEFAULT_OCCUPATION = 0.0
 
-    def __init__(self):
+    def __init__(self, collection_sound=None):
+        """Create the rule.
+
+        Parameters
+        ----------
+        collection_sound : sound effect (optional, defaults to a groan)
+            the sound to play when a powerup is collected
+        """
         rule.Rule.__init__(self)
-        self._powerup_col_source = pyglet.resource.media("958__Anton__groter.wav",
-                streaming = False)
-        self._powerup_col_player = pyglet.media.Player()
-#        self._powerup_col_player.queue(self._powerup_col_source)
-#        self._powerup_col_player.eos_action = pyglet.media.Player.EOS_PAUSE
+        if collection_sound is None:
+            collection_sound = effects.SoundEffect("958__Anton__groter.wav")
+        self._collection_sound = collection_sound
 
     def update(self, dt, state):
         for powerup in state.powerups:
@@ -80,8 +87,7 @@ class PowerupCollectionRule(rule.Rule):
                 if current_occupation == self.MAX_OCCUPATION:
                     self.log.debug(u"Applying %s for player %s...", powerup, player)
                     powerup.apply(relevant_blobs[0], state)
-                    self._powerup_col_player.queue(self._powerup_col_source)
-                    self._powerup_col_player.play()
+                    self._collection_sound.play()
                     state.powerups.remove(powerup)
             for player in state.players:
                 if player not in relevant_players and player in powerup.occupation:
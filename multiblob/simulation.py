@@ -0,0 +1,186 @@
+"""Headless simulation of the main mode without window, audio or network.
+
+Import this module before anything imports `pyglet.gl`, so that no display is
+needed. Run it directly to soak test the rules, e.g.
+`python -m multiblob.simulation --ticks 10000 --players 6`.
+"""
+import logging
+import optparse
+import random
+import sys
+
+import pyglet
+pyglet.options['shadow_window'] = False
+
+from multiblob import input, profiling, rule, state, timing
+from multiblob.modes.main import MainMode
+
+class HeadlessApplication(object):
+    """Runs a GameState with the rules of the main mode as a pure simulation.
+
+    Towards the rules it stands in for MultiblobApplication.
+    """
+
+    rule_interval = 0.05
+
+    def __init__(self, player_count=2, seed=None, window_width=1024, window_height=768,
+            facet_count=(6, 4)):
+        """Set up a board with the given number of players.
+
+        Parameters
+        ----------
+        player_count : int (optional, defaults to 2)
+            the number of players, each gets a random border facet as home
+        seed : int (optional, defaults to None)
+            the seed for the board and all random decisions of the rules
+        window_width : int (optional, defaults to 1024)
+            the width of the simulated board
+        window_height : int (optional, defaults to 768)
+            the height of the simulated board
+        facet_count : tuple of int (optional, defaults to (6, 4))
+            the number of facets along x and y
+        """
+        self.log = logging.getLogger("multiblob.simulation")
+        self.mode_name = 'main'
+
+        self.state = state.GameState(
+                window_width = window_width,
+                window_height = window_height,
+                seed = seed,
+                )
+        self.state.facet_count = facet_count
+        self.state.reset_simple()
+        self.rng = random.Random(seed)
+        border_facets = [ f for f in self.state.facets if f.is_border_facet ]
+        for facet in self.rng.sample(border_facets, min(player_count, len(border_facets))):
+            self.state.add_player(facet)
+
+        self.input_system = input.InputSystem(self)
+        self.rules = rule.GameRuleSystem(
+                rules = MainMode.create_rules(self, headless=True),
+                state = self.state,
+                tick = self.rule_interval,
+                )
+        self.rules.activate()
+        self._next_touch_id = 0
+
+    def start_game(self, setup):
+        """Rebuild the board and the players of a recorded game setup, as
+        written by `recording.InputRecorder.write_setup`."""
+        self.state.window_width = setup['window_width']
+        self.state.window_height = setup['window_height']
+        self.state.facet_count = tuple(setup['facet_count'])
+        self.state.reset_simple()
+        for facet_index, colour in setup['players']:
+            self.state.add_player(self.state.facets[facet_index], tuple(colour))
+        self.mode_name = 'main'
+
+    def set_mode(self, mode_name):
+        self.log.info(u"Switching to mode '%s'.", mode_name)
+        self.mode_name = mode_name
+
+    @property
+    def finished(self):
+        return self.mode_name != 'main'
+
+    def step(self):
+        """Run one simulation tick."""
+        self.rules.step()
+
+    def run(self, ticks):
+        """Run up to `ticks` simulation ticks and stop early when the game is
+        over. Returns the number of ticks run."""
+        for tick in range(ticks):
+            if self.finished:
+                return tick
+            self.step()
+        return ticks
+
+    def drag(self, from_x, from_y, to_x, to_y, steps=5, area=10.0):
+        """Dispatch the multitouch events of a finger dragged in a straight
+        line as one frame."""
+        touch_id = self._next_touch_id
+        self._next_touch_id += 1
+        events = []
+        for index in range(steps + 1):
+            fraction = float(index) / steps
+            if index == 0:
+                object_state = "DOWN"
+            else:
+                object_state = "MOVED"
+            events.append(input.MultitouchEvent(
+                object_type  = "ONE_FINGER_TOUCH",
+                object_id    = touch_id,
+                object_state = object_state,
+                pos_x        = from_x + (to_x - from_x) * fraction,
+                pos_y        = from_y + (to_y - from_y) * fraction,
+                area         = area,
+                height       = 1.0,
+                width        = 1.0,
+                orientation  = 0.0,
+                ))
+        events.append(input.MultitouchEvent(
+            object_type  = "ONE_FINGER_TOUCH",
+            object_id    = touch_id,
+            object_state = "UP",
+            pos_x        = to_x,
+            pos_y        = to_y,
+            area         = area,
+            height       = 1.0,
+            width        = 1.0,
+            orientation  = 0.0,
+            ))
+        self.input_system.dispatch_events(events)
+
+    def random_drag(self):
+        """Drag a random blob to a random position."""
+        blobs = [ blob for player in self.state.players for blob in player.blobs ]
+        if blobs:
+            blob = self.rng.choice(blobs)
+            self.drag(blob.pos_x, blob.pos_y,
+                    self.rng.uniform(0, self.state.window_width),
+                    self.rng.uniform(0, self.state.window_height),
+                    area = self.rng.uniform(1.0, 2.0 * blob.size),
+                    )
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option("-t", "--ticks", type="int", default=10000,
+            help="Run this many simulation ticks, defaults to 10000."
+            )
+    parser.add_option("-p", "--players", type="int", default=2,
+            help="Number of simulated players, defaults to 2."
+            )
+    parser.add_option("--seed", type="int", default=None,
+            help="Seed for the board and the rules, defaults to a random seed."
+            )
+    parser.add_option("--drag-probability", type="float", default=0.2,
+            help="Probability of a random drag gesture per tick, defaults to 0.2."
+            )
+    parser.add_option("--profile-stats", action="store_true", default=False,
+            help="Print percentiles of the rule timings, defaults to false."
+            )
+    options, args = parser.parse_args(args)
+
+    application = HeadlessApplication(options.players, options.seed)
+    if options.profile_stats:
+        application.rules.set_profiler(profiling.Profiler())
+
+    start_time = timing.clock()
+    ticks = 0
+    while ticks < options.ticks and not application.finished:
+        if application.rng.random() < options.drag_probability:
+            application.random_drag()
+        application.step()
+        ticks += 1
+    duration = timing.clock() - start_time
+
+    print "%d ticks in %.2f s (%.0f ticks/s), mode '%s'." % (
+            ticks, duration, ticks / duration if duration else 0.0,
+            application.mode_name)
+    if application.rules.profiler is not None:
+        application.rules.profiler.dump(sys.stdout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
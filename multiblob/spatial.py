@@ -0,0 +1,76 @@
+"""Spatial indexing helpers go here."""
+
+import math
+
+class SpatialHash(object):
+    """A uniform grid that buckets objects by their position.
+
+    With a cell size of at least twice the largest radius, two circles can
+    only touch if their centers lie in the same or in neighbouring cells.
+    """
+
+    # half of the neighbourhood, so that every pair of cells is visited once
+    FORWARD_NEIGHBOURS = [(1, -1), (1, 0), (1, 1), (0, 1)]
+
+    def __init__(self, cell_size=1.0):
+        """Create a new, empty spatial hash.
+
+        Parameters
+        ----------
+        cell_size : float
+            the edge length of the grid cells
+        """
+        self.cell_size = max(float(cell_size), 1.0)
+        self.cells = {}
+
+    @classmethod
+    def from_blobs(cls, blobs):
+        """Create a spatial hash containing `blobs`, sized to their largest
+        radius."""
+        max_radius = max([ blob.radius for blob in blobs ] or [0.0])
+        spatial_hash = cls(2.0 * max_radius)
+        for blob in blobs:
+            spatial_hash.insert(blob, blob.pos_x, blob.pos_y)
+        return spatial_hash
+
+    def cell_of(self, x, y):
+        """Return the cell coordinates of the point (x, y)."""
+        return (
+                int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)),
+                )
+
+    def insert(self, item, x, y):
+        """Insert `item` at position (x, y)."""
+        self.cells.setdefault(self.cell_of(x, y), []).append(item)
+
+    def clear(self):
+        """Remove all items."""
+        self.cells.clear()
+
+    def query(self, x, y):
+        """Return all items in the cell of (x, y) and its neighbours."""
+        cell_x, cell_y = self.cell_of(x, y)
+        result = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                result.extend(self.cells.get((cell_x + dx, cell_y + dy), ()))
+        return result
+
+    def pairs(self):
+        """Yield every unordered pair of items in the same or in neighbouring
+        cells exactly once."""
+        cells = self.cells
+        for (cell_x, cell_y), items in cells.iteritems():
+            for index, item in enumerate(items):
+                for other_item in items[index+1:]:
+                    yield item, other_item
+            for dx, dy in self.FORWARD_NEIGHBOURS:
+                other_items = cells.get((cell_x + dx, cell_y + dy))
+                if other_items:
+                    for item in items:
+                        for other_item in other_items:
+                            yield item, other_item
+
+    def __len__(self):
+        return sum([ len(items) for items in self.cells.itervalues() ])
@@ -1,8 +1,10 @@
-from multiblob import euclid
+from multiblob import board, euclid
 import math
 import random
 import logging
 
+import numpy
+
 def clamp(value, min_value, max_value):
     return min(max(value, min_value), max_value)
 
@@ -39,7 +41,7 @@ class OldApplicationState(object):
 class GameState(object):
     """Basic game state class."""
 
-    def __init__(self, players=[], window_width=1024, window_height=768):
+    def __init__(self, players=[], window_width=1024, window_height=768, seed=None):
         self.players       = players
         self.window_width  = window_width
         self.window_height = window_height
@@ -47,7 +49,11 @@ class GameState(object):
         self.hotspots      = []
         self.powerups      = []
         self.debug_objects = {}
+        self.blob_store    = BlobStore()
+        self.facet_colours = None # a board.FacetColourCache of the facets
+        self.seed          = seed # seed for generating boards, None for a random one
 
+        self.facet_count     = (6, 4) # number of facets along x and y
         self.facet_grid_size = (64, 48)
         self.border_ratio    = 0.0 #1.0/60.0
 
@@ -60,29 +66,36 @@ class GameState(object):
         self.players = []
         self.facets = []
         self.debug_objects = {}
+        self.blob_store.clear()
         self.generate_facets()
 
     def players_free(self):
         return len(self.colours_free)
 
-    def add_player(self, facet):
+    def add_player(self, facet, colour=None):
+        if colour is None:
+            colour = self.colours_free.pop(0)
+        else:
+            self.colours_free.remove(colour)
         player = Player(
                 #PLAYER_COLOURS[self.colour_counter % len(PLAYER_COLOURS)],
-            self.colours_free.pop(0),
-            []
+            colour,
+            [],
+            self.blob_store,
             )
         self.players.append(player)
-        facet.occupation[player] = 1.0
         facet.home_facet_of = player
+        facet.set_occupation(player, 1.0)
 
     def remove_player(self, player):
         self.players.remove(player)
+        for blob in player.blobs[:]:
+            blob.kill()
         self.colours_free.append(player.colour)
         for facet in self.facets:
-            if player in facet.occupation:
-                del facet.occupation[player]
             if facet.home_facet_of is player:
                 facet.home_facet_of = None
+            facet.remove_occupation(player)
 
     def generate_facets_2(self, facet_count):
         sites = [ euclid.Point2(
@@ -101,9 +114,8 @@ class GameState(object):
 
     def generate_facets(self):
         """ generates some random facets """
-        random.seed()
-        FACET_COUNT_X = 6
-        FACET_COUNT_Y = 4
+        random.seed(self.seed)
+        FACET_COUNT_X, FACET_COUNT_Y = self.facet_count
         facet_width = float(self.window_width/FACET_COUNT_X)
         facet_height = float(self.window_height/FACET_COUNT_Y)
         facet_coords = []
@@ -129,8 +141,29 @@ class GameState(object):
 
         # put facets from tree in list
         self.facets = self.facet_tree.get_facets()
+        for index, facet in enumerate(self.facets):
+            facet.index = index
         self.check_border_facets()
         self.calculate_generation_coords()
+        self.facet_locator = board.FacetLocator(
+                self.facets,
+                self.window_width,
+                self.window_height,
+                fallback = self.facet_tree.get_nearest,
+                )
+        self.board_geometry = board.BoardGeometry(self.facets)
+        self.facet_colours = board.FacetColourCache(
+                self.facets,
+                Facet.BASE_COLOUR,
+                Facet.OCCUPATION_COLOUR_FACTOR,
+                )
+        self.blob_store.invalidate_facets()
+
+    def locate_blobs(self):
+        """Update the cached facet of all blobs, that moved far enough to
+        possibly have left it. Afterwards `Blob.facet_index` is valid for all
+        living blobs."""
+        self.blob_store.locate_facets(self.facet_locator)
 
     def put_one_facet_in_facet_tree(self):
         x = random.randint(0, self.window_width)
@@ -237,11 +270,15 @@ class Facet(object):
     """Basic facet on the gaming board."""
 
     BASE_COLOUR = (0.1, 0.1, 0.1, 1.0)
+    OCCUPATION_COLOUR_FACTOR = 0.8 # share of the owner colour at full occupation
 
     MIN_OCCUPATION = 0.0
     MAX_OCCUPATION = 1.0
     DEFAULT_OCCUPATION = 0.0
 
+    colour_cache = None # a board.FacetColourCache told about changes
+    geometry = None # the board.BoardGeometry measuring the facet
+
     def __init__(self, pos_x, pos_y, occupation=None):
         """Create a new facet.
 
@@ -256,27 +293,73 @@ class Facet(object):
         """
         self.pos_x      = pos_x
         self.pos_y      = pos_y
+        self.changes    = 0 # incremented on every change of the occupation
         self.occupation = occupation or {} # mapping of player -> [0..1]
         self.coords     = [] # coordinates of facet polygon
         self.border_indices = set()
         self.is_border_facet = False
+        self.index = None # position in GameState.facets
         self.home_facet_of = None
 
+    @property
+    def occupation(self):
+        """The mapping of player -> [0..1]. Change it only through
+        `set_occupation`, `add_occupation` and `remove_occupation`, so the
+        owner is kept up to date."""
+        return self._occupation
+
+    @occupation.setter
+    def occupation(self, value):
+        self._occupation = value
+        self._update_owner()
+
     def set_occupation(self, player, value):
-        self.occupation[player] = clamp(
+        value = clamp(
                 value,
                 self.MIN_OCCUPATION,
                 self.MAX_OCCUPATION,
                 )
+        if self._occupation.get(player) != value:
+            self._occupation[player] = value
+            self._occupation_changed(player, value)
     
     def add_occupation(self, player, value):
-        self.occupation[player] = clamp(
-                self.occupation.get(player, self.DEFAULT_OCCUPATION) + \
-                        value,
-                self.MIN_OCCUPATION,
-                self.MAX_OCCUPATION,
+        self.set_occupation(
+                player,
+                self._occupation.get(player, self.DEFAULT_OCCUPATION) + value,
                 )
 
+    def remove_occupation(self, player):
+        if player in self._occupation:
+            del self._occupation[player]
+            self._update_owner()
+
+    def _occupation_changed(self, player, value):
+        if player is self._owner:
+            if value >= self._owner_occupation:
+                # the owner only got stronger
+                self._owner_occupation = value
+                self._changed()
+                return
+        elif value < self._owner_occupation:
+            # somebody else changed, but still does not lead
+            self._changed()
+            return
+        self._update_owner()
+
+    def _update_owner(self):
+        if self._occupation:
+            self._owner, self._owner_occupation = max(
+                    self._occupation.items(), key=lambda i: i[1])
+        else:
+            self._owner, self._owner_occupation = None, 0.0
+        self._changed()
+
+    def _changed(self):
+        self.changes += 1
+        if self.colour_cache is not None:
+            self.colour_cache.mark_changed(self.index)
+
     def has_coord(self, x, y):
         return (x, y) in zip(
                 self.coords[::2],
@@ -294,14 +377,18 @@ class Facet(object):
 
     @property
     def owner(self):
-        if self.occupation:
-            return max(self.occupation.items(), key=lambda i: i[1])[0]
-        return None
+        """The player with the highest occupation."""
+        return self._owner
+
+    @property
+    def owner_occupation(self):
+        """The occupation of the owner."""
+        return self._owner_occupation
 
     def get_colour(self, for_index=None):
-        owner = self.owner
+        owner = self._owner
         if owner:
-            occupation_factor = float(self.occupation[owner]) * 0.8
+            occupation_factor = float(self._owner_occupation) * self.OCCUPATION_COLOUR_FACTOR
             if for_index and for_index in self.border_indices:
                 occupation_factor *= 0.0
             return tuple( 
@@ -325,6 +412,8 @@ class Facet(object):
 
     @property
     def area(self):
+        if self.geometry is not None:
+            return float(self.geometry.areas[self.index])
         area = 0.0
         last_x = self.coords[-2]
         last_y = self.coords[-1]
@@ -337,6 +426,9 @@ class Facet(object):
     @property
     def bounding_box(self):
         """ the axis parallel bounding box of the facet """
+        if self.geometry is not None:
+            minX, minY, maxX, maxY = self.geometry.bounding_boxes[self.index]
+            return (euclid.Point2(minX, minY), euclid.Point2(maxX, maxY))
         minX = float("infinity")
         maxX = float("-infinity")
         for x in self.coords[::2]:
@@ -377,6 +469,9 @@ class FacetTreeElem(Facet):
         self.right = None
 
     def get_nearest(self, x, y):
+        """Return the leaf whose site is nearest to (x, y) along the path of
+        bisections. This is only used to build the tree, use
+        `GameState.facet_locator` to find the facet containing a point."""
         if self.left == None and self.right == None:
             return self
         else:
@@ -481,7 +576,7 @@ class BorderFacet(Facet):
 class Player(object):
     """Basic player object."""
 
-    def __init__(self, colour, blobs):
+    def __init__(self, colour, blobs, store=None):
         """Create a new player.
         
         Parameters
@@ -490,17 +585,185 @@ class Player(object):
             the color of the player
         blobs : list of Blob instances
             the player's initial blobs
+        store : BlobStore (optional, defaults to a new store)
+            the store that keeps the attributes of the player's blobs
         """
         self.colour = colour
         self.blobs = blobs
         self.score = 0
+        self.store = store if store is not None else BlobStore()
 
     @property
     def overall_size(self):
         return sum([ blob.size for blob in self.blobs ])
 
+class BlobStore(object):
+    """Keeps the frequently used attributes of many blobs in contiguous NumPy
+    arrays (one array per column, one row per blob).
+
+    Rows of killed blobs are marked as not alive and reclaimed by `compact`,
+    which detaches the dead `Blob` views from the store.
+    """
+
+    COLUMNS = [
+            ('pos_x',        numpy.float64, 0.0),
+            ('pos_y',        numpy.float64, 0.0),
+            ('size',         numpy.float64, 0.0),
+            ('speed',        numpy.float64, 0.0),
+            ('player',       numpy.int32,   0),
+            ('alive',        numpy.bool_,   True),
+            # cached facet location, see `locate_facets`
+            ('facet',        numpy.int32,   -1),
+            ('facet_x',      numpy.float64, 0.0),
+            ('facet_y',      numpy.float64, 0.0),
+            ('facet_radius', numpy.float64, 0.0),
+            ]
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        """Create a new, empty blob store.
+
+        Parameters
+        ----------
+        capacity : int (optional, defaults to INITIAL_CAPACITY)
+            the number of rows to allocate initially
+        """
+        self.capacity = max(int(capacity), 1)
+        self.count    = 0  # number of used rows
+        self.blobs    = [] # mapping of row -> Blob
+        self.players  = [] # mapping of player index -> Player
+        for name, dtype, default in self.COLUMNS:
+            setattr(self, name, numpy.zeros(self.capacity, dtype=dtype))
+
+    def column(self, name):
+        """Return a view of the used rows of the column `name`."""
+        return getattr(self, name)[:self.count]
+
+    def radii(self):
+        """Return the radii of all used rows."""
+        return numpy.sqrt(self.column('size')) * Blob.RADIUS_FACTOR
+
+    def player_index(self, player):
+        """Return the index used for `player` in the player column."""
+        for index, known_player in enumerate(self.players):
+            if known_player is player:
+                return index
+        self.players.append(player)
+        return len(self.players) - 1
+
+    def allocate(self, blob, **values):
+        """Allocate a row for `blob`, initialize it with `values` and return
+        its index."""
+        if self.count == self.capacity:
+            self.compact()
+            if self.count == self.capacity:
+                self._grow(2 * self.capacity)
+        row = self.count
+        self.count += 1
+        self.blobs.append(blob)
+        for name, dtype, default in self.COLUMNS:
+            getattr(self, name)[row] = values.get(name, default)
+        return row
+
+    def locate_facets(self, locator):
+        """Update the cached facet index of all living rows, that moved past
+        the safe radius around the position they were last located at.
+
+        Parameters
+        ----------
+        locator : board.FacetLocator
+            the locator of the current board
+        """
+        count = self.count
+        diff_x = self.pos_x[:count] - self.facet_x[:count]
+        diff_y = self.pos_y[:count] - self.facet_y[:count]
+        radius = self.facet_radius[:count]
+        stale = self.alive[:count] & ((self.facet[:count] < 0) |
+                (diff_x * diff_x + diff_y * diff_y >= radius * radius))
+        rows = numpy.flatnonzero(stale)
+        if len(rows):
+            xs = self.pos_x[rows]
+            ys = self.pos_y[rows]
+            facets = locator.locate_indices(xs, ys)
+            self.facet[rows] = facets
+            self.facet_x[rows] = xs
+            self.facet_y[rows] = ys
+            self.facet_radius[rows] = locator.safe_radii(facets, xs, ys)
+        return rows
+
+    def invalidate_facets(self):
+        """Forget all cached facet locations."""
+        self.facet[:] = -1
+
+    def release(self, row):
+        """Mark the given row as dead."""
+        self.alive[row] = False
+
+    def compact(self):
+        """Move all living rows to the front and detach dead blobs."""
+        alive = self.column('alive')
+        if alive.all():
+            return
+        for row in numpy.flatnonzero(~alive):
+            self.blobs[row]._detach()
+        keep = numpy.flatnonzero(alive)
+        for name, dtype, default in self.COLUMNS:
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+        self.blobs = [ self.blobs[row] for row in keep ]
+        for row, blob in enumerate(self.blobs):
+            blob._row = row
+        self.count = len(keep)
+
+    def clear(self):
+        """Detach all blobs and remove all rows."""
+        for blob in self.blobs:
+            blob._detach()
+        self.blobs   = []
+        self.players = []
+        self.count   = 0
+
+    def _grow(self, capacity):
+        for name, dtype, default in self.COLUMNS:
+            column = numpy.zeros(capacity, dtype=dtype)
+            column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def __len__(self):
+        return int(numpy.count_nonzero(self.column('alive')))
+
+class _BlobColumn(object):
+    """Descriptor exposing one column of a blob's store row as an
+    attribute."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, blob, cls=None):
+        if blob is None:
+            return self
+        return getattr(blob.store, self.name).item(blob._row)
+
+    def __set__(self, blob, value):
+        getattr(blob.store, self.name).itemset(blob._row, value)
+
 class Blob(object):
-    """Basic blob of colour."""
+    """Basic blob of colour.
+
+    The position, size and speed live in the `BlobStore` of the player, a
+    blob is just a view of its row in there.
+    """
+
+    RADIUS_FACTOR = 5.0
+
+    pos_x = _BlobColumn('pos_x')
+    pos_y = _BlobColumn('pos_y')
+    size  = _BlobColumn('size')
+    speed = _BlobColumn('speed')
+    alive = _BlobColumn('alive')
+    facet_index = _BlobColumn('facet')
 
     def __init__(self, player, pos_x, pos_y, size):
         """Create a new blob.
@@ -517,12 +780,16 @@ class Blob(object):
             the size (=strength) of the blob
         """
         self.player = player
-        self.pos_x = float(pos_x)
-        self.pos_y = float(pos_y)
-        self.size = size
+        self.store = player.store
+        self._row = self.store.allocate(self,
+                pos_x  = float(pos_x),
+                pos_y  = float(pos_y),
+                size   = size,
+                speed  = 3.0,
+                player = self.store.player_index(player),
+                )
         self.movement = [] # list of coordinates
         self.movement_flag = 0
-        self.speed = 3.0
         
         self.combat_index = [] # 
 
@@ -534,6 +801,25 @@ class Blob(object):
         if not self in player.blobs:
             player.blobs.append(self)
 
+    def kill(self):
+        """Remove the blob from the game."""
+        self.size = 0
+        self.store.release(self._row)
+        try:
+            self.player.blobs.remove(self)
+        except ValueError:
+            pass
+
+    def _detach(self):
+        """Move the blob's attributes out of its store into a private one."""
+        store = BlobStore(1)
+        row = store.allocate(self, **dict(
+            (name, getattr(self.store, name)[self._row])
+            for name, dtype, default in BlobStore.COLUMNS
+            ))
+        self.store = store
+        self._row = row
+
     @property
     def position(self):
         return euclid.Point2(float(self.pos_x), float(self.pos_y))
@@ -545,7 +831,7 @@ class Blob(object):
 
     @property
     def radius(self):
-        return math.sqrt(float(self.size)) * 5
+        return math.sqrt(float(self.size)) * self.RADIUS_FACTOR
 
     @property
     def circle(self):
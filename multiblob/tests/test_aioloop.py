@@ -0,0 +1,82 @@
+import socket
+import unittest
+
+from multiblob import aioloop, input
+
+@unittest.skipIf(aioloop.asyncio is None, "needs trollius")
+class AsyncioLoopTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = aioloop.asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_periodic_task(self):
+        """Test calling a function at a fixed interval."""
+        calls = []
+        def function(dt):
+            calls.append(dt)
+            if len(calls) == 3:
+                self.loop.stop()
+
+        task = aioloop.PeriodicTask(self.loop, 0.01, function)
+        task.start()
+        self.loop.run_forever()
+        task.stop()
+
+        self.failUnlessEqual(len(calls), 3)
+        self.failUnless(all(dt > 0.0 for dt in calls))
+
+    def test_protocol(self):
+        """Test receiving datagrams through the protocol."""
+        received = []
+        def handler(data):
+            received.append(data)
+            self.loop.stop()
+
+        transport, protocol = self.loop.run_until_complete(
+                self.loop.create_datagram_endpoint(
+                    lambda: aioloop.TrackerProtocol(handler),
+                    local_addr = ('127.0.0.1', 0),
+                    ))
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sender.sendto("chunkID:1//", transport.get_extra_info('sockname'))
+        self.loop.call_later(5.0, self.loop.stop)
+        self.loop.run_forever()
+        sender.close()
+        transport.close()
+
+        self.failUnlessEqual(received, ["chunkID:1//"])
+        self.failUnlessEqual(protocol.datagram_count, 1)
+
+    def test_invalid_datagram(self):
+        """Test that the protocol skips datagrams the handler rejects."""
+        received = []
+        def handler(data):
+            if not data.isdigit():
+                raise input.InvalidEventDataError(data)
+            received.append(int(data))
+        protocol = aioloop.TrackerProtocol(handler)
+        for data in ("1", "x", "2"):
+            protocol.datagram_received(data, ('127.0.0.1', 0))
+
+        self.failUnlessEqual(received, [1, 2])
+        self.failUnlessEqual(protocol.invalid_count, 1)
+
+    def test_receive_buffer(self):
+        """Test that the endpoint gets the requested receive buffer."""
+        application = FakeApplication()
+        asyncio_loop = aioloop.AsyncioLoop(application, self.loop, receive_buffer=65536)
+        asyncio_loop._open_endpoint()
+        udp_socket = asyncio_loop.transport.get_extra_info('socket')
+        buffer_size = udp_socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        asyncio_loop.transport.close()
+
+        self.failUnless(buffer_size >= 65536)
+
+class FakeApplication(object):
+    udp_address = '127.0.0.1'
+    udp_port = 0
+
+    def _receive_udp(self, data):
+        pass
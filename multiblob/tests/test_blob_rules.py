@@ -0,0 +1,96 @@
+import unittest
+
+import numpy
+import pyglet
+pyglet.options['shadow_window'] = False
+
+from multiblob import euclid, particles, state
+from multiblob.rules import blob_combat, blobs
+
+def legacy_movement_step(blob):
+    """One step of a blob as BlobMovementRule did it with Vector2 before the
+    rule was vectorized."""
+    current_movement = blob.movement[0]
+    diff = (current_movement - blob.position)
+    movement_step = diff.normalized() * blob.speed
+
+    # remove movement if complete with this step
+    if abs(movement_step) >= abs(diff):
+        blob.movement.pop(0)
+
+    blob.position += movement_step
+
+class FakeState(object):
+    def __init__(self, players):
+        self.players = players
+
+class BlobMovementRuleTest(unittest.TestCase):
+    BLOB_COUNT = 40
+    WAYPOINT_COUNT = 5
+    STEPS = 60
+
+    def _make_player(self, random):
+        """Create a player with blobs at the same random positions, speeds and
+        waypoints for every random state with the same seed."""
+        player = state.Player((1.0, 0.0, 0.0, 1.0), [], state.BlobStore())
+        for index in range(self.BLOB_COUNT):
+            pos_x, pos_y = random.uniform(0.0, 500.0, 2)
+            blob = state.Blob(player, pos_x, pos_y, 10.0)
+            blob.speed = random.choice([0.0, 3.0, random.uniform(0.5, 50.0)])
+            waypoints = [ euclid.Point2(*random.uniform(0.0, 500.0, 2))
+                    for i in range(self.WAYPOINT_COUNT) ]
+            if index % 4 == 0:
+                # a waypoint on the blob itself (distance 0)
+                waypoints.insert(0, euclid.Point2(pos_x, pos_y))
+            elif index % 4 == 1:
+                # a waypoint closer than one step (overshoot)
+                waypoints.insert(0, euclid.Point2(pos_x + blob.speed / 3.0, pos_y))
+            blob.movement = waypoints
+        return player
+
+    def test_legacy_equivalence(self):
+        """Test that the vectorized movement matches the per-blob movement."""
+        player = self._make_player(numpy.random.RandomState(3))
+        legacy_player = self._make_player(numpy.random.RandomState(3))
+        rule = blobs.BlobMovementRule(particles.ParticleSystem(seed=0))
+        game_state = FakeState([player])
+
+        for step in range(self.STEPS):
+            rule.update(0.05, game_state)
+            for blob in legacy_player.blobs:
+                if blob.movement:
+                    legacy_movement_step(blob)
+
+            for blob, legacy_blob in zip(player.blobs, legacy_player.blobs):
+                self.failUnlessAlmostEqual(blob.pos_x, legacy_blob.pos_x, places=9)
+                self.failUnlessAlmostEqual(blob.pos_y, legacy_blob.pos_y, places=9)
+                self.failUnlessEqual(len(blob.movement), len(legacy_blob.movement))
+
+        # some blobs have reached all their waypoints, others are still moving
+        remaining = [ len(blob.movement) for blob in player.blobs ]
+        self.failUnless(0 in remaining)
+        self.failUnless(max(remaining) > 0)
+
+class FakeSound(object):
+    def play(self):
+        pass
+
+    def pause(self):
+        pass
+
+class BlobCombatTest(unittest.TestCase):
+    def test_merge_beyond_hash_radius(self):
+        """Test that a blob grown by merging beyond the largest radius the
+        spatial hash was built for still reaches the blobs it touches."""
+        player = state.Player((1.0, 0.0, 0.0, 1.0), [], state.BlobStore())
+        # four blobs of radius 50 merging into one of radius 100
+        merging = [ state.Blob(player, pos_x, 0.0, 100.0) for pos_x in (99.0, 90.0, 80.0, 70.0) ]
+        # two cells of 100 away from the merging blobs, but touching the result
+        far_blob = state.Blob(player, 201.0, 0.0, 9.0)
+        rule = blob_combat.BlobCombat(FakeSound())
+
+        rule.update(0.2, FakeState([player]))
+
+        self.failUnlessEqual(player.blobs, [merging[0]])
+        self.failUnlessEqual(merging[0].size, 409.0)
+        self.failIf(far_blob.alive)
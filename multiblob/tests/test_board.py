@@ -0,0 +1,135 @@
+import unittest
+
+from multiblob import board, state
+
+class FacetLocatorTest(unittest.TestCase):
+    def setUp(self):
+        # a 100x50 board split into a left square and two right triangles
+        self.left = state.Facet(25.0, 25.0)
+        self.left.coords = [0, 0, 50, 0, 50, 50, 0, 50]
+        self.lower = state.Facet(80.0, 10.0)
+        self.lower.coords = [50, 0, 100, 0, 100, 50]
+        self.upper = state.Facet(60.0, 40.0)
+        self.upper.coords = [50, 50, 50, 0, 100, 50]
+        self.facets = [self.left, self.lower, self.upper]
+
+        self.locator = board.FacetLocator(self.facets, 100, 50)
+
+    def test_locate(self):
+        """Test single point lookups."""
+        self.failUnless(self.locator.locate(10.0, 10.0) is self.left)
+        self.failUnless(self.locator.locate(90.0, 20.0) is self.lower)
+        self.failUnless(self.locator.locate(60.0, 45.0) is self.upper)
+
+    def test_locate_outside(self):
+        """Test that points outside the board are clamped onto it."""
+        self.failUnless(self.locator.locate(-10.0, 20.0) is self.left)
+        self.failUnless(self.locator.locate(150.0, 1.0) is self.lower)
+
+    def test_locate_indices(self):
+        """Test batch lookups."""
+        indices = self.locator.locate_indices([10.0, 90.0, 60.0], [10.0, 20.0, 45.0])
+
+        self.failUnlessEqual(indices.tolist(), [0, 1, 2])
+
+    def test_generated_board(self):
+        """Test that every cell of a generated board belongs to a facet."""
+        game_state = state.GameState()
+        game_state.reset_simple()
+
+        grid = game_state.facet_locator.grid
+        self.failUnless((grid >= 0).all())
+        self.failUnlessEqual(set(grid.ravel()), set(range(len(game_state.facets))))
+
+class BoardGeometryTest(unittest.TestCase):
+    def setUp(self):
+        self.facets = [ state.Facet(25.0, 25.0), state.Facet(80.0, 10.0), state.Facet(60.0, 40.0) ]
+        self.facets[0].coords = [0, 0, 50, 0, 50, 50, 0, 50]
+        self.facets[1].coords = [50, 0, 100, 0, 100, 50]
+        self.facets[2].coords = [50, 50, 50, 0, 100, 50]
+        for index, facet in enumerate(self.facets):
+            facet.index = index
+
+        self.geometry = board.BoardGeometry(self.facets)
+
+    def test_measures(self):
+        """Test areas, centroids and bounding boxes."""
+        self.failUnlessEqual(self.geometry.areas.tolist(), [2500.0, 1250.0, 1250.0])
+        self.failUnlessEqual(self.geometry.centroids[0].tolist(), [25.0, 25.0])
+        self.failUnlessEqual(self.geometry.bounding_boxes[1].tolist(), [50.0, 0.0, 100.0, 50.0])
+
+    def test_facet_measures(self):
+        """Test that the facets take their measures from the geometry."""
+        self.failUnless(self.facets[2].geometry is self.geometry)
+        self.geometry.areas[2] = 42.0
+        self.failUnlessEqual(self.facets[2].area, 42.0)
+        lower_left, upper_right = self.facets[1].bounding_box
+        self.failUnlessEqual((lower_left.x, lower_left.y, upper_right.x, upper_right.y),
+                (50.0, 0.0, 100.0, 50.0))
+
+    def test_distances(self):
+        """Test the facet distance matrix."""
+        self.failUnlessAlmostEqual(self.geometry.distances[0, 2], (35.0 ** 2 + 15.0 ** 2) ** 0.5)
+        self.failUnlessEqual(self.geometry.distances[1, 1], 0.0)
+
+    def test_adjacency(self):
+        """Test that facets sharing an edge are adjacent."""
+        self.failUnlessEqual(self.geometry.adjacency, [set([2]), set([2]), set([0, 1])])
+
+        # facets touching in a single corner are not adjacent
+        corner = state.Facet(150.0, 75.0)
+        corner.coords = [100, 50, 200, 50, 200, 100]
+        corner.index = 3
+        geometry = board.BoardGeometry(self.facets + [corner])
+        self.failUnlessEqual(geometry.adjacency[3], set())
+
+class BoardMeshTest(unittest.TestCase):
+    def test_mesh(self):
+        """Test the triangulation and outlines of a square and a triangle."""
+        square = state.Facet(25.0, 25.0)
+        square.coords = [0, 0, 50, 0, 50, 50, 0, 50]
+        triangle = state.Facet(80.0, 10.0)
+        triangle.coords = [50, 0, 100, 0, 100, 50]
+        mesh = board.BoardMesh([square, triangle])
+
+        self.failUnlessEqual(mesh.vertex_ranges.tolist(), [[0, 4], [4, 7]])
+        self.failUnlessEqual(mesh.fill_indices.tolist(), [0, 1, 2, 0, 2, 3, 4, 5, 6])
+        self.failUnlessEqual(mesh.outline_ranges.tolist(), [[0, 8], [8, 14]])
+        self.failUnlessEqual(mesh.outline_vertices[6:8].tolist(), [[0, 50], [0, 0]])
+
+        # the triangles cover the area of the polygons
+        triangles = mesh.vertices[mesh.fill_indices].reshape(-1, 3, 2)
+        a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        areas = abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) -
+                (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])) / 2.0
+        self.failUnlessEqual(areas.sum(), 2500.0 + 1250.0)
+
+class FacetColourCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.game_state = state.GameState()
+        self.game_state.reset_simple()
+        self.cache = self.game_state.facet_colours
+        self.game_state.add_player(self.game_state.facets[0])
+        self.player = self.game_state.players[-1]
+
+    def test_changes(self):
+        """Test that only changed facets are recomputed."""
+        version = self.cache.version
+        self.failUnlessEqual(self.cache.update().tolist(), [0])
+        self.failUnlessEqual(self.cache.update().tolist(), [])
+
+        facet = self.game_state.facets[5]
+        facet.set_occupation(self.player, 0.5)
+        self.failUnlessEqual(self.cache.changed_since(version).tolist(), [0, 5])
+        self.failUnlessEqual(self.cache.changed_since(self.cache.version).tolist(), [])
+
+    def test_colours(self):
+        """Test that the cached colours match the colours of the facets."""
+        for index, facet in enumerate(self.game_state.facets[:6]):
+            facet.set_occupation(self.player, index / 5.0)
+        facet.remove_occupation(self.player)
+        self.cache.update()
+
+        for facet in self.game_state.facets:
+            for cached, expected in zip(self.cache.colours[facet.index], facet.colour):
+                self.failUnlessAlmostEqual(cached, expected, places=2)
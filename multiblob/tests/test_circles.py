@@ -0,0 +1,46 @@
+import unittest
+
+import numpy
+import pyglet
+pyglet.options['shadow_window'] = False
+
+from multiblob import circles
+from multiblob.renderers import blobs
+
+class CirclesTest(unittest.TestCase):
+    def test_circle(self):
+        """Test the polygon coordinates of a single circle."""
+        coords = circles.circle((10.0, 20.0), 5.0)
+        self.failUnlessEqual(len(coords), circles.SEGMENTS * 2)
+        self.failUnlessAlmostEqual(coords[0], 10.0)
+        self.failUnlessAlmostEqual(coords[1], 25.0)
+
+    def test_circle_outlines(self):
+        """Test that the outline segments are closed and on the circles."""
+        outlines = circles.circle_outlines([0.0, 100.0], [0.0, 50.0], [1.0, 10.0])
+        self.failUnlessEqual(outlines.shape, (2, circles.LINE_VERTEX_COUNT, 2))
+        distances = numpy.hypot(outlines[1, :, 0] - 100.0, outlines[1, :, 1] - 50.0)
+        self.failUnless(numpy.allclose(distances, 10.0))
+        # every segment starts where the previous one ended
+        self.failUnless(numpy.allclose(outlines[0, 1:-1:2], outlines[0, 2::2]))
+        self.failUnless(numpy.allclose(outlines[0, -1], outlines[0, 0]))
+
+class CircleOutlineBufferTest(unittest.TestCase):
+    def test_update(self):
+        """Test the chunked capacity and the hidden unused slots."""
+        batch = pyglet.graphics.Batch()
+        outline_buffer = blobs.CircleOutlineBuffer(batch)
+        outline_buffer.update([1.0, 2.0], [1.0, 2.0], [1.0, 1.0],
+                [(255, 0, 0, 255)] * 2)
+        vertex_count = outline_buffer.CHUNK_SIZE * circles.LINE_VERTEX_COUNT
+        self.failUnlessEqual(len(outline_buffer._vertex_list.vertices), vertex_count * 2)
+        colours = list(outline_buffer._vertex_list.colors)
+        self.failUnlessEqual(colours[:4], [255, 0, 0, 255])
+        self.failUnlessEqual(colours[2*circles.LINE_VERTEX_COUNT*4 + 3], 0)
+
+        outline_buffer.update([0.0] * 40, [0.0] * 40, [1.0] * 40,
+                [(255, 255, 255, 255)] * 40)
+        self.failUnlessEqual(len(outline_buffer._vertex_list.vertices), vertex_count * 4)
+        outline_buffer.update([], [], [], [])
+        self.failUnlessEqual(len(outline_buffer._vertex_list.vertices), vertex_count * 2)
+        self.failUnlessEqual(max(outline_buffer._vertex_list.colors), 0)
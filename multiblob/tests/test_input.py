@@ -73,3 +73,132 @@ class InputTest(unittest.TestCase):
         self.failUnlessEqual(event.width, width)
         self.failUnlessEqual(event.height, height)
 
+
+    def test_chunk_parser(self):
+        """Test that the single pass parser matches the object parser."""
+        objects = [
+                "ObjectType:1 ID:0 ObjectState:2 PosX:0.5 PosY:0.6 Area:0.0004 Width:0.0005 Height:0.003 Orientation:68.34",
+                "ObjectType:1 ID:1 ObjectState:0 PosX:0.4 PosY:0.3 Area:0.0004 Width:0.0002 Height:0.005 Orientation:20.34",
+                ]
+        events = input.MultitouchEvent.from_chunk("//".join(objects) + "//", 800, 600)
+
+        self.failUnlessEqual(len(events), 2)
+        for event, input_object in zip(events, objects):
+            expected = input.MultitouchEvent.from_packet(input_object)
+            expected.scale_to_dimensions(800, 600)
+            for attribute in ['object_type', 'object_id', 'object_state', 'pos_x',
+                    'pos_y', 'area', 'width', 'height', 'orientation']:
+                self.failUnlessAlmostEqual(getattr(event, attribute), getattr(expected, attribute))
+
+        self.failUnlessRaises(
+                input.InvalidEventDataError,
+                input.MultitouchEvent.from_chunk,
+                objects[0] + "//ObjectType:1 ID:x//",
+                )
+
+        # garbage around the objects is rejected as by the object parser
+        self.failUnlessRaises(
+                input.InvalidEventDataError,
+                input.MultitouchEvent.from_chunk,
+                "garbage" + objects[0] + "//",
+                )
+        self.failUnlessRaises(
+                input.InvalidEventDataError,
+                input.MultitouchEvent.from_chunk,
+                objects[0] + "//garbage//",
+                )
+        # malformed numbers matched by the pattern are rejected as well
+        self.failUnlessRaises(
+                input.InvalidEventDataError,
+                input.MultitouchEvent.from_chunk,
+                objects[0].replace("PosX:0.5", "PosX:0.5.0") + "//",
+                )
+        self.failUnlessEqual(input.MultitouchEvent.match_chunk("//" + objects[0] + "////" + objects[1]),
+                [ input.MultitouchEvent.packet_re.match(x).groups() for x in objects ])
+        self.failUnlessEqual(input.MultitouchEvent.match_chunk(objects[0] + "garbage//"), None)
+
+    def test_chunk_ids(self):
+        """Test counting dropped and late chunks."""
+        dispatcher = input.InputSystem(None)
+        for chunk_id in [1, 2, 5, 4, 6, 7]:
+            dispatcher.parse_packet("chunkID:%d//" % chunk_id)
+
+        self.failUnlessEqual(dispatcher.dropped_chunk_count, 2)
+        self.failUnlessEqual(dispatcher.late_chunk_count, 1)
+        self.failUnlessEqual(dispatcher.last_chunk_id, 7)
+
+        # a restarted tracker starts counting again
+        dispatcher.parse_packet("chunkID:7000//")
+        dispatcher.parse_packet("chunkID:0//")
+        dispatcher.parse_packet("chunkID:1//")
+        self.failUnlessEqual(dispatcher.late_chunk_count, 1)
+        self.failUnlessEqual(dispatcher.last_chunk_id, 1)
+
+        # parsing off the main thread leaves the counting to queue_chunk
+        dropped_chunk_count = dispatcher.dropped_chunk_count
+        chunk_id, events = dispatcher.parse_chunk("chunkID:4//")
+        self.failUnlessEqual((chunk_id, events), (4, []))
+        self.failUnlessEqual(dispatcher.last_chunk_id, 1)
+        dispatcher.queue_chunk(chunk_id, events)
+        self.failUnlessEqual(dispatcher.dropped_chunk_count, dropped_chunk_count + 2)
+        self.failUnlessEqual(dispatcher.last_chunk_id, 4)
+
+        # chunks without a valid header are rejected as a whole
+        for data in ["ObjectType:1 ID:0//", "chunkID:x//", "//chunkID:2//"]:
+            self.failUnlessRaises(input.InvalidEventDataError,
+                    dispatcher.parse_packet, data)
+        self.failUnlessEqual(dispatcher.last_chunk_id, 4)
+
+    def test_coalesce_moved(self):
+        """Test that only the latest MOVED event per object is dispatched."""
+        dispatched = []
+        dispatcher = input.InputSystem(None, coalesce_moved=True)
+        def dispatch_event(event_type, event):
+            if event_type != 'on_multitouch_frame':
+                dispatched.append((event.object_state, event.object_id, event.pos_x))
+        dispatcher.dispatch_event = dispatch_event
+
+        def event(object_state, object_id, pos_x):
+            return input.MultitouchEvent("ONE_FINGER_TOUCH", object_id, object_state,
+                    pos_x, 0.0, 1.0, 1.0, 1.0, 0.0)
+
+        dispatcher.queue_events([
+            event("DOWN", 0, 0.0),
+            event("MOVED", 0, 1.0),
+            event("MOVED", 1, 1.0),
+            event("MOVED", 0, 2.0),
+            event("UP", 0, 3.0),
+            event("MOVED", 1, 2.0),
+            event("DOWN", 0, 4.0),
+            event("MOVED", 0, 5.0),
+            ])
+        self.failUnlessEqual(dispatched, [])
+
+        dispatcher.flush()
+        self.failUnlessEqual(dispatched, [
+            ("DOWN", 0, 0.0),
+            ("MOVED", 0, 2.0),
+            ("MOVED", 1, 2.0),
+            ("UP", 0, 3.0),
+            ("DOWN", 0, 4.0),
+            ("MOVED", 0, 5.0),
+            ])
+        self.failUnlessEqual(dispatcher.coalesced_event_count, 2)
+
+        dispatcher.flush()
+        self.failUnlessEqual(len(dispatched), 6)
+
+    def test_frame(self):
+        """Test dispatching a frame before the single events."""
+        dispatched = []
+        dispatcher = input.InputSystem(None)
+        dispatcher.dispatch_event = lambda event_type, event: dispatched.append(event_type)
+        events = [
+                input.MultitouchEvent("ONE_FINGER_TOUCH", 0, "DOWN", 0.0, 0.0, 1.0, 1.0, 1.0, 0.0),
+                input.MultitouchEvent("ONE_FINGER_TOUCH", 0, "UP", 0.0, 0.0, 1.0, 1.0, 1.0, 0.0),
+                ]
+        dispatcher.dispatch_events(events)
+
+        self.failUnlessEqual(dispatched,
+                ['on_multitouch_frame', 'on_multitouch_down', 'on_multitouch_up'])
+        self.failUnless(events[0].in_frame)
@@ -0,0 +1,97 @@
+import socket
+import time
+import unittest
+
+from multiblob import input, network
+
+TOUCH_DOWN = "ObjectType:1 ID:0 ObjectState:0 PosX:0.5 PosY:0.5 Area:0.0004 Width:0.0005 Height:0.003 Orientation:0.0//"
+
+class FakeState(object):
+    window_width = 800
+    window_height = 600
+
+class FakeApplication(object):
+    state = FakeState()
+
+class UdpReceiverTest(unittest.TestCase):
+    def setUp(self):
+        self.receiver = network.UdpReceiver('127.0.0.1', 0, batch_size=4,
+                receive_buffer=65536)
+        self.address = self.receiver.socket.getsockname()
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_drain(self):
+        """Test reading all pending datagrams without blocking."""
+        received = []
+        self.failUnlessEqual(self.receiver.drain(received.append), 0)
+
+        for index in range(3):
+            self.sender.sendto("chunkID:%d//" % index, self.address)
+        self.failUnlessEqual(self.receiver.drain(received.append), 3)
+        self.failUnlessEqual(received, ["chunkID:0//", "chunkID:1//", "chunkID:2//"])
+        self.failUnlessEqual(self.receiver.backlog_count, 0)
+
+    def test_backlog(self):
+        """Test that a drain stops at the batch size and reports the backlog."""
+        received = []
+        for index in range(6):
+            self.sender.sendto("chunkID:%d//" % index, self.address)
+
+        self.failUnlessEqual(self.receiver.drain(received.append), 4)
+        self.failUnlessEqual(self.receiver.backlog_count, 1)
+        self.failUnlessEqual(self.receiver.drain(received.append), 2)
+        self.failUnlessEqual(self.receiver.datagram_count, 6)
+
+    def test_exact_batch(self):
+        """Test that reading exactly the batch size is no backlog."""
+        for index in range(4):
+            self.sender.sendto("chunkID:%d//" % index, self.address)
+
+        self.failUnlessEqual(self.receiver.drain(lambda data: None), 4)
+        self.failUnlessEqual(self.receiver.backlog_count, 0)
+
+    def test_invalid_datagram(self):
+        """Test that invalid datagrams are skipped without losing others."""
+        application = FakeApplication()
+        input_system = input.InputSystem(application)
+        dispatched = []
+        input_system.dispatch_event = lambda event_type, event: dispatched.append(event_type)
+        for data in ("chunkID:1//" + TOUCH_DOWN,
+                "chunkID:x//",
+                "chunkID:2//ObjectType:9 ID:0",
+                "chunkID:3//" + TOUCH_DOWN):
+            self.sender.sendto(data, self.address)
+
+        self.failUnlessEqual(self.receiver.drain(input_system.parse_packet), 4)
+        self.failUnlessEqual(self.receiver.invalid_count, 2)
+        self.failUnlessEqual(self.receiver.datagram_count, 4)
+        self.failUnlessEqual(dispatched.count('on_multitouch_down'), 2)
+        self.failUnlessEqual(input_system.last_chunk_id, 3)
+
+class ReceiverThreadTest(unittest.TestCase):
+    def test_hand_off(self):
+        """Test parsing on the receiver thread and taking the items."""
+        receiver = network.UdpReceiver('127.0.0.1', 0)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        thread = network.ReceiverThread(receiver, lambda data: data.split(','), queue_size=4)
+        thread.POLL_TIMEOUT = 0.01
+        thread.start()
+        try:
+            sender.sendto("a,b", receiver.socket.getsockname())
+            sender.sendto("c,d,e", receiver.socket.getsockname())
+            for attempt in range(500):
+                if receiver.datagram_count == 2 and len(thread.items) == 4:
+                    break
+                time.sleep(0.01)
+        finally:
+            thread.stop()
+            sender.close()
+            receiver.close()
+
+        self.failUnlessEqual(thread.take(), ["b", "c", "d", "e"])
+        self.failUnlessEqual(thread.dropped_count, 1)
+        self.failUnlessEqual(thread.take(), [])
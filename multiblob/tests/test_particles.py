@@ -0,0 +1,57 @@
+import unittest
+
+import numpy
+
+from multiblob import particles, state
+
+class ParticleSystemTest(unittest.TestCase):
+    def setUp(self):
+        self.player = state.Player((1.0, 0.0, 0.0, 1.0), [], state.BlobStore())
+        # radius 100 and 50 -> 10 and 5 particles
+        self.big = state.Blob(self.player, 100.0, 100.0, 400.0)
+        self.small = state.Blob(self.player, 500.0, 300.0, 100.0)
+        self.system = particles.ParticleSystem(capacity=4, seed=1)
+
+    def _owned(self, blob):
+        return int((self.system.owner[:self.system.count] ==
+            self.system.blobs.index(blob)).sum())
+
+    def test_counts(self):
+        """Test that every blob gets its share of particles."""
+        self.system.set_blobs([self.big, self.small])
+        self.system.update(0.1)
+        self.failUnlessEqual(len(self.system), 15)
+        self.failUnlessEqual(self._owned(self.small), 5)
+        self.failUnlessEqual(self.system.colour[0].tolist(), [1.0, 0.0, 0.0, 1.0])
+
+        self.big.size = 100.0
+        self.system.update(0.1)
+        self.failUnlessEqual(self._owned(self.big), 5)
+        self.failUnlessEqual(len(self.system), 10)
+
+    def test_removed_blobs(self):
+        """Test that the particles of removed blobs are dropped."""
+        self.system.set_blobs([self.big, self.small])
+        self.system.update(0.1)
+        self.system.set_blobs([self.small])
+        self.failUnlessEqual(len(self.system), 5)
+        self.failUnless((self.system.owner[:5] == 0).all())
+
+    def test_attraction(self):
+        """Test that the particles follow their blob."""
+        self.system.set_blobs([self.small])
+        self.small.pos_x = 1000.0
+        for i in range(200):
+            self.system.update(0.5)
+        center = self.system.position[:len(self.system)].mean(axis=0)
+        self.failUnless(numpy.hypot(center[0] - 1000.0, center[1] - 300.0) < 50.0)
+
+    def test_quads(self):
+        """Test that the quads are centered on the particles."""
+        self.system.set_blobs([self.small])
+        self.system.update(0.1)
+        quads = self.system.quads()
+        self.failUnlessEqual(quads.shape, (5, 4, 2))
+        self.failUnless(numpy.allclose(quads.mean(axis=1), self.system.position[:5]))
+        self.failUnless(numpy.allclose(quads[:, 2] - quads[:, 0],
+            self.system.size[:5, numpy.newaxis]))
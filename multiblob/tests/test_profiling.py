@@ -0,0 +1,64 @@
+import StringIO
+import unittest
+
+from multiblob import profiling
+
+class HistogramTest(unittest.TestCase):
+    def test_summary(self):
+        """Test the summary of a histogram."""
+        histogram = profiling.Histogram()
+        for value in range(1, 101):
+            histogram.add(float(value))
+
+        summary = histogram.summary()
+        self.failUnlessEqual(summary['count'], 100)
+        self.failUnlessEqual(summary['mean'], 50.5)
+        self.failUnlessEqual(summary['p50'], 51.0)
+        self.failUnlessEqual(summary['p99'], 99.0)
+        self.failUnlessEqual(summary['max'], 100.0)
+
+    def test_rolling_window(self):
+        """Test that only the most recent samples are kept."""
+        histogram = profiling.Histogram(size=10)
+        for value in range(100):
+            histogram.add(float(value))
+
+        self.failUnlessEqual(histogram.count, 100)
+        self.failUnlessEqual(histogram.percentile(0), 90.0)
+
+class ProfilerTest(unittest.TestCase):
+    def test_measure(self):
+        """Test recording and dumping measurements."""
+        profiler = profiling.Profiler()
+        with profiler.measure('rule.Test'):
+            pass
+        profiler.record('rule.Test', 0.5)
+
+        self.failUnlessEqual(profiler.stats()['rule.Test']['count'], 2)
+
+        output = StringIO.StringIO()
+        profiler.dump(output)
+        self.failUnless('rule.Test' in output.getvalue())
+
+class LatencyTrackerTest(unittest.TestCase):
+    def test_stages(self):
+        """Test recording the latencies of a touch from receipt to render."""
+        class Event(object):
+            received_time = 1.0
+            parsed_time = 1.5
+            dispatched_time = 2.0
+
+        profiler = profiling.Profiler()
+        event = Event()
+        profiler.latency.dispatched([event])
+        profiler.latency.touched(event)
+        profiler.latency.applied()
+        profiler.latency.rendered()
+        profiler.latency.rendered()
+
+        stats = profiler.stats()
+        self.failUnlessEqual(stats['latency.parse']['max'], 0.5)
+        self.failUnlessEqual(stats['latency.dispatch']['max'], 1.0)
+        self.failUnlessEqual(stats['latency.apply']['count'], 1)
+        self.failUnlessEqual(stats['latency.render']['count'], 1)
+        self.failUnless(event.rendered_time >= event.applied_time)
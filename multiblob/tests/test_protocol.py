@@ -0,0 +1,47 @@
+import unittest
+
+from multiblob import bridge, input, protocol
+
+class ProtocolTest(unittest.TestCase):
+    def test_roundtrip(self):
+        """Test encoding and decoding a binary chunk."""
+        data = protocol.encode(7, [
+            (1, 0, 2, 0.5, 0.25, 0.0004, 0.0005, 0.003, 68.5),
+            (1, 1, 0, 0.4, 0.75, 0.0004, 0.0002, 0.005, 20.5),
+            ])
+        self.failUnless(protocol.is_binary(data))
+        self.failUnlessEqual(len(data), protocol.HEADER.size + 2 * protocol.RECORD_DTYPE.itemsize)
+
+        chunk_id, records = protocol.decode(data)
+        self.failUnlessEqual(chunk_id, 7)
+        self.failUnlessEqual(list(records['object_id']), [0, 1])
+        self.failUnlessEqual(records['pos_y'][1], 0.75)
+
+    def test_invalid(self):
+        """Test rejecting truncated frames."""
+        data = protocol.encode(7, [ (1, 0, 2, 0.5, 0.25, 0.0004, 0.0005, 0.003, 68.5) ])
+        self.failUnlessRaises(protocol.InvalidFrameError, protocol.decode, data[:-1])
+        self.failUnlessRaises(protocol.InvalidFrameError, protocol.decode, data[:4])
+
+    def test_bridge(self):
+        """Test that bridged chunks parse to the same events as text chunks."""
+        text = r"chunkID:4//ObjectType:1 ID:0 ObjectState:2 PosX:0.5 PosY:0.625 Area:0.0004 Width:0.0005 Height:0.003 Orientation:68.5//ObjectType:1 ID:1 ObjectState:0 PosX:0.375 PosY:0.25 Area:0.0004 Width:0.0002 Height:0.005 Orientation:20.5//"
+        binary = bridge.text_to_binary(text)
+        self.failUnlessEqual(bridge.text_to_binary("chunkID:5//ObjectType:9"), None)
+
+        class Application(object):
+            pass
+        application = Application()
+        application.state = Application()
+        application.state.window_width = 800
+        application.state.window_height = 600
+        input_system = input.InputSystem(application)
+
+        text_events = input_system.parse_events(text)
+        binary_events = input_system.parse_events(binary)
+        self.failUnlessEqual(input_system.late_chunk_count, 1)
+        self.failUnlessEqual(len(binary_events), 2)
+        for event, expected in zip(binary_events, text_events):
+            for attribute in ['object_type', 'object_id', 'object_state', 'pos_x',
+                    'pos_y', 'area', 'width', 'height', 'orientation']:
+                self.failUnlessAlmostEqual(getattr(event, attribute), getattr(expected, attribute), places=3)
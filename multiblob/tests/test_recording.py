@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from multiblob import recording, state
+
+class FakeInputSystem(object):
+    def __init__(self):
+        self.packets = []
+
+    def parse_packet(self, data):
+        self.packets.append(data)
+
+    def flush(self):
+        pass
+
+class RecordingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'input.mbrec')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _record(self, seed=None):
+        recorder = recording.InputRecorder(self.path, seed)
+        start_time = recorder._start_time
+        recorder.write("CHUNKID:1//", start_time + 0.0)
+        recorder.write("CHUNKID:2//ObjectType:1", start_time + 0.1)
+        recorder.write("", start_time + 0.25)
+        recorder.close()
+
+    def test_roundtrip(self):
+        """Test reading back the recorded datagrams."""
+        self._record(seed=42)
+
+        input_recording = recording.InputRecording(self.path)
+        self.failUnlessEqual(input_recording.seed, 42)
+        records = list(input_recording)
+        self.failUnlessEqual([ data for arrival_time, data in records ],
+                ["CHUNKID:1//", "CHUNKID:2//ObjectType:1", ""])
+        self.failUnlessAlmostEqual(records[2][0], 0.25)
+
+    def test_threads(self):
+        """Test that records written from two threads stay intact."""
+        recorder = recording.InputRecorder(self.path)
+        def write(name):
+            for index in range(500):
+                recorder.write("chunkID:%d//%s" % (index, name))
+        threads = [ threading.Thread(target=write, args=(name, ))
+                for name in ("receiver", "main") ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        recorder.close()
+
+        records = [ data for arrival_time, data in recording.InputRecording(self.path) ]
+        self.failUnlessEqual(len(records), 1000)
+        for name in ("receiver", "main"):
+            self.failUnlessEqual([ data for data in records if data.endswith(name) ],
+                    [ "chunkID:%d//%s" % (index, name) for index in range(500) ])
+
+    def test_unknown_seed(self):
+        """Test that a recording without seed reports None."""
+        self._record()
+        self.failUnlessEqual(recording.InputRecording(self.path).seed, None)
+
+    def test_invalid_file(self):
+        """Test that other files are rejected."""
+        with open(self.path, 'wb') as other_file:
+            other_file.write("CHUNKID:1//" * 4)
+        self.failUnlessRaises(recording.InvalidRecordingError,
+                recording.InputRecording, self.path)
+
+    def test_replay(self):
+        """Test feeding the datagrams and advancing by the recorded time."""
+        self._record()
+        input_system = FakeInputSystem()
+        advanced = []
+        replayer = recording.InputReplayer(recording.InputRecording(self.path),
+                input_system, advanced.append)
+
+        self.failUnlessEqual(replayer.feed_until(0.15), 2)
+        self.failIf(replayer.finished)
+        self.failUnlessEqual(replayer.run(realtime=False), 1)
+        self.failUnless(replayer.finished)
+
+        self.failUnlessEqual(replayer.count, 3)
+        self.failUnlessEqual(input_system.packets[1], "CHUNKID:2//ObjectType:1")
+        self.failUnlessAlmostEqual(sum(advanced), 0.25)
+
+    def test_setup(self):
+        """Test that the intro is skipped and the game setup is rebuilt."""
+        game_state = state.GameState(seed=3)
+        game_state.reset_simple()
+        game_state.add_player(game_state.facets[2])
+        game_state.add_player(game_state.facets[5], state.PLAYER_COLOURS[3])
+
+        recorder = recording.InputRecorder(self.path, 3)
+        start_time = recorder._start_time
+        recorder.write("CHUNKID:1//", start_time + 0.0)
+        recorder.write_setup(game_state)
+        recorder.write("CHUNKID:2//", start_time + 1.0)
+        recorder.close()
+
+        setups = []
+        input_system = FakeInputSystem()
+        replayer = recording.InputReplayer(recording.InputRecording(self.path),
+                input_system, setup=setups.append)
+        self.failUnlessEqual(replayer.run(realtime=False), 1)
+        self.failUnlessEqual(input_system.packets, ["CHUNKID:2//"])
+        self.failUnlessEqual(setups[0]['players'], [
+            [2, list(state.PLAYER_COLOURS[0])],
+            [5, list(state.PLAYER_COLOURS[3])],
+            ])
+        self.failUnlessEqual(setups[0]['window_width'], 1024)
@@ -0,0 +1,60 @@
+import gc
+import unittest
+
+import pyglet
+pyglet.options['shadow_window'] = False
+import pyglet.gl as gl
+
+from multiblob import renderer
+
+class Key(object):
+    pass
+
+class ManagedBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.batch = renderer.ManagedBatch()
+        self.added = []
+
+    def _add_point(self, key):
+        self.added.append(key)
+        self.batch.set(key, 1, gl.GL_POINTS, None, ('v2f', (0.0, 0.0)))
+
+    def test_sync(self):
+        """Test that only the difference is added and removed."""
+        keys = [ Key() for i in range(3) ]
+        added, removed = self.batch.sync(keys, self._add_point)
+        self.failUnlessEqual(added, keys)
+        self.failUnlessEqual(removed, [])
+
+        new_key = Key()
+        added, removed = self.batch.sync([keys[0], keys[2], new_key], self._add_point)
+        self.failUnlessEqual(added, [new_key])
+        self.failUnlessEqual(removed, [keys[1]])
+        self.failUnlessEqual(len(self.added), 4)
+        self.failIf(keys[1] in self.batch)
+        self.failUnless(new_key in self.batch)
+
+    def test_vertex_list_delete(self):
+        """Test that deleting a vertex list untracks it."""
+        key = Key()
+        vertex_list = self.batch.set(key, 1, gl.GL_POINTS, None, ('v2f', (0.0, 0.0)))
+        self.batch.set(key, 1, gl.GL_POINTS, None, ('v2f', (1.0, 1.0)))
+        vertex_list.delete()
+        self.failUnlessEqual(len(self.batch.get(key)), 1)
+        self.batch.get(key)[0].delete()
+        self.failIf(key in self.batch)
+
+    def test_dead_keys(self):
+        """Test that the vertex lists of dead keys are removed."""
+        self._add_point(Key())
+        self.added = []
+        gc.collect()
+        self.failUnlessEqual(len(self.batch), 0)
+
+    def test_default_key(self):
+        """Test that add uses the key set with use_key."""
+        key = Key()
+        with self.batch.use_key(key):
+            self.batch.add(1, gl.GL_POINTS, None, ('v2f', (0.0, 0.0)))
+        self.failUnlessEqual(len(self.batch.get(key)), 1)
+        self.failUnlessEqual(self.batch.clear(), [key])
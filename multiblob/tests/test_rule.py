@@ -0,0 +1,49 @@
+import unittest
+
+from multiblob import rule
+
+class CountingRule(rule.Rule):
+    def __init__(self, min_interval):
+        rule.Rule.__init__(self)
+        self.MIN_INTERVAL = min_interval
+        self.updates = 0
+
+    def update(self, dt, state):
+        self.updates += 1
+
+class GameRuleSystemTest(unittest.TestCase):
+    def test_fixed_ticks(self):
+        """Test that rules run at their interval without drift."""
+        every_tick = CountingRule(0.0)
+        every_second = CountingRule(1.0)
+        rules = rule.GameRuleSystem([every_tick, every_second], state=True, tick=0.05)
+
+        for i in range(300):
+            rules.update(0.03)
+
+        self.failUnlessEqual(rules.tick_count, 180)
+        self.failUnlessEqual(every_tick.updates, 180)
+        self.failUnlessEqual(every_second.updates, 9)
+
+    def test_catch_up(self):
+        """Test that a stall runs a bounded number of ticks."""
+        every_tick = CountingRule(0.0)
+        rules = rule.GameRuleSystem([every_tick], state=True, tick=0.05,
+                max_catch_up_ticks=3)
+
+        rules.update(1.0)
+
+        self.failUnlessEqual(every_tick.updates, 3)
+        self.failUnlessEqual(rules.ticks_dropped, 17)
+
+    def test_budget(self):
+        """Test that rules are deferred once the tick budget is used up."""
+        rules_list = [ CountingRule(0.0) for i in range(3) ]
+        rules = rule.GameRuleSystem(rules_list, state=True, tick=0.05,
+                tick_budget=-1.0)
+
+        rules.update(0.05)
+        self.failUnlessEqual([ r.updates for r in rules_list ], [1, 0, 0])
+
+        rules.update(0.05)
+        self.failUnlessEqual([ r.updates for r in rules_list ], [1, 1, 0])
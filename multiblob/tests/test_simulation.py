@@ -0,0 +1,79 @@
+import unittest
+
+from multiblob import input, simulation, state
+
+class HeadlessApplicationTest(unittest.TestCase):
+    def run_simulation(self, seed):
+        application = simulation.HeadlessApplication(player_count=3, seed=seed)
+        for tick in range(200):
+            if tick % 10 == 0:
+                application.random_drag()
+            application.step()
+        return application
+
+    def test_run(self):
+        """Test that the main mode rules run without window and audio."""
+        application = self.run_simulation(1)
+
+        self.failUnlessEqual(application.rules.tick_count, 200)
+        self.failUnlessEqual(len(application.state.players), 3)
+        self.failUnless(application.state.blob_store.count > 0)
+
+    def test_deterministic(self):
+        """Test that a seeded simulation is reproducible."""
+        first = self.run_simulation(2).state.blob_store
+        second = self.run_simulation(2).state.blob_store
+
+        self.failUnlessEqual(first.column('pos_x').tolist(), second.column('pos_x').tolist())
+        self.failUnlessEqual(first.column('size').tolist(), second.column('size').tolist())
+
+    def test_touched_blobs(self):
+        """Test that the batch hit test matches the single hit test."""
+        application = self.run_simulation(3)
+        interpreter = [ r for r in application.rules.rules
+                if hasattr(r, 'get_touched_blobs') ][0]
+        blobs = [ blob for player in application.state.players for blob in player.blobs ]
+        xs = [ blob.pos_x for blob in blobs ] + [ application.rng.uniform(0, 1024) for i in range(50) ]
+        ys = [ blob.pos_y for blob in blobs ] + [ application.rng.uniform(0, 768) for i in range(50) ]
+
+        self.failUnlessEqual(interpreter.get_touched_blobs(xs, ys),
+                [ interpreter.get_touched_blob(x, y) for x, y in zip(xs, ys) ])
+
+    def test_start_game(self):
+        """Test rebuilding a recorded game setup."""
+        application = simulation.HeadlessApplication(player_count=0, seed=4)
+        application.start_game({
+            'window_width'  : 800,
+            'window_height' : 600,
+            'facet_count'   : [4, 3],
+            'players'       : [[1, [0.0, 0.0, 1.0, 1.0]]],
+            })
+
+        self.failUnlessEqual(len(application.state.facets), 12)
+        player = application.state.players[0]
+        self.failUnlessEqual(player.colour, (0.0, 0.0, 1.0, 1.0))
+        self.failUnless(application.state.facets[1].home_facet_of is player)
+
+    def test_frame_order(self):
+        """Test that a DOWN after a splitting MOVED in the same frame touches
+        the split off blob, as if the events came one by one."""
+        application = simulation.HeadlessApplication(player_count=0, seed=5)
+        application.state.add_player(application.state.facets[0])
+        player = application.state.players[0]
+        blob = state.Blob(player, 500.0, 400.0, 400.0)
+        interpreter = [ r for r in application.rules.rules
+                if hasattr(r, 'get_touched_blobs') ][0]
+        interpreter.state = application.state
+
+        def event(object_id, object_state, pos_x):
+            return input.MultitouchEvent("ONE_FINGER_TOUCH", object_id, object_state,
+                    pos_x, 400.0, 100.0, 1.0, 1.0, 0.0)
+        application.input_system.dispatch_events([
+            event(0, "DOWN", 500.0),
+            event(0, "MOVED", 700.0),
+            event(1, "DOWN", 700.0),
+            ])
+
+        split_blob = interpreter.touch_objects[0].blob
+        self.failIf(split_blob is blob)
+        self.failUnless(interpreter.touch_objects[1].blob is split_blob)
@@ -0,0 +1,41 @@
+import itertools
+import random
+import unittest
+
+from multiblob import spatial
+
+class SpatialHashTest(unittest.TestCase):
+    def test_pairs_are_unique(self):
+        """Test that every pair of neighbouring items is yielded exactly once."""
+        rng = random.Random(1)
+        spatial_hash = spatial.SpatialHash(10.0)
+        points = [ (rng.uniform(0, 50), rng.uniform(0, 50)) for i in range(100) ]
+        for index, (x, y) in enumerate(points):
+            spatial_hash.insert(index, x, y)
+
+        pairs = [ frozenset(pair) for pair in spatial_hash.pairs() ]
+        self.failUnlessEqual(len(pairs), len(set(pairs)))
+
+    def test_pairs_contain_close_items(self):
+        """Test that all items within one cell size are paired."""
+        rng = random.Random(2)
+        spatial_hash = spatial.SpatialHash(10.0)
+        points = [ (rng.uniform(-50, 50), rng.uniform(-50, 50)) for i in range(100) ]
+        for index, (x, y) in enumerate(points):
+            spatial_hash.insert(index, x, y)
+
+        pairs = set([ frozenset(pair) for pair in spatial_hash.pairs() ])
+        for a, b in itertools.combinations(range(len(points)), 2):
+            dx = points[a][0] - points[b][0]
+            dy = points[a][1] - points[b][1]
+            if dx * dx + dy * dy <= 10.0 * 10.0:
+                self.failUnless(frozenset((a, b)) in pairs)
+
+    def test_query(self):
+        """Test that query returns items from neighbouring cells only."""
+        spatial_hash = spatial.SpatialHash(10.0)
+        spatial_hash.insert('near', 12.0, 5.0)
+        spatial_hash.insert('far', 45.0, 5.0)
+
+        self.failUnlessEqual(spatial_hash.query(5.0, 5.0), ['near'])
+        self.failUnlessEqual(len(spatial_hash), 2)
@@ -0,0 +1,99 @@
+import unittest
+
+from multiblob import state
+
+class BlobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = state.BlobStore(capacity=2)
+        self.player = state.Player((1.0, 0.0, 0.0, 1.0), [], self.store)
+
+    def test_blob_view(self):
+        """Test that blob attributes are kept in the store's columns."""
+        blob = state.Blob(self.player, 10, 20, 16.0)
+        blob.pos_x += 5.0
+
+        self.failUnlessEqual(self.store.column('pos_x').tolist(), [15.0])
+        self.failUnlessEqual(self.store.column('pos_y').tolist(), [20.0])
+        self.failUnlessEqual(self.store.radii().tolist(), [blob.radius])
+        self.failUnlessEqual(blob.position.x, 15.0)
+
+    def test_grow(self):
+        """Test that the store grows beyond its initial capacity."""
+        blobs = [ state.Blob(self.player, i, i, 10.0) for i in range(5) ]
+
+        self.failUnless(self.store.capacity >= 5)
+        self.failUnlessEqual([ blob.pos_x for blob in blobs ], range(5))
+
+    def test_kill_and_compact(self):
+        """Test that killed blobs are detached without disturbing others."""
+        blobs = [ state.Blob(self.player, i, i, 10.0) for i in range(3) ]
+        blobs[0].kill()
+
+        self.failUnlessEqual(len(self.store), 2)
+        self.failIf(blobs[0] in self.player.blobs)
+
+        self.store.compact()
+        blobs[0].pos_x = 100.0
+
+        self.failUnlessEqual(self.store.count, 2)
+        self.failUnlessEqual(self.store.column('pos_x').tolist(), [1.0, 2.0])
+        self.failUnlessEqual([ blob.pos_x for blob in blobs ], [100.0, 1.0, 2.0])
+        self.failIf(blobs[0].alive)
+
+class BlobFacetCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.state = state.GameState()
+        self.state.reset_simple()
+        self.state.add_player(self.state.facets[0])
+        self.player = self.state.players[0]
+
+    def test_locate_blobs(self):
+        """Test that blobs are only located again after leaving their safe
+        radius."""
+        facet = self.state.facets[0]
+        blob = state.Blob(self.player, facet.gen_x, facet.gen_y, 10.0)
+        other_blob = state.Blob(self.player, facet.gen_x, facet.gen_y, 10.0)
+        self.state.locate_blobs()
+
+        self.failUnlessEqual(blob.facet_index, facet.index)
+
+        other_blob.pos_x = 0.0
+        other_blob.pos_y = 0.0
+        rows = self.state.blob_store.locate_facets(self.state.facet_locator)
+
+        self.failUnlessEqual(rows.tolist(), [other_blob._row])
+        self.failUnless(self.state.facet_locator.locate(0.0, 0.0).index ==
+                other_blob.facet_index)
+
+class FacetOwnerTest(unittest.TestCase):
+    def test_owner(self):
+        """Test that the owner follows changes of the occupation."""
+        facet = state.Facet(0.0, 0.0)
+        red, green = object(), object()
+
+        facet.set_occupation(red, 0.5)
+        facet.add_occupation(green, 0.7)
+        self.failUnless(facet.owner is green)
+        self.failUnlessEqual(facet.owner_occupation, 0.7)
+
+        facet.add_occupation(green, -0.4)
+        self.failUnless(facet.owner is red)
+
+        facet.remove_occupation(red)
+        self.failUnless(facet.owner is green)
+
+        facet.remove_occupation(green)
+        self.failUnless(facet.owner is None)
+
+    def test_changes(self):
+        """Test that the change counter only moves if the occupation does."""
+        facet = state.Facet(0.0, 0.0)
+        red = object()
+
+        facet.set_occupation(red, 1.0)
+        changes = facet.changes
+        facet.add_occupation(red, 0.5)
+        self.failUnlessEqual(facet.changes, changes)
+
+        facet.add_occupation(red, -0.5)
+        self.failUnless(facet.changes > changes)
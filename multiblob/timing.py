@@ -1,3 +1,42 @@
+import sys
+
+def _posix_monotonic_clock():
+    """Return a clock reading CLOCK_MONOTONIC through ctypes, for Python
+    versions without `time.monotonic`, or None if it is not available."""
+    import ctypes
+    import ctypes.util
+
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    CLOCK_MONOTONIC = 1 # the value on Linux
+    try:
+        library = ctypes.CDLL(ctypes.util.find_library('rt') or
+                ctypes.util.find_library('c'), use_errno=True)
+        clock_gettime = library.clock_gettime
+    except (OSError, AttributeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    def clock():
+        now = timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(now)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, "clock_gettime failed")
+        return now.tv_sec + now.tv_nsec * 1e-9
+    return clock
+
+try:
+    from time import monotonic as clock
+except ImportError:
+    # timeit's default timer is the wall clock on Python 2, which jumps when
+    # the system time is adjusted
+    clock = None
+    if sys.platform.startswith('linux'):
+        clock = _posix_monotonic_clock()
+    if clock is None:
+        from timeit import default_timer as clock
+
 class TTLMixin(object):
     DEFAULT_TTL = 3.0
 
@@ -3,6 +3,8 @@ import logging
 import pyglet
 import pyglet.gl as gl
 
+from multiblob import renderers
+
 class GameWindow(pyglet.window.Window):
     background_color = (0, 0, 0, 1)
     alpha_size = 8
@@ -12,6 +14,7 @@ class GameWindow(pyglet.window.Window):
         self.configuration = configuration
 
         self.log = logging.getLogger("GameWindow")
+        self.latency_overlay = None
 
         platform = pyglet.window.get_platform()
         display  = platform.get_default_display()
@@ -56,6 +59,14 @@ class GameWindow(pyglet.window.Window):
         if self.mode:
             self.mode.render()
 
+        profiler = self.application.profiler
+        if profiler is not None:
+            if self.configuration.get('debug', False):
+                if self.latency_overlay is None:
+                    self.latency_overlay = renderers.LatencyOverlay(profiler)
+                self.latency_overlay.draw()
+            profiler.latency.rendered()
+
     @property
     def mode(self):
         return self.application.mode
@@ -16,12 +16,17 @@ setup(
     install_requires     = [
         'setuptools', 
         'pyglet',
-        'cogen',
-        'lepton',
+        'numpy',
         ],
+    extras_require       = {
+        'asyncio' : ['trollius', ],
+        },
     entry_points         = """
     [console_scripts]
     multiblob = multiblob.client:main
+    multiblob-simulation = multiblob.simulation:main
+    multiblob-replay = multiblob.recording:main
+    multiblob-bridge = multiblob.bridge:main
     """,
     zip_safe             = False,
     )